@@ -1,5 +1,6 @@
 from __future__ import absolute_import
 
+import functools
 import logging
 import six
 
@@ -28,6 +29,7 @@ from sentry.models import (
     Team, User, UserOption
 )
 from sentry.models.group import looks_like_short_id
+from sentry.search.snuba.backend import invalidate_result_cache
 from sentry.api.issue_search import (
     convert_query_values,
     InvalidSearchQuery,
@@ -381,6 +383,17 @@ def _delete_groups(request, project, group_list, delete_type):
             sender=_delete_groups)
 
 
+def invalidates_search_results(func):
+    @functools.wraps(func)
+    def wrapped(request, projects, *args, **kwargs):
+        try:
+            return func(request, projects, *args, **kwargs)
+        finally:
+            invalidate_result_cache([p.id for p in projects])
+    return wrapped
+
+
+@invalidates_search_results
 def delete_groups(request, projects, organization_id, search_fn):
     """
     `search_fn` refers to the `search.query` method with the appropriate
@@ -445,6 +458,7 @@ def self_subscribe_and_assign_issue(acting_user, group):
             return Actor(type=User, id=acting_user.id)
 
 
+@invalidates_search_results
 def update_groups(request, projects, organization_id, search_fn):
     group_ids = request.GET.getlist('id')
     if group_ids:
@@ -1,7 +1,13 @@
 from __future__ import absolute_import
 
+import six
+
+from collections import OrderedDict
+
 from django.contrib.auth.models import AnonymousUser
 
+from sentry.utils import metrics
+
 registry = {}
 
 
@@ -57,3 +63,52 @@ class Serializer(object):
 
     def serialize(self, obj, attrs, user, **kwargs):
         return {}
+
+
+class AttrLoader(object):
+    """
+    Declares the batched lookups a serializer's ``get_attrs`` is made of.
+    Every lookup receives the whole item list and returns its results for
+    all items at once, along with the results of the lookups it requires:
+
+    >>> loader = AttrLoader('api.serializers.foo.get_attrs')
+    >>> @loader.register('owners')
+    ... def load_owners(serializer, item_list, user):
+    ...     return {...}
+    >>> @loader.register('owner_names', requires=('owners', ))
+    ... def load_owner_names(serializer, item_list, user, owners):
+    ...     return {...}
+
+    Each lookup is timed under ``metric``, tagged with its name.
+
+    Lookups run one after another in the order they were registered. Their
+    dependencies are explicit so they could be run concurrently, but Django
+    gives every thread its own database connection outside the request's
+    transaction, so queries on a pool would not see uncommitted data.
+    """
+
+    def __init__(self, metric):
+        self.metric = metric
+        self.loaders = OrderedDict()
+
+    def register(self, name, requires=()):
+        def wrapped(func):
+            for dependency in requires:
+                assert dependency in self.loaders, \
+                    '%r must be registered before %r' % (dependency, name)
+            self.loaders[name] = (func, requires)
+            return func
+
+        return wrapped
+
+    def load(self, serializer, item_list, user):
+        """
+        Runs every lookup and returns a mapping of lookup names to their
+        results.
+        """
+        results = {}
+        for name, (func, requires) in six.iteritems(self.loaders):
+            with metrics.timer(self.metric, tags={'attr': name}):
+                results[name] = func(
+                    serializer, item_list, user, *[results[r] for r in requires])
+        return results
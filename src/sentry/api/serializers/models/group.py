@@ -10,7 +10,7 @@ from django.db.models import Min, Q
 from django.utils import timezone
 
 from sentry import tagstore, tsdb
-from sentry.api.serializers import Serializer, register, serialize
+from sentry.api.serializers import AttrLoader, Serializer, register, serialize
 from sentry.api.serializers.models.actor import ActorSerializer
 from sentry.api.fields.actor import Actor
 from sentry.constants import LOG_LEVELS, StatsPeriod
@@ -36,6 +36,9 @@ SUBSCRIPTION_REASON_MAP = {
 disabled = object()
 
 
+group_attr_loader = AttrLoader('api.serializers.group.get_attrs')
+
+
 # TODO(jess): remove when snuba is primary backend
 snuba_tsdb = SnubaTSDB(**settings.SENTRY_TSDB_OPTIONS)
 
@@ -124,133 +127,200 @@ class GroupSerializerBase(Serializer):
 
         return results
 
-    def get_attrs(self, item_list, user):
+    def _get_annotators(self, item_list):
+        """
+        Returns a mapping of project IDs to a two-tuple of (plugins,
+        integration installations) that can annotate groups of the project.
+        Plugins are looked up once per project and integrations once per
+        organization rather than for every group.
+        """
+        from sentry.integrations import IntegrationFeatures
         from sentry.plugins import plugins
 
-        GroupMeta.objects.populate_cache(item_list)
+        installations = {}
+        for organization_id in set(item.project.organization_id for item in item_list):
+            installations[organization_id] = [
+                integration.get_installation(organization_id)
+                for integration in Integration.objects.filter(organizations=organization_id)
+                if integration.has_feature(IntegrationFeatures.ISSUE_BASIC) or
+                integration.has_feature(IntegrationFeatures.ISSUE_SYNC)
+            ]
 
-        attach_foreignkey(item_list, Group.project)
+        annotators = {}
+        for item in item_list:
+            project = item.project
+            if project.id in annotators:
+                continue
+            annotators[project.id] = (
+                (
+                    list(plugins.for_project(project=project, version=1)),
+                    list(plugins.for_project(project=project, version=2)),
+                ),
+                installations[project.organization_id],
+            )
+        return annotators
+
+    def _get_annotations(self, item, annotators):
+        from sentry.models import PlatformExternalIssue
+
+        (v1_plugins, v2_plugins), installations = annotators[item.project_id]
 
-        if user.is_authenticated() and item_list:
-            bookmarks = set(
-                GroupBookmark.objects.filter(
-                    user=user,
-                    group__in=item_list,
-                ).values_list('group_id', flat=True)
+        annotations = []
+        for plugin in v1_plugins:
+            safe_execute(plugin.tags, None, item, annotations, _with_transaction=False)
+        for plugin in v2_plugins:
+            annotations.extend(
+                safe_execute(plugin.get_annotations, group=item, _with_transaction=False) or ()
             )
-            seen_groups = dict(
-                GroupSeen.objects.filter(
-                    user=user,
-                    group__in=item_list,
-                ).values_list('group_id', 'last_seen')
+
+        for install in installations:
+            annotations.extend(
+                safe_execute(install.get_annotations, group=item, _with_transaction=False) or ()
             )
-            subscriptions = self._get_subscriptions(item_list, user)
-        else:
-            bookmarks = set()
-            seen_groups = {}
-            subscriptions = defaultdict(lambda: (False, None))
 
+        annotations.extend(
+            safe_execute(
+                PlatformExternalIssue.get_annotations,
+                group=item,
+                _with_transaction=False) or ()
+        )
+        return annotations
+
+    @group_attr_loader.register('bookmarks')
+    def _load_bookmarks(self, item_list, user):
+        if not user.is_authenticated():
+            return set()
+        return set(
+            GroupBookmark.objects.filter(
+                user=user,
+                group__in=item_list,
+            ).values_list('group_id', flat=True)
+        )
+
+    @group_attr_loader.register('seen')
+    def _load_seen(self, item_list, user):
+        if not user.is_authenticated():
+            return {}
+        return dict(
+            GroupSeen.objects.filter(
+                user=user,
+                group__in=item_list,
+            ).values_list('group_id', 'last_seen')
+        )
+
+    @group_attr_loader.register('subscriptions')
+    def _load_subscriptions(self, item_list, user):
+        if not user.is_authenticated():
+            return defaultdict(lambda: (False, None))
+        return self._get_subscriptions(item_list, user)
+
+    @group_attr_loader.register('assignees')
+    def _load_assignees(self, item_list, user):
         assignees = {
             a.group_id: a.assigned_actor() for a in
             GroupAssignee.objects.filter(
                 group__in=item_list,
             )
         }
-        resolved_assignees = Actor.resolve_dict(assignees)
+        return Actor.resolve_dict(assignees)
 
-        ignore_items = {g.group_id: g for g in GroupSnooze.objects.filter(
+    @group_attr_loader.register('ignore_until')
+    def _load_ignore_until(self, item_list, user):
+        return {g.group_id: g for g in GroupSnooze.objects.filter(
             group__in=item_list,
         )}
 
+    @group_attr_loader.register('release_resolutions')
+    def _load_release_resolutions(self, item_list, user):
         resolved_item_list = [i for i in item_list if i.status == GroupStatus.RESOLVED]
-        if resolved_item_list:
-            release_resolutions = {
-                i[0]: i[1:]
-                for i in GroupResolution.objects.filter(
-                    group__in=resolved_item_list,
-                ).values_list(
-                    'group',
-                    'type',
-                    'release__version',
-                    'actor_id',
-                )
-            }
+        if not resolved_item_list:
+            return {}
+        return {
+            i[0]: i[1:]
+            for i in GroupResolution.objects.filter(
+                group__in=resolved_item_list,
+            ).values_list(
+                'group',
+                'type',
+                'release__version',
+                'actor_id',
+            )
+        }
 
-            # due to our laziness, and django's inability to do a reasonable join here
-            # we end up with two queries
-            commit_results = list(Commit.objects.extra(
-                select={
-                    'group_id': 'sentry_grouplink.group_id',
-                },
-                tables=['sentry_grouplink'],
-                where=[
-                    'sentry_grouplink.linked_id = sentry_commit.id',
-                    'sentry_grouplink.group_id IN ({})'.format(
-                        ', '.join(six.text_type(i.id) for i in resolved_item_list)),
-                    'sentry_grouplink.linked_type = %s',
-                    'sentry_grouplink.relationship = %s',
-                ],
-                params=[
-                    int(GroupLink.LinkedType.commit),
-                    int(GroupLink.Relationship.resolves),
-                ]
-            ))
-            commit_resolutions = {
-                i.group_id: d for i, d in itertools.izip(commit_results, serialize(commit_results, user))
-            }
-        else:
-            release_resolutions = {}
-            commit_resolutions = {}
+    @group_attr_loader.register('commit_resolutions')
+    def _load_commit_resolutions(self, item_list, user):
+        resolved_item_list = [i for i in item_list if i.status == GroupStatus.RESOLVED]
+        if not resolved_item_list:
+            return {}
 
+        # due to our laziness, and django's inability to do a reasonable join here
+        # we end up with two queries
+        commit_results = list(Commit.objects.extra(
+            select={
+                'group_id': 'sentry_grouplink.group_id',
+            },
+            tables=['sentry_grouplink'],
+            where=[
+                'sentry_grouplink.linked_id = sentry_commit.id',
+                'sentry_grouplink.group_id IN ({})'.format(
+                    ', '.join(six.text_type(i.id) for i in resolved_item_list)),
+                'sentry_grouplink.linked_type = %s',
+                'sentry_grouplink.relationship = %s',
+            ],
+            params=[
+                int(GroupLink.LinkedType.commit),
+                int(GroupLink.Relationship.resolves),
+            ]
+        ))
+        return {
+            i.group_id: d for i, d in itertools.izip(commit_results, serialize(commit_results, user))
+        }
+
+    @group_attr_loader.register('actors', requires=('release_resolutions', 'ignore_until'))
+    def _load_actors(self, item_list, user, release_resolutions, ignore_items):
         actor_ids = set(r[-1] for r in six.itervalues(release_resolutions))
         actor_ids.update(r.actor_id for r in six.itervalues(ignore_items))
-        if actor_ids:
-            users = list(User.objects.filter(
-                id__in=actor_ids,
-                is_active=True,
-            ))
-            actors = {u.id: d for u, d in itertools.izip(users, serialize(users, user))}
-        else:
-            actors = {}
-
-        share_ids = dict(GroupShare.objects.filter(
+        if not actor_ids:
+            return {}
+        users = list(User.objects.filter(
+            id__in=actor_ids,
+            is_active=True,
+        ))
+        return {u.id: d for u, d in itertools.izip(users, serialize(users, user))}
+
+    @group_attr_loader.register('share_id')
+    def _load_share_ids(self, item_list, user):
+        return dict(GroupShare.objects.filter(
             group__in=item_list,
         ).values_list('group_id', 'uuid'))
 
-        result = {}
+    @group_attr_loader.register('seen_stats')
+    def _load_seen_stats(self, item_list, user):
+        return self._get_seen_stats(item_list, user)
 
-        seen_stats = self._get_seen_stats(item_list, user)
+    @group_attr_loader.register('annotations')
+    def _load_annotations(self, item_list, user):
+        annotators = self._get_annotators(item_list)
+        return {item.id: self._get_annotations(item, annotators) for item in item_list}
 
-        for item in item_list:
-            active_date = item.active_at or item.first_seen
+    def get_attrs(self, item_list, user):
+        GroupMeta.objects.populate_cache(item_list)
 
-            annotations = []
-            for plugin in plugins.for_project(project=item.project, version=1):
-                safe_execute(plugin.tags, None, item, annotations, _with_transaction=False)
-            for plugin in plugins.for_project(project=item.project, version=2):
-                annotations.extend(
-                    safe_execute(plugin.get_annotations, group=item, _with_transaction=False) or ()
-                )
+        attach_foreignkey(item_list, Group.project)
 
-            from sentry.integrations import IntegrationFeatures
-            for integration in Integration.objects.filter(
-                    organizations=item.project.organization_id):
-                if not (integration.has_feature(IntegrationFeatures.ISSUE_BASIC) or integration.has_feature(
-                        IntegrationFeatures.ISSUE_SYNC)):
-                    continue
+        if not item_list:
+            return {}
 
-                install = integration.get_installation(item.project.organization_id)
-                annotations.extend(
-                    safe_execute(install.get_annotations, group=item, _with_transaction=False) or ()
-                )
+        attrs = group_attr_loader.load(self, item_list, user)
+        release_resolutions = attrs['release_resolutions']
+        commit_resolutions = attrs['commit_resolutions']
+        ignore_items = attrs['ignore_until']
+        actors = attrs['actors']
+        seen_groups = attrs['seen']
 
-            from sentry.models import PlatformExternalIssue
-            annotations.extend(
-                safe_execute(
-                    PlatformExternalIssue.get_annotations,
-                    group=item,
-                    _with_transaction=False) or ()
-            )
+        result = {}
+        for item in item_list:
+            active_date = item.active_at or item.first_seen
 
             resolution_actor = None
             resolution_type = None
@@ -270,20 +340,20 @@ class GroupSerializerBase(Serializer):
                 ignore_actor = None
 
             result[item] = {
-                'assigned_to': resolved_assignees.get(item.id),
-                'is_bookmarked': item.id in bookmarks,
-                'subscription': subscriptions[item.id],
+                'assigned_to': attrs['assignees'].get(item.id),
+                'is_bookmarked': item.id in attrs['bookmarks'],
+                'subscription': attrs['subscriptions'][item.id],
                 'has_seen': seen_groups.get(item.id, active_date) > active_date,
-                'annotations': annotations,
+                'annotations': attrs['annotations'][item.id],
                 'ignore_until': ignore_item,
                 'ignore_actor': ignore_actor,
                 'resolution': resolution,
                 'resolution_type': resolution_type,
                 'resolution_actor': resolution_actor,
-                'share_id': share_ids.get(item.id),
+                'share_id': attrs['share_id'].get(item.id),
             }
 
-            result[item].update(seen_stats.get(item, {}))
+            result[item].update(attrs['seen_stats'].get(item, {}))
         return result
 
     def serialize(self, obj, attrs, user):
@@ -0,0 +1,9 @@
+from __future__ import absolute_import
+
+from sentry.bgtasks.api import bgtask
+from sentry.filestore.cache import blobcache
+
+
+@bgtask()
+def clean_blobcache():
+    blobcache.clear_old_entries()
@@ -10,10 +10,13 @@ from __future__ import absolute_import
 import logging
 import six
 
-from django.db.models import F
+from collections import OrderedDict
+from django.db import connections, router, transaction
+from django.db.models import AutoField, F, IntegerField, Model
 
 from sentry.signals import buffer_incr_complete
 from sentry.tasks.process_buffer import process_incr
+from sentry.utils.db import is_postgres
 from sentry.utils.services import Service
 
 
@@ -38,7 +41,7 @@ class Buffer(Service):
     This is useful in situations where a single event might be happening so fast that the queue cant
     keep up with the updates.
     """
-    __all__ = ('incr', 'process', 'process_pending', 'validate')
+    __all__ = ('incr', 'flush', 'process', 'process_batch', 'process_pending', 'validate')
 
     def incr(self, model, columns, filters, extra=None):
         """
@@ -53,6 +56,12 @@ class Buffer(Service):
             }
         )
 
+    def flush(self):
+        """
+        Sends increments that are held back in process, if the buffer does
+        that at all.
+        """
+
     def process_pending(self, partition=None):
         return []
 
@@ -83,3 +92,165 @@ class Buffer(Service):
             created=created,
             sender=model,
         )
+
+    def process_batch(self, items):
+        """
+        Applies several increments at once, where ``items`` is a sequence of
+        ``(model, columns, filters, extra)`` tuples.
+
+        On PostgreSQL all increments of a model that touch the same columns
+        are applied with a single ``UPDATE ... FROM (VALUES ...)``
+        statement. Rows that do not exist yet, and increments that cannot be
+        expressed that way, go through ``process`` one at a time.
+        """
+        from sentry.models import Group
+
+        batches = OrderedDict()
+        remaining = []
+        for item in items:
+            model, columns, filters, extra = item
+            extra = dict(extra or {})
+
+            # ``process`` recomputes the score of groups from ``times_seen``
+            # and ``last_seen`` and ignores the value sent along.
+            with_score = model is Group and 'last_seen' in extra and 'times_seen' in columns
+            if with_score:
+                extra.pop('score', None)
+
+            if not (columns or extra) or \
+                    any(hasattr(v, 'resolve_expression') for v in six.itervalues(extra)):
+                remaining.append(item)
+                continue
+
+            shape = (
+                model,
+                tuple(sorted(filters)),
+                tuple(sorted(columns)),
+                tuple(sorted(extra)),
+                with_score,
+            )
+            batch = batches.setdefault(shape, OrderedDict())
+            row_key = tuple(
+                self._coerce_filter_value(filters[k]) for k in shape[1]
+            )
+            if row_key in batch:
+                # The same row can only be updated once per statement.
+                remaining.append(item)
+            else:
+                batch[row_key] = (item, extra)
+
+        for shape, batch in six.iteritems(batches):
+            batch = list(batch.values())
+            using = router.db_for_write(shape[0])
+            if len(batch) == 1 or not is_postgres(using):
+                remaining.extend(item for item, _ in batch)
+                continue
+
+            updated = self._bulk_update(shape, batch, using)
+            for index, (item, _) in enumerate(batch):
+                if index not in updated:
+                    remaining.append(item)
+                    continue
+
+                model, columns, filters, extra = item
+                buffer_incr_complete.send_robust(
+                    model=model,
+                    columns=columns,
+                    filters=filters,
+                    extra=extra,
+                    created=False,
+                    sender=model,
+                )
+
+        for model, columns, filters, extra in remaining:
+            Buffer.process(self, model, columns, filters, extra)
+
+    def _coerce_filter_value(self, value):
+        if isinstance(value, Model):
+            return value.pk
+        return value
+
+    def _cast_type(self, field, connection):
+        """
+        Returns the storage type of ``field``. Auto fields report their
+        ``serial`` pseudo types, which cannot be used in casts.
+        """
+        if hasattr(field, 'get_related_db_type'):
+            return field.get_related_db_type(connection)
+        if isinstance(field, AutoField):
+            return IntegerField().db_type(connection)
+        return field.db_type(connection)
+
+    def _bulk_update(self, shape, batch, using):
+        """
+        Updates all rows of ``batch`` with one statement and returns the
+        indexes of the rows that exist.
+        """
+        model, filter_keys, column_keys, extra_keys, with_score = shape
+        connection = connections[using]
+        qn = connection.ops.quote_name
+        opts = model._meta
+
+        def get_field(name):
+            return opts.pk if name == 'pk' else opts.get_field(name)
+
+        columns = [('f%d' % i, get_field(k)) for i, k in enumerate(filter_keys)]
+        columns += [('i%d' % i, get_field(k)) for i, k in enumerate(column_keys)]
+        columns += [('e%d' % i, get_field(k)) for i, k in enumerate(extra_keys)]
+
+        row_sql = '(%%s, %s)' % ', '.join(
+            '%%s::%s' % self._cast_type(field, connection) for _, field in columns
+        )
+        params = []
+        for index, ((_, item_columns, filters, _), extra) in enumerate(batch):
+            params.append(index)
+            values = [filters[k] for k in filter_keys]
+            values += [item_columns[k] for k in column_keys]
+            values += [extra[k] for k in extra_keys]
+            for (_, field), value in zip(columns, values):
+                params.append(field.get_db_prep_save(
+                    self._coerce_filter_value(value),
+                    connection=connection,
+                ))
+
+        assignments = []
+        conditions = []
+        for alias, field in columns:
+            column = qn(field.column)
+            if alias[0] == 'f':
+                conditions.append('t.%s = v.%s' % (column, alias))
+            elif alias[0] == 'i':
+                assignments.append('%s = t.%s + v.%s' % (column, column, alias))
+            else:
+                assignments.append('%s = v.%s' % (column, alias))
+
+        if with_score:
+            # Mirrors ``ScoreClause`` with known values.
+            times_seen = 'v.i%d' % column_keys.index('times_seen')
+            last_seen = 'v.e%d' % extra_keys.index('last_seen')
+            assignments.append(
+                '%s = log(t.%s + %s) * 600 + floor(extract(epoch from %s))' % (
+                    qn(opts.get_field('score').column),
+                    qn(opts.get_field('times_seen').column),
+                    times_seen,
+                    last_seen,
+                )
+            )
+
+        sql = (
+            'UPDATE %(table)s AS t SET %(assignments)s '
+            'FROM (VALUES %(rows)s) AS v (idx, %(aliases)s) '
+            'WHERE %(conditions)s '
+            'RETURNING v.idx'
+        ) % {
+            'table': qn(opts.db_table),
+            'assignments': ', '.join(assignments),
+            'rows': ', '.join([row_sql] * len(batch)),
+            'aliases': ', '.join(alias for alias, _ in columns),
+            'conditions': ' AND '.join(conditions),
+        }
+
+        with transaction.atomic(using=using):
+            cursor = connection.cursor()
+            cursor.execute(sql, params)
+            return set(row[0] for row in cursor.fetchall())
@@ -7,10 +7,15 @@ sentry.buffer.redis
 """
 from __future__ import absolute_import
 
+import atexit
+import logging
+import os
 import six
+import threading
 
-from time import time
+from time import sleep, time
 from binascii import crc32
+from collections import defaultdict
 
 from datetime import datetime
 from django.db import models
@@ -26,6 +31,8 @@ from sentry.utils.hashlib import md5_text
 from sentry.utils.imports import import_string
 from sentry.utils.redis import get_cluster_from_options
 
+logger = logging.getLogger(__name__)
+
 
 class PendingBuffer(object):
     def __init__(self, size):
@@ -54,17 +61,113 @@ class PendingBuffer(object):
         return rv
 
 
+class IncrCoalescer(object):
+    """
+    Collects increments in process so that repeated writes to the same key
+    are sent to Redis as a single set of commands.
+
+    Counters are summed up and extra values are merged (last write wins).
+    At most ``max_size`` keys are held back for at most ``max_delay``
+    seconds, which bounds what is lost if the process dies without running
+    its exit handlers.
+    """
+
+    def __init__(self, max_size, max_delay):
+        assert max_size > 0
+        assert max_delay > 0
+        self.max_size = max_size
+        self.max_delay = max_delay
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.first_added = None
+        self.flusher_pid = None
+
+    def add(self, key, model, columns, filters, extra=None):
+        """
+        Adds an increment, returning whether the pending increments should
+        be flushed now.
+        """
+        with self.lock:
+            item = self.pending.get(key)
+            if item is None:
+                item = self.pending[key] = (model, filters, defaultdict(int), {})
+                if self.first_added is None:
+                    self.first_added = time()
+
+            _, _, pending_columns, pending_extra = item
+            for column, amount in six.iteritems(columns):
+                pending_columns[column] += amount
+            if extra:
+                pending_extra.update(extra)
+
+            return len(self.pending) >= self.max_size or self.is_due()
+
+    def is_due(self):
+        return self.first_added is not None and \
+            time() - self.first_added >= self.max_delay
+
+    def drain(self):
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            self.first_added = None
+        return pending
+
+    def start(self, flush):
+        """
+        Makes sure a background thread calls ``flush`` once pending
+        increments are due, even when no further writes come in. This is
+        checked on every write as the thread does not survive a fork.
+        """
+        pid = os.getpid()
+        if self.flusher_pid == pid:
+            return
+
+        with self.lock:
+            if self.flusher_pid == pid:
+                return
+            self.flusher_pid = pid
+
+        def run():
+            while True:
+                sleep(self.max_delay / 2.0)
+                if self.is_due():
+                    try:
+                        flush()
+                    except Exception:
+                        logger.exception('buffer.flush-failed')
+
+        thread = threading.Thread(target=run, name='sentry.buffer.redis.flusher')
+        thread.daemon = True
+        thread.start()
+
+
 class RedisBuffer(Buffer):
+    """
+    Keeps counters in Redis hashes until they are written to the database by
+    ``process_pending``.
+
+    When ``incr_coalesce_size`` is set, increments are first collected in
+    process (see ``IncrCoalescer``) and flushed with one pipeline per Redis
+    host once that many keys are pending or ``incr_coalesce_delay`` seconds
+    have passed. Pending increments are also flushed when the process exits.
+    """
     key_expire = 60 * 60  # 1 hour
     pending_key = 'b:p'
 
-    def __init__(self, pending_partitions=1, incr_batch_size=2, **options):
+    def __init__(self, pending_partitions=1, incr_batch_size=2, incr_coalesce_size=0,
+                 incr_coalesce_delay=1.0, **options):
         self.cluster, options = get_cluster_from_options('SENTRY_BUFFER_OPTIONS', options)
         self.pending_partitions = pending_partitions
         self.incr_batch_size = incr_batch_size
         assert self.pending_partitions > 0
         assert self.incr_batch_size > 0
 
+        if incr_coalesce_size > 0:
+            self.coalescer = IncrCoalescer(incr_coalesce_size, incr_coalesce_delay)
+            atexit.register(self.flush)
+        else:
+            self.coalescer = None
+
     def validate(self):
         try:
             with self.cluster.all() as client:
@@ -165,12 +268,56 @@ class RedisBuffer(Buffer):
         # TODO(dcramer): longer term we'd rather not have to serialize values
         # here (unless it's to JSON)
         key = self._make_key(model, filters)
-        pending_key = self._make_pending_key_from_key(key)
+
+        metrics.incr('buffer.incr', skip_internal=True, tags={
+            'module': model.__module__,
+            'model': model.__name__,
+        })
+
+        if self.coalescer is not None:
+            self.coalescer.start(self.flush)
+            if self.coalescer.add(key, model, columns, filters, extra):
+                self.flush()
+            return
+
         # We can't use conn.map() due to wanting to support multiple pending
         # keys (one per Redis partition)
         conn = self.cluster.get_local_client_for_key(key)
 
         pipe = conn.pipeline()
+        self._queue_incr(pipe, key, model, columns, filters, extra)
+        pipe.execute()
+
+    def flush(self):
+        """
+        Writes all increments collected in process to Redis.
+        """
+        if self.coalescer is None:
+            return
+
+        pending = self.coalescer.drain()
+        if not pending:
+            return
+
+        # The pending key has to live on the same host as the hash it points
+        # to, so every host gets its own pipeline.
+        router = self.cluster.get_router()
+        keys_by_host = defaultdict(list)
+        for key in pending:
+            keys_by_host[router.get_host_for_key(key)].append(key)
+
+        for host_id, keys in six.iteritems(keys_by_host):
+            pipe = self.cluster.get_local_client(host_id).pipeline()
+            for key in keys:
+                model, filters, columns, extra = pending[key]
+                self._queue_incr(pipe, key, model, columns, filters, extra)
+            pipe.execute()
+
+        metrics.timing('buffer.coalesced-keys', len(pending))
+
+    def _queue_incr(self, pipe, key, model, columns, filters, extra=None):
+        pending_key = self._make_pending_key_from_key(key)
+
         pipe.hsetnx(key, 'm', '%s.%s' % (model.__module__, model.__name__))
         # TODO(dcramer): once this goes live in production, we can kill the pickle path
         # (this is to ensure a zero downtime deploy where we can transition event processing)
@@ -190,12 +337,6 @@ class RedisBuffer(Buffer):
                 # pipe.hset(key, 'e+' + column, json.dumps(self._dump_value(value)))
         pipe.expire(key, self.key_expire)
         pipe.zadd(pending_key, time(), key)
-        pipe.execute()
-
-        metrics.incr('buffer.incr', skip_internal=True, tags={
-            'module': model.__module__,
-            'model': model.__name__,
-        })
 
     def process_pending(self, partition=None):
         if partition is None and self.pending_partitions > 1:
@@ -253,8 +394,36 @@ class RedisBuffer(Buffer):
         if key is not None:
             batch_keys = [key]
 
-        for key in batch_keys:
-            self._process_single_incr(key)
+        if len(batch_keys) == 1:
+            self._process_single_incr(batch_keys[0])
+        else:
+            self._process_batch_incrs(batch_keys)
+
+    def _load_incr(self, values):
+        """
+        Turns the contents of a buffer hash into a ``(model, columns,
+        filters, extra)`` tuple.
+        """
+        model = import_string(values.pop('m'))
+        if values['f'].startswith('{'):
+            filters = self._load_values(json.loads(values.pop('f')))
+        else:
+            # TODO(dcramer): legacy pickle support - remove in Sentry 9.1
+            filters = pickle.loads(values.pop('f'))
+
+        incr_values = {}
+        extra_values = {}
+        for k, v in six.iteritems(values):
+            if k.startswith('i+'):
+                incr_values[k[2:]] = int(v)
+            elif k.startswith('e+'):
+                if v.startswith('['):
+                    extra_values[k[2:]] = self._load_value(json.loads(v))
+                else:
+                    # TODO(dcramer): legacy pickle support - remove in Sentry 9.1
+                    extra_values[k[2:]] = pickle.loads(v)
+
+        return model, incr_values, filters, extra_values
 
     def _process_single_incr(self, key):
         client = self.cluster.get_routing_client()
@@ -281,25 +450,56 @@ class RedisBuffer(Buffer):
                 self.logger.debug('buffer.revoked.empty', extra={'redis_key': key})
                 return
 
-            model = import_string(values.pop('m'))
-            if values['f'].startswith('{'):
-                filters = self._load_values(json.loads(values.pop('f')))
-            else:
-                # TODO(dcramer): legacy pickle support - remove in Sentry 9.1
-                filters = pickle.loads(values.pop('f'))
-
-            incr_values = {}
-            extra_values = {}
-            for k, v in six.iteritems(values):
-                if k.startswith('i+'):
-                    incr_values[k[2:]] = int(v)
-                elif k.startswith('e+'):
-                    if v.startswith('['):
-                        extra_values[k[2:]] = self._load_value(json.loads(v))
-                    else:
-                        # TODO(dcramer): legacy pickle support - remove in Sentry 9.1
-                        extra_values[k[2:]] = pickle.loads(v)
-
+            model, incr_values, filters, extra_values = self._load_incr(values)
             super(RedisBuffer, self).process(model, incr_values, filters, extra_values)
         finally:
             client.delete(lock_key)
+
+    def _process_batch_incrs(self, keys):
+        # prevent a stampede due to the way we use celery etas + duplicate
+        # tasks
+        with self.cluster.map() as conn:
+            locks = [
+                (key, conn.set(self._make_lock_key(key), '1', nx=True, ex=10)) for key in keys
+            ]
+
+        locked_keys = []
+        for key, result in locks:
+            if result.value:
+                locked_keys.append(key)
+            else:
+                metrics.incr('buffer.revoked', tags={'reason': 'locked'}, skip_internal=False)
+                self.logger.debug('buffer.revoked.locked', extra={'redis_key': key})
+
+        try:
+            # Read and clear all hashes with one pipeline per host.
+            router = self.cluster.get_router()
+            keys_by_host = defaultdict(list)
+            for key in locked_keys:
+                keys_by_host[router.get_host_for_key(key)].append(key)
+
+            payloads = {}
+            for host_id, host_keys in six.iteritems(keys_by_host):
+                pipe = self.cluster.get_local_client(host_id).pipeline()
+                for key in host_keys:
+                    pipe.hgetall(key)
+                    pipe.zrem(self._make_pending_key_from_key(key), key)
+                    pipe.delete(key)
+                results = pipe.execute()
+                for index, key in enumerate(host_keys):
+                    payloads[key] = results[index * 3]
+
+            items = []
+            for key in locked_keys:
+                values = payloads[key]
+                if not values:
+                    metrics.incr('buffer.revoked', tags={'reason': 'empty'}, skip_internal=False)
+                    self.logger.debug('buffer.revoked.empty', extra={'redis_key': key})
+                    continue
+                items.append(self._load_incr(values))
+
+            self.process_batch(items)
+        finally:
+            with self.cluster.map() as conn:
+                for key in locked_keys:
+                    conn.delete(self._make_lock_key(key))
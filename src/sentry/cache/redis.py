@@ -8,7 +8,9 @@ sentry.cache.redis
 
 from __future__ import absolute_import
 
-from sentry.utils import json
+import six
+
+from sentry.utils import json, metrics
 from sentry.utils.redis import get_cluster_from_options, redis_clusters
 
 from .base import BaseCache
@@ -47,6 +49,52 @@ class CommonRedisCache(BaseCache):
             result = json.loads(result)
         return result
 
+    def _get_values(self, keys):
+        pipe = self.client.pipeline(transaction=False)
+        for key in keys:
+            pipe.get(key)
+        return pipe.execute()
+
+    def _set_values(self, values, timeout):
+        pipe = self.client.pipeline(transaction=False)
+        for key, value in values:
+            if timeout:
+                pipe.setex(key, int(timeout), value)
+            else:
+                pipe.set(key, value)
+        pipe.execute()
+
+    def get_many(self, keys, version=None, raw=False):
+        keys = list(keys)
+        if not keys:
+            return {}
+        results = self._get_values([self.make_key(key, version=version) for key in keys])
+
+        rv = {}
+        size = 0
+        for key, result in zip(keys, results):
+            if result is None:
+                continue
+            size += len(result)
+            rv[key] = json.loads(result) if not raw else result
+        metrics.timing('cache.get_many.bytes', size)
+        return rv
+
+    def set_many(self, values, timeout, version=None, raw=False):
+        items = []
+        size = 0
+        for key, value in six.iteritems(values):
+            key = self.make_key(key, version=version)
+            v = json.dumps(value) if not raw else value
+            if len(v) > self.max_size:
+                raise ValueTooLarge('Cache key too large: %r %r' % (key, len(v)))
+            size += len(v)
+            items.append((key, v))
+        if not items:
+            return
+        self._set_values(items, timeout)
+        metrics.timing('cache.set_many.bytes', size)
+
 
 class RbCache(CommonRedisCache):
 
@@ -56,6 +104,19 @@ class RbCache(CommonRedisCache):
         client = cluster.get_routing_client()
         CommonRedisCache.__init__(self, client, **options)
 
+    def _get_values(self, keys):
+        with self.client.map() as client:
+            promises = [client.get(key) for key in keys]
+        return [promise.value for promise in promises]
+
+    def _set_values(self, values, timeout):
+        with self.client.map() as client:
+            for key, value in values:
+                if timeout:
+                    client.setex(key, int(timeout), value)
+                else:
+                    client.set(key, value)
+
 
 # Confusing legacy name for RbCache.  We don't actually have a pure redis cache
 RedisCache = RbCache
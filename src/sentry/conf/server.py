@@ -642,7 +642,11 @@ BGTASKS = {
     'sentry.bgtasks.clean_dsymcache:clean_dsymcache': {
         'interval': 5 * 60,
         'roles': ['worker'],
-    }
+    },
+    'sentry.bgtasks.clean_blobcache:clean_blobcache': {
+        'interval': 5 * 60,
+        'roles': ['worker'],
+    },
 }
 
 # Sentry logs to two major places: stdout, and it's internal project.
@@ -1046,6 +1050,17 @@ CACHES = {
 # CACHES backend.
 CACHE_VERSION = 1
 
+# An optional per-process cache in front of the shared cache for
+# ``get_from_cache`` lookups. ``size`` is the number of entries (0 disables
+# it) and ``ttl`` bounds how long an entry is used. Saves and deletes drop
+# entries in the same process; set ``cluster`` to a Redis cluster name to
+# broadcast them to all other processes as well.
+SENTRY_LOCAL_MODEL_CACHE = {
+    'size': 0,
+    'ttl': 10,
+    'cluster': None,
+}
+
 # Digests backend
 SENTRY_DIGESTS = 'sentry.digests.backends.dummy.DummyBackend'
 SENTRY_DIGESTS_OPTIONS = {}
@@ -1082,6 +1097,15 @@ SENTRY_TAGSTORE_OPTIONS = (
     else {}
 )
 
+# Index the tags of saved events in batches of up to ``size`` events, each
+# waiting at most ``delay`` seconds, queued in the given Redis cluster. With
+# a size of 0 every event is indexed by its own task.
+SENTRY_TAGSTORE_INDEX_BATCH = {
+    'size': 0,
+    'delay': 5,
+    'cluster': 'default',
+}
+
 # Search backend
 SENTRY_SEARCH = os.environ.get('SENTRY_SEARCH', 'sentry.search.snuba.SnubaSearchBackend')
 SENTRY_SEARCH_OPTIONS = {}
@@ -1155,6 +1179,10 @@ SENTRY_SOURCE_FETCH_SOCKET_TIMEOUT = 2
 # Maximum content length for source files before we abort fetching
 SENTRY_SOURCE_FETCH_MAX_SIZE = 40 * 1024 * 1024
 
+# Memory budget (in bytes of sourcemap JSON) for parsed sourcemaps that are
+# kept by each worker process and shared between events. 0 disables it.
+SENTRY_SOURCEMAP_CACHE_SIZE = 256 * 1024 * 1024
+
 # List of IP subnets which should not be accessible
 SENTRY_DISALLOWED_IPS = ()
 
@@ -1544,6 +1572,13 @@ SOUTH_TESTS_MIGRATE = os.environ.get('SOUTH_TESTS_MIGRATE', '0') == '1'
 TERMS_URL = None
 PRIVACY_URL = None
 
+# Models whose tables are range partitioned by day on their date column,
+# as ``app_label.ModelName``. Cleanup drops their expired partitions instead
+# of deleting the rows (see ``sentry.db.partitions``).
+SENTRY_PARTITIONED_MODELS = ()
+# The number of days for which cleanup creates partitions ahead of time.
+SENTRY_PARTITIONS_CREATE_AHEAD = 7
+
 # Toggles whether minidumps should be cached
 SENTRY_MINIDUMP_CACHE = False
 # The location for cached minidumps
@@ -1,5 +1,7 @@
 from __future__ import absolute_import, print_function
 
+from collections import defaultdict
+
 from batching_kafka_consumer import AbstractBatchWorker
 
 from django.conf import settings
@@ -46,13 +48,15 @@ class ConsumerWorker(AbstractBatchWorker):
         task.delay(cache_key=cache_key, start_time=start_time, event_id=event_id)
 
     def handle_save(self, message):
+        # Saves are deferred to ``flush_batch`` so that all events of the
+        # same project can be saved together.
         data = message['data']
-        event_id = data['event_id']
-        cache_key = message['cache_key']
-        start_time = message['start_time']
-        project_id = data['project']
-
-        store_tasks._do_save_event(cache_key, data, start_time, event_id, project_id)
+        return data['project'], {
+            'cache_key': message['cache_key'],
+            'data': data,
+            'start_time': message['start_time'],
+            'event_id': data['event_id'],
+        }
 
     def process_message(self, message):
         topic = message.topic()
@@ -63,7 +67,12 @@ class ConsumerWorker(AbstractBatchWorker):
         return handler(message)
 
     def flush_batch(self, batch):
-        pass
+        payloads_by_project = defaultdict(list)
+        for project_id, payload in batch:
+            payloads_by_project[project_id].append(payload)
+
+        for project_id, payloads in payloads_by_project.items():
+            store_tasks._do_save_events(project_id, payloads)
 
     def shutdown(self):
         pass
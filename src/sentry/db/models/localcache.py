@@ -0,0 +1,114 @@
+"""
+sentry.db.models.localcache
+~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+:copyright: (c) 2010-2019 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import
+
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.utils.functional import SimpleLazyObject
+
+from sentry.utils import json
+from sentry.utils.compat import pickle
+from sentry.utils.datastructures import LRUCache
+
+__all__ = ('LocalModelCache', 'local_model_cache')
+
+logger = logging.getLogger(__name__)
+
+
+class LocalModelCache(object):
+    """
+    A per-process tier in front of the shared model cache used by
+    ``BaseManager.get_from_cache``.
+
+    Values are kept pickled so every caller gets its own copy. Entries
+    expire after ``ttl`` seconds and are dropped when a model is saved or
+    deleted in this process. If ``cluster`` names a Redis cluster, the
+    invalidations are also broadcast to all other processes.
+    """
+
+    channel = 'sentry.modelcache.invalidate'
+
+    def __init__(self, size=0, ttl=10, cluster=None):
+        self.enabled = size > 0
+        self.cache = LRUCache(size, ttl=ttl)
+        self.cluster = cluster
+        self.subscriber_pid = None
+        self.lock = threading.Lock()
+
+    def _get_client(self):
+        from sentry.utils.redis import clusters
+        return clusters.get(self.cluster).get_local_client(0)
+
+    def get(self, key, version):
+        self._ensure_subscribed()
+        value = self.cache.get((key, version))
+        if value is None:
+            return None
+        return pickle.loads(value)
+
+    def set(self, key, version, value):
+        self.cache.set((key, version), pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+
+    def delete_many(self, keys, version, broadcast=True):
+        for key in keys:
+            self.cache.delete((key, version))
+
+        if broadcast and self.cluster is not None:
+            try:
+                client = self._get_client()
+                for key in keys:
+                    client.publish(self.channel, json.dumps([key, version]))
+            except Exception:
+                logger.warning('modelcache.broadcast-failed', exc_info=True)
+
+    def _ensure_subscribed(self):
+        """
+        Starts a thread listening for invalidations from other processes. It
+        is checked on every read as the thread does not survive a fork.
+        """
+        if self.cluster is None:
+            return
+
+        pid = os.getpid()
+        if self.subscriber_pid == pid:
+            return
+
+        with self.lock:
+            if self.subscriber_pid == pid:
+                return
+            self.subscriber_pid = pid
+
+        def run():
+            while True:
+                try:
+                    pubsub = self._get_client().pubsub(ignore_subscribe_messages=True)
+                    pubsub.subscribe(self.channel)
+                    # Invalidations may have been missed while we were not
+                    # subscribed.
+                    self.cache.clear()
+                    for message in pubsub.listen():
+                        key, version = json.loads(message['data'])
+                        self.cache.delete((key, version))
+                except Exception:
+                    logger.warning('modelcache.subscribe-failed', exc_info=True)
+                    self.cache.clear()
+                    time.sleep(1)
+
+        thread = threading.Thread(target=run, name='sentry.modelcache.subscriber')
+        thread.daemon = True
+        thread.start()
+
+
+local_model_cache = SimpleLazyObject(
+    lambda: LocalModelCache(**settings.SENTRY_LOCAL_MODEL_CACHE)
+)
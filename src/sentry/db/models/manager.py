@@ -23,6 +23,8 @@ from django.utils.encoding import smart_text
 
 from sentry import nodestore
 from sentry.db.models.fields import BoundedBigIntegerField
+from sentry.db.models.localcache import local_model_cache
+from sentry.utils import metrics
 from sentry.utils.cache import cache
 from sentry.utils.hashlib import md5_text
 from sentry.utils.validators import normalize_event_id
@@ -148,7 +150,15 @@ class BaseManager(Manager):
         """
         Pushes changes to an instance into the cache, and removes invalid (changed)
         lookup values.
+
+        The shared cache is updated before the local tiers are invalidated,
+        so that no process reloads the previous value from it.
         """
+        previous = self.__cache.get(instance)
+        self.__cache_instance(instance)
+        self.__invalidate_local(instance, previous)
+
+    def __cache_instance(self, instance):
         pk_name = instance._meta.pk.name
         pk_names = ('pk', pk_name)
         pk_val = instance.pk
@@ -198,6 +208,7 @@ class BaseManager(Manager):
         """
         Drops instance from all cache storages.
         """
+        previous = self.__cache.get(instance)
         pk_name = instance._meta.pk.name
         for key in self.cache_fields:
             if key in ('pk', pk_name):
@@ -213,6 +224,47 @@ class BaseManager(Manager):
             key=self.__get_lookup_cache_key(**{pk_name: instance.pk}),
             version=self.cache_version,
         )
+        self.__invalidate_local(instance, previous)
+
+    def __invalidate_local(self, instance, previous=None):
+        """
+        Drops an instance and the lookups pointing to it, with their
+        current and ``previous`` values, from the local cache tier of every
+        process.
+        """
+        if not local_model_cache.enabled:
+            return
+
+        pk_name = instance._meta.pk.name
+        keys = [self.__get_lookup_cache_key(**{pk_name: instance.pk})]
+        previous = previous or {}
+        for key in self.cache_fields:
+            if key in ('pk', pk_name):
+                continue
+            values = set([self.__value_for_field(instance, key)])
+            if key in previous:
+                values.add(previous[key])
+            keys.extend(self.__get_lookup_cache_key(**{key: v}) for v in values)
+        local_model_cache.delete_many(keys, self.cache_version)
+
+    def __get_cached(self, cache_key):
+        """
+        Reads a value from the local cache tier, falling back to the
+        shared cache.
+        """
+        if not local_model_cache.enabled:
+            return cache.get(cache_key, version=self.cache_version)
+
+        retval = local_model_cache.get(cache_key, self.cache_version)
+        metrics.incr('modelcache.local', skip_internal=True, tags={
+            'model': self.model.__name__,
+            'result': 'hit' if retval is not None else 'miss',
+        })
+        if retval is None:
+            retval = cache.get(cache_key, version=self.cache_version)
+            if retval is not None:
+                local_model_cache.set(cache_key, self.cache_version, retval)
+        return retval
 
     def __get_lookup_cache_key(self, **kwargs):
         return make_key(self.model, 'modelcache', kwargs)
@@ -259,11 +311,11 @@ class BaseManager(Manager):
         if key in self.cache_fields or key == pk_name:
             cache_key = self.__get_lookup_cache_key(**{key: value})
 
-            retval = cache.get(cache_key, version=self.cache_version)
+            retval = self.__get_cached(cache_key)
             if retval is None:
                 result = self.get(**kwargs)
                 # Ensure we're pushing it into the cache
-                self.__post_save(instance=result)
+                self.__cache_instance(instance=result)
                 return result
 
             # If we didn't look up by pk we need to hit the reffed
@@ -296,6 +348,8 @@ class BaseManager(Manager):
         pk_name = self.model._meta.pk.name
         cache_key = self.__get_lookup_cache_key(**{pk_name: instance_id})
         cache.delete(cache_key, version=self.cache_version)
+        if local_model_cache.enabled:
+            local_model_cache.delete_many([cache_key], self.cache_version)
 
     def post_save(self, instance, **kwargs):
         """
@@ -0,0 +1,164 @@
+"""
+sentry.db.partitions
+~~~~~~~~~~~~~~~~~~~~
+
+Retention for time partitioned tables.
+
+High volume tables (events, event mappings and event tags) can be set up
+as PostgreSQL (11+) range partitioned tables on their date column, with one
+partition per day named ``<table>_p<YYYYMMDD>``. This is not done by the
+migrations, an existing table has to be converted by the operator (the
+primary key and unique constraints need to include the date column). A
+default partition keeps rows that do not fall into any daily partition::
+
+    CREATE TABLE sentry_message_default PARTITION OF sentry_message DEFAULT;
+
+Models whose tables are partitioned are listed in
+``SENTRY_PARTITIONED_MODELS``. ``sentry cleanup`` then creates the
+partitions of the upcoming days and drops the partitions that only contain
+expired rows instead of deleting those rows one by one. Rows in partitions
+that are only partly expired are still deleted by the regular cleanup.
+
+:copyright: (c) 2010-2019 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+from __future__ import absolute_import
+
+import logging
+
+from collections import namedtuple
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from sentry.utils import db, metrics
+
+logger = logging.getLogger('sentry.partitions')
+
+PARTITION_INTERVAL = timedelta(days=1)
+PARTITION_SUFFIX = '_p'
+PARTITION_DATE_FORMAT = '%Y%m%d'
+
+Partition = namedtuple('Partition', 'name start end')
+
+
+def get_partition_name(table, start):
+    return '{}{}{}'.format(table, PARTITION_SUFFIX, start.strftime(PARTITION_DATE_FORMAT))
+
+
+def parse_partition_name(table, name):
+    """
+    Returns the ``Partition`` for a partition name created by
+    ``get_partition_name``, or ``None`` for other names (such as the default
+    partition).
+    """
+    prefix = table + PARTITION_SUFFIX
+    if not name.startswith(prefix):
+        return None
+    try:
+        start = datetime.strptime(name[len(prefix):], PARTITION_DATE_FORMAT)
+    except ValueError:
+        return None
+    start = start.replace(tzinfo=timezone.utc)
+    return Partition(name, start, start + PARTITION_INTERVAL)
+
+
+def get_expired_partitions(partitions, cutoff):
+    """
+    Returns the partitions whose rows are all older than ``cutoff``.
+    """
+    return [p for p in partitions if p.end <= cutoff]
+
+
+def is_partitioned_model(model):
+    label = u'{}.{}'.format(model._meta.app_label, model._meta.object_name)
+    return label in settings.SENTRY_PARTITIONED_MODELS
+
+
+class PartitionManager(object):
+    def __init__(self, model):
+        self.model = model
+        self.table = model._meta.db_table
+        self.using = router.db_for_write(model)
+
+    def _execute(self, sql, params=None):
+        cursor = connections[self.using].cursor()
+        cursor.execute(sql, params)
+        return cursor
+
+    def is_partitioned(self):
+        if not db.is_postgres(self.using):
+            return False
+        cursor = self._execute(
+            "select relkind from pg_class where relname = %s and relkind = 'p'",
+            [self.table],
+        )
+        return cursor.fetchone() is not None
+
+    def get_partitions(self):
+        cursor = self._execute(
+            """
+            select child.relname
+            from pg_inherits
+            join pg_class parent on pg_inherits.inhparent = parent.oid
+            join pg_class child on pg_inherits.inhrelid = child.oid
+            where parent.relname = %s
+            """,
+            [self.table],
+        )
+        partitions = []
+        for name, in cursor.fetchall():
+            partition = parse_partition_name(self.table, name)
+            if partition is not None:
+                partitions.append(partition)
+        return sorted(partitions, key=lambda p: p.start)
+
+    def create_partitions(self, start, end):
+        """
+        Creates the missing partitions for the days from ``start`` until
+        ``end``.
+        """
+        quote_name = connections[self.using].ops.quote_name
+        existing = set(p.name for p in self.get_partitions())
+
+        day = start.replace(hour=0, minute=0, second=0, microsecond=0)
+        created = []
+        while day < end:
+            name = get_partition_name(self.table, day)
+            if name not in existing:
+                # Rows for this day that already ended up in the default
+                # partition prevent creating it, keep them there.
+                try:
+                    with transaction.atomic(using=self.using):
+                        self._execute(
+                            u'create table {} partition of {} for values from (%s) to (%s)'.format(
+                                quote_name(name), quote_name(self.table),
+                            ),
+                            [day, day + PARTITION_INTERVAL],
+                        )
+                except Exception:
+                    logger.warning('Failed to create partition %s', name, exc_info=True)
+                else:
+                    created.append(name)
+            day += PARTITION_INTERVAL
+        return created
+
+    def drop_expired_partitions(self, cutoff):
+        """
+        Detaches and drops all partitions that only contain rows older than
+        ``cutoff``.
+        """
+        quote_name = connections[self.using].ops.quote_name
+        dropped = []
+        for partition in get_expired_partitions(self.get_partitions(), cutoff):
+            with transaction.atomic(using=self.using):
+                self._execute(u'alter table {} detach partition {}'.format(
+                    quote_name(self.table), quote_name(partition.name),
+                ))
+                self._execute(u'drop table {}'.format(quote_name(partition.name)))
+            dropped.append(partition.name)
+
+        metrics.incr('cleanup.partitions.dropped', len(dropped),
+                     instance=self.table, skip_internal=True)
+        return dropped
@@ -187,7 +187,11 @@ class ModelDeletionTask(BaseDeletionTask):
             if not queryset:
                 return False
 
-            self.delete_bulk(queryset)
+            has_more = self.delete_bulk(queryset)
+            # A partial batch means that everything that matched was deleted,
+            # which saves another round for the caller.
+            if not has_more and len(queryset) < query_limit:
+                return False
             remaining -= query_limit
         return True
 
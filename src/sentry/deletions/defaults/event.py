@@ -1,6 +1,11 @@
 from __future__ import absolute_import, print_function
 
+import six
+
+from collections import defaultdict
+
 from sentry import nodestore
+from sentry.utils.query import bulk_delete_objects
 
 from ..base import (BaseDeletionTask, BaseRelation, ModelDeletionTask, ModelRelation)
 
@@ -16,18 +21,22 @@ class NodeDeletionTask(BaseDeletionTask):
 
 
 class EventDeletionTask(ModelDeletionTask):
-    def get_child_relations(self, instance):
+    def get_child_relations_bulk(self, instance_list):
         from sentry import models
-        relations = super(EventDeletionTask, self).get_child_relations(instance)
-        key = {'project_id': instance.project_id, 'event_id': instance.event_id}
-        relations.extend([
-            ModelRelation(models.EventAttachment, key),
-            ModelRelation(models.EventMapping, key),
-            ModelRelation(models.UserReport, key),
-        ])
-        return relations
 
-    def get_child_relations_bulk(self, instance_list):
+        relations = []
+
+        event_ids = defaultdict(list)
+        for i in instance_list:
+            event_ids[i.project_id].append(i.event_id)
+        for project_id, project_event_ids in six.iteritems(event_ids):
+            key = {'project_id': project_id, 'event_id__in': project_event_ids}
+            relations.extend([
+                ModelRelation(models.EventAttachment, key),
+                ModelRelation(models.EventMapping, key),
+                ModelRelation(models.UserReport, key),
+            ])
+
         node_ids = []
         for i in instance_list:
             node_ids.append(i.data.id)
@@ -36,4 +45,16 @@ class EventDeletionTask(ModelDeletionTask):
             # runs, when the Event itself is deleted.
             i.data = None
 
-        return [BaseRelation({'nodes': node_ids}, NodeDeletionTask)]
+        relations.append(BaseRelation({'nodes': node_ids}, NodeDeletionTask))
+        return relations
+
+    def delete_instance_bulk(self, instance_list):
+        # Nothing references events and their node data is removed by the
+        # NodeDeletionTask above, which is all the delete signals would do,
+        # so the whole batch is removed with a single statement.
+        bulk_delete_objects(
+            model=self.model,
+            limit=len(instance_list),
+            transaction_id=self.transaction_id,
+            id__in=[i.id for i in instance_list],
+        )
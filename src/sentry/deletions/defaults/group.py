@@ -4,7 +4,7 @@ from ..base import ModelDeletionTask, ModelRelation
 
 
 class GroupDeletionTask(ModelDeletionTask):
-    def get_child_relations(self, instance):
+    def get_child_relations_bulk(self, instance_list):
         from sentry import models
         from sentry.incidents.models import IncidentGroup
 
@@ -36,7 +36,9 @@ class GroupDeletionTask(ModelDeletionTask):
             models.Event,
         )
 
-        relations.extend([ModelRelation(m, {'group_id': instance.id}) for m in model_list])
+        # The children of the whole batch are deleted together.
+        group_ids = [i.id for i in instance_list]
+        relations.extend([ModelRelation(m, {'group_id__in': group_ids}) for m in model_list])
 
         return relations
 
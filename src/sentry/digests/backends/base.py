@@ -56,7 +56,10 @@ class Backend(Service):
     be preempted by a new record being added to the timeline, requiring it to
     be transitioned to "waiting" instead.)
     """
-    __all__ = ('add', 'delete', 'digest', 'enabled', 'maintenance', 'schedule', 'validate')
+    __all__ = (
+        'add', 'delete', 'digest', 'digest_batch', 'enabled', 'maintenance', 'schedule',
+        'validate',
+    )
 
     def __init__(self, **options):
         # The ``minimum_delay`` option defines the default minimum amount of
@@ -159,6 +162,34 @@ class Backend(Service):
         """
         raise NotImplementedError
 
+    def digest_batch(self, keys, minimum_delay=None):
+        """
+        Extract records from several timelines for processing at once.
+
+        This method acts as a context manager like ``digest``. The target of
+        the ``as`` clause is a dictionary that maps the key of every timeline
+        that could be opened to the records of its digest. Timelines that are
+        not in the "ready" state, or are locked by another digest, are left
+        out. ``minimum_delay`` can also be a dictionary with the delay of
+        every timeline.
+
+        If the context manager successfully exits, all timelines that are
+        still part of the dictionary are closed as if their ``digest`` block
+        had exited. Keys that are removed from the dictionary (for example
+        because their records could not be processed) keep their records and
+        state, as does every timeline if an exception is raised.
+
+        For example::
+
+            with timelines.digest_batch(['project:1', 'project:2']) as digests:
+                messages = [build_digest_email(records) for records in digests.values()]
+
+            for message in messages:
+                message.send_async()
+
+        """
+        raise NotImplementedError
+
     def schedule(self, deadline):
         """
         Identify timelines that are ready for processing.
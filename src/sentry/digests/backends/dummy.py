@@ -16,6 +16,10 @@ class DummyBackend(Backend):
     def digest(self, key, minimum_delay=None):
         yield []
 
+    @contextmanager
+    def digest_batch(self, keys, minimum_delay=None):
+        yield {}
+
     def schedule(self, deadline):
         return
         yield  # make this a generator
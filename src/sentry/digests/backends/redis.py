@@ -4,11 +4,14 @@ import logging
 import six
 import time
 
+from collections import OrderedDict, defaultdict
 from contextlib import contextmanager
 from redis.client import ResponseError
 
 from sentry.digests import Record, ScheduleEntry
 from sentry.digests.backends.base import Backend, InvalidState
+from sentry.utils import metrics
+from sentry.utils.locking import UnableToAcquireLock
 from sentry.utils.locking.backends.redis import RedisLockBackend
 from sentry.utils.locking.manager import LockManager
 from sentry.utils.redis import (check_cluster_versions, get_cluster_from_options, load_script)
@@ -227,15 +230,7 @@ class RedisBackend(Backend):
                 else:
                     raise
 
-            records = map(
-                lambda key__value__timestamp: Record(
-                    key__value__timestamp[0],
-                    self.codec.decode(
-                        key__value__timestamp[1]) if key__value__timestamp[1] is not None else None,
-                    float(key__value__timestamp[2]),
-                ),
-                response,
-            )
+            records = self._decode_records(response)
 
             # If the record value is `None`, this means the record data was
             # missing (it was presumably evicted by Redis) so we don't need to
@@ -252,6 +247,96 @@ class RedisBackend(Backend):
                 [record.key for record in records],
             )
 
+    def _decode_records(self, response):
+        return map(
+            lambda key__value__timestamp: Record(
+                key__value__timestamp[0],
+                self.codec.decode(
+                    key__value__timestamp[1]) if key__value__timestamp[1] is not None else None,
+                float(key__value__timestamp[2]),
+            ),
+            response,
+        )
+
+    @contextmanager
+    def digest_batch(self, keys, minimum_delay=None, timestamp=None):
+        if not isinstance(minimum_delay, dict):
+            minimum_delay = dict.fromkeys(keys, minimum_delay)
+
+        if timestamp is None:
+            timestamp = time.time()
+
+        router = self.cluster.get_router()
+        locks = []
+        try:
+            # The timelines are opened and closed with one pipeline per host.
+            # The locks are held for the whole batch, give them some extra
+            # time for every timeline that is processed.
+            keys_by_host = defaultdict(list)
+            for key in keys:
+                lock = self._get_timeline_lock(key, duration=30 + len(keys))
+                try:
+                    lock.acquire()
+                except UnableToAcquireLock as error:
+                    logger.info('Skipped digest delivery: %s', error)
+                    continue
+                locks.append(lock)
+                keys_by_host[router.get_host_for_key(
+                    u'{}:t:{}'.format(self.namespace, key))].append(key)
+
+            digests = OrderedDict()
+            records_by_key = {}
+            for host, host_keys in six.iteritems(keys_by_host):
+                with self.cluster.get_local_client(host).pipeline(transaction=False) as pipe:
+                    for key in host_keys:
+                        script(
+                            pipe, [key], [
+                                'DIGEST_OPEN',
+                                self.namespace,
+                                self.ttl,
+                                timestamp,
+                                key,
+                                self.capacity if self.capacity else -1,
+                            ]
+                        )
+                    responses = pipe.execute(raise_on_error=False)
+
+                for key, response in zip(host_keys, responses):
+                    if isinstance(response, ResponseError):
+                        if 'err(invalid_state):' in six.text_type(response):
+                            logger.info('Skipped digest delivery of %r: '
+                                        'Timeline is not in the ready state.', key)
+                        else:
+                            logger.error('Failed to open digest %r due to error: %r',
+                                         key, response)
+                        continue
+                    records = records_by_key[key] = self._decode_records(response)
+                    digests[key] = [record for record in records if record.value is not None]
+
+            metrics.timing('digests.batch.size', len(digests))
+
+            yield digests
+
+            for host, host_keys in six.iteritems(keys_by_host):
+                host_keys = [key for key in host_keys if key in digests]
+                if not host_keys:
+                    continue
+                with self.cluster.get_local_client(host).pipeline(transaction=False) as pipe:
+                    for key in host_keys:
+                        delay = minimum_delay.get(key)
+                        script(
+                            pipe,
+                            [key],
+                            [
+                                'DIGEST_CLOSE', self.namespace, self.ttl, timestamp, key,
+                                self.minimum_delay if delay is None else delay,
+                            ] + [record.key for record in records_by_key[key]],
+                        )
+                    pipe.execute()
+        finally:
+            for lock in locks:
+                lock.release()
+
     def delete(self, key, timestamp=None):
         if timestamp is None:
             timestamp = time.time()
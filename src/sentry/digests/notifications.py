@@ -1,5 +1,6 @@
 from __future__ import absolute_import
 
+import copy
 import functools
 import itertools
 import logging
@@ -54,29 +55,62 @@ def event_to_record(event, rules):
 
 
 def fetch_state(project, records):
+    return fetch_states(project, [records])[0]
+
+
+def fetch_states(project, records_list):
+    """
+    Fetches the state for several digests of the same project. Groups and
+    rules are loaded once for all of them, and the TSDB counts once for
+    every distinct time range.
+    """
     # This reads a little strange, but remember that records are returned in
     # reverse chronological order, and we query the database in chronological
     # order.
     # NOTE: This doesn't account for any issues that are filtered out later.
-    start = records[-1].datetime
-    end = records[0].datetime
+    windows = [(records[-1].datetime, records[0].datetime) for records in records_list]
+
+    groups = Group.objects.in_bulk(set(
+        record.value.event.group_id for records in records_list for record in records
+    ))
+    rules = Rule.objects.in_bulk(set(itertools.chain.from_iterable(
+        record.value.rules for records in records_list for record in records
+    )))
+
+    group_ids_by_window = defaultdict(set)
+    for window, records in zip(windows, records_list):
+        group_ids_by_window[window].update(
+            record.value.event.group_id for record in records
+            if record.value.event.group_id in groups
+        )
 
-    groups = Group.objects.in_bulk(record.value.event.group_id for record in records)
-    return {
-        'project':
-        project,
-        'groups':
-        groups,
-        'rules':
-        Rule.objects.
-        in_bulk(itertools.chain.from_iterable(record.value.rules for record in records)),
-        'event_counts':
-        tsdb.get_sums(tsdb.models.group, groups.keys(), start, end),
-        'user_counts':
-        tsdb.get_distinct_counts_totals(
-            tsdb.models.users_affected_by_group, groups.keys(), start, end
-        ),
-    }
+    counts = {}
+    for (start, end), group_ids in six.iteritems(group_ids_by_window):
+        counts[(start, end)] = (
+            tsdb.get_sums(tsdb.models.group, list(group_ids), start, end),
+            tsdb.get_distinct_counts_totals(
+                tsdb.models.users_affected_by_group, list(group_ids), start, end
+            ),
+        )
+
+    states = []
+    for window, records in zip(windows, records_list):
+        group_ids = set(
+            record.value.event.group_id for record in records
+            if record.value.event.group_id in groups
+        )
+        rule_ids = set(itertools.chain.from_iterable(record.value.rules for record in records))
+        event_counts, user_counts = counts[window]
+        states.append({
+            'project': project,
+            # Every digest gets its own copies since the counts for its time
+            # range are attached to them.
+            'groups': {id: copy.copy(groups[id]) for id in group_ids},
+            'rules': {id: rules[id] for id in rule_ids if id in rules},
+            'event_counts': {id: event_counts[id] for id in group_ids},
+            'user_counts': {id: user_counts[id] for id in group_ids},
+        })
+    return states
 
 
 def attach_state(project, groups, rules, event_counts, user_counts):
@@ -11,7 +11,9 @@ import jsonschema
 import logging
 import six
 
+from collections import defaultdict, OrderedDict
 from datetime import datetime, timedelta
+from fractions import gcd
 from django.conf import settings
 from django.db import connection, IntegrityError, router, transaction
 from django.db.models import Func
@@ -55,12 +57,13 @@ from sentry.utils.data_filters import (
     is_valid_error_message,
     FilterStatKeys,
 )
-from sentry.utils.dates import to_timestamp
+from sentry.utils.dates import to_datetime, to_timestamp
 from sentry.utils.db import is_postgres
 from sentry.utils.geo import rust_geoip
 from sentry.utils.safe import safe_execute, trim, get_path, setdefault_path
 from sentry.stacktraces.processing import normalize_stacktraces_for_grouping
 from sentry.culprit import generate_culprit
+from six.moves import reduce
 
 
 logger = logging.getLogger("sentry.events")
@@ -255,6 +258,355 @@ def _decode_event(data, content_encoding):
     return CanonicalKeyDict(data)
 
 
+class PendingEvent(object):
+    """
+    The state of an event that went through grouping but has not been
+    persisted yet.
+    """
+
+    def __init__(self, manager, event, group, hashes, release, environment,
+                 event_user, is_new, is_regression, is_sample,
+                 is_new_group_environment, recorded_timestamp, received_timestamp):
+        self.manager = manager
+        self.event = event
+        self.group = group
+        self.hashes = hashes
+        self.release = release
+        self.environment = environment
+        self.event_user = event_user
+        self.is_new = is_new
+        self.is_regression = is_regression
+        self.is_sample = is_sample
+        self.is_new_group_environment = is_new_group_environment
+        self.recorded_timestamp = recorded_timestamp
+        self.received_timestamp = received_timestamp
+        self.counters = []
+        self.frequencies = []
+
+
+class EventBatch(object):
+    """
+    Shared state for saving one or more events of the same project.
+
+    Lookups that would otherwise repeat for every event (project, releases,
+    environments, group hashes and groups) are memoized, and TSDB and buffer
+    writes are collected here so they can be coalesced and sent once the
+    whole batch has been persisted.
+    """
+
+    def __init__(self, project_id):
+        self.project = Project.objects.get_from_cache(id=project_id)
+        self.project._organization_cache = Organization.objects.get_from_cache(
+            id=self.project.organization_id)
+
+        self._releases = {}
+        self._dists = {}
+        self._environments = {}
+        self._group_hashes = {}
+        self._groups = {}
+
+        self._counters = defaultdict(int)
+        self._frequencies = defaultdict(int)
+        self._distinct_counters = defaultdict(set)
+        self._buffer = OrderedDict()
+
+        # All rollup intervals are multiples of this resolution, so writes
+        # that are normalized to it land in exactly the same TSDB buckets.
+        self._tsdb_resolution = reduce(gcd, tsdb.get_rollups().keys())
+
+    def get_existing_events(self, event_ids):
+        if not event_ids:
+            return {}
+
+        return {
+            event.event_id: event for event in Event.objects.filter(
+                project_id=self.project.id,
+                event_id__in=event_ids,
+            )
+        }
+
+    def get_release(self, version, date):
+        release = self._releases.get(version)
+        if release is None:
+            release = self._releases[version] = Release.get_or_create(
+                project=self.project,
+                version=version,
+                date_added=date,
+            )
+        return release
+
+    def get_dist(self, release, name, date):
+        key = (release.id, name)
+        dist = self._dists.get(key)
+        if dist is None:
+            dist = self._dists[key] = release.add_dist(name, date)
+        return dist
+
+    def get_environment(self, name):
+        environment = self._environments.get(name)
+        if environment is None:
+            environment = self._environments[name] = Environment.get_or_create(
+                project=self.project,
+                name=name,
+            )
+        return environment
+
+    def get_group_hashes(self, hashes):
+        missing = [h for h in hashes if h not in self._group_hashes]
+        if missing:
+            for group_hash in GroupHash.objects.filter(project=self.project, hash__in=missing):
+                self._group_hashes[group_hash.hash] = group_hash
+
+            for hash in missing:
+                if hash not in self._group_hashes:
+                    self._group_hashes[hash] = GroupHash.objects.get_or_create(
+                        project=self.project,
+                        hash=hash,
+                    )[0]
+
+        return [self._group_hashes[h] for h in hashes]
+
+    def get_group(self, group_id):
+        group = self._groups.get(group_id)
+        if group is None:
+            group = self._groups[group_id] = Group.objects.get(id=group_id)
+        return group
+
+    def add_group(self, group):
+        self._groups[group.id] = group
+
+    def insert_event_mappings(self, pending_events):
+        """
+        Inserts ``EventMapping`` rows for sampled events, returning the ids
+        of the events that were already mapped.
+        """
+        mappings = [
+            EventMapping(
+                project=self.project,
+                group=pending.group,
+                event_id=pending.event.event_id,
+            ) for pending in pending_events
+        ]
+        return self._bulk_insert(EventMapping, mappings)
+
+    def insert_events(self, pending_events):
+        """
+        Inserts the ``Event`` rows of all unsampled events, returning the ids
+        of the events that were already stored.
+        """
+        events = [pending.event for pending in pending_events]
+        duplicates = self._bulk_insert(Event, events)
+
+        # ``bulk_create`` does not populate primary keys, but they are needed
+        # for tag indexing and the event stream.
+        unsaved = [e.event_id for e in events if e.id is None and e.event_id not in duplicates]
+        if unsaved:
+            ids = dict(
+                Event.objects.filter(
+                    project_id=self.project.id,
+                    event_id__in=unsaved,
+                ).values_list('event_id', 'id')
+            )
+            for event in events:
+                if event.id is None and event.event_id in ids:
+                    event.id = ids[event.event_id]
+                    event._state.adding = False
+                    event._state.db = router.db_for_write(Event)
+
+        return duplicates
+
+    def _bulk_insert(self, model, instances):
+        using = router.db_for_write(model)
+        if len(instances) > 1:
+            try:
+                with transaction.atomic(using=using):
+                    model.objects.bulk_create(instances)
+            except IntegrityError:
+                # At least one row already exists, retry one by one to
+                # figure out which.
+                pass
+            else:
+                return set()
+
+        duplicates = set()
+        for instance in instances:
+            try:
+                with transaction.atomic(using=using):
+                    instance.save()
+            except IntegrityError:
+                logger.info(
+                    'duplicate.found',
+                    exc_info=True,
+                    extra={
+                        'event_uuid': instance.event_id,
+                        'project_id': self.project.id,
+                        'group_id': instance.group_id,
+                        'model': model.__name__,
+                    }
+                )
+                duplicates.add(instance.event_id)
+        return duplicates
+
+    def _normalize_timestamp(self, timestamp):
+        return tsdb.normalize_to_epoch(timestamp, self._tsdb_resolution)
+
+    def incr_tsdb(self, items, timestamp, environment_id):
+        epoch = self._normalize_timestamp(timestamp)
+        for model, key in items:
+            self._counters[(environment_id, epoch, model, key)] += 1
+
+    def record_frequencies(self, requests, timestamp):
+        epoch = self._normalize_timestamp(timestamp)
+        for model, request in requests:
+            for key, items in six.iteritems(request):
+                for member, score in six.iteritems(items):
+                    self._frequencies[(epoch, model, key, member)] += score
+
+    def record_distinct(self, items, timestamp, environment_id):
+        epoch = self._normalize_timestamp(timestamp)
+        for model, key, values in items:
+            self._distinct_counters[(environment_id, epoch, model, key)].update(values)
+
+    def buffer_incr(self, model, columns, filters, extra=None):
+        """
+        Like ``buffer.incr`` but sums up columns and merges extra values
+        (last write wins) for all writes to the same row.
+        """
+        key = (model, tuple(sorted(six.iteritems(filters))))
+        pending = self._buffer.get(key)
+        if pending is None:
+            pending = self._buffer[key] = (model, defaultdict(int), filters, {})
+
+        _, pending_columns, _, pending_extra = pending
+        for column, value in six.iteritems(columns):
+            pending_columns[column] += value
+        if extra:
+            pending_extra.update(extra)
+
+    def flush(self):
+        """
+        Sends all collected TSDB and buffer writes.
+        """
+        counters = defaultdict(list)
+        for (environment_id, epoch, model, key), count in six.iteritems(self._counters):
+            counters[(environment_id, epoch, count)].append((model, key))
+        for (environment_id, epoch, count), items in six.iteritems(counters):
+            tsdb.incr_multi(
+                items,
+                timestamp=to_datetime(epoch),
+                count=count,
+                environment_id=environment_id,
+            )
+
+        frequencies = defaultdict(lambda: defaultdict(lambda: defaultdict(dict)))
+        for (epoch, model, key, member), score in six.iteritems(self._frequencies):
+            frequencies[epoch][model][key][member] = score
+        for epoch, requests in six.iteritems(frequencies):
+            tsdb.record_frequency_multi(
+                [(model, dict(request)) for model, request in six.iteritems(requests)],
+                timestamp=to_datetime(epoch),
+            )
+
+        distinct_counters = defaultdict(list)
+        for (environment_id, epoch, model, key), values in six.iteritems(self._distinct_counters):
+            distinct_counters[(environment_id, epoch)].append((model, key, tuple(values)))
+        for (environment_id, epoch), items in six.iteritems(distinct_counters):
+            tsdb.record_multi(
+                items,
+                timestamp=to_datetime(epoch),
+                environment_id=environment_id,
+            )
+
+        for model, columns, row_filters, extra in six.itervalues(self._buffer):
+            buffer.incr(model, dict(columns), row_filters, extra or None)
+
+        self._counters.clear()
+        self._frequencies.clear()
+        self._distinct_counters.clear()
+        self._buffer.clear()
+
+
+def save_many(project_id, managers, raw=False, assume_normalized=False):
+    """
+    Saves several events of the same project at once.
+
+    This is equivalent to calling ``EventManager.save`` for each manager, but
+    lookups are shared across the batch, ``Event`` and ``EventMapping`` rows
+    are inserted in bulk and TSDB and buffer writes are coalesced.
+
+    Returns a list with one entry per manager, which is either the saved
+    ``Event`` or the ``HashDiscarded`` exception raised for it.
+    """
+    batch = EventBatch(project_id)
+    results = [None] * len(managers)
+
+    seen = {}
+    candidates = []
+    for index, manager in enumerate(managers):
+        manager._ensure_normalized(assume_normalized)
+        event_id = manager._data['event_id']
+        if event_id in seen:
+            # The same event was submitted more than once within the batch,
+            # it will resolve to whatever the first one resolved to.
+            results[index] = seen[event_id]
+        else:
+            seen[event_id] = index
+            candidates.append((index, manager))
+
+    existing_events = batch.get_existing_events(list(seen))
+
+    pending_events = {}
+    for index, manager in candidates:
+        try:
+            results[index] = manager._prepare_save(batch, existing_events)
+        except HashDiscarded as e:
+            results[index] = e
+        else:
+            if isinstance(results[index], PendingEvent):
+                pending_events[index] = results[index]
+
+    sampled = [p for p in six.itervalues(pending_events) if p.is_sample]
+    unsampled = [p for p in six.itervalues(pending_events) if not p.is_sample]
+
+    # Sampled events that were already mapped are dropped entirely while the
+    # counters of duplicate events are still recorded, which matches what
+    # happens when the events are saved one by one.
+    mapped_duplicates = batch.insert_event_mappings(sampled) if sampled else set()
+    event_duplicates = batch.insert_events(unsampled) if unsampled else set()
+
+    published = []
+    for index in sorted(pending_events):
+        pending = pending_events[index]
+        event_id = pending.event.event_id
+        if pending.is_sample and event_id in mapped_duplicates:
+            continue
+
+        for counters, timestamp, environment_id in pending.counters:
+            batch.incr_tsdb(counters, timestamp, environment_id)
+        for frequencies, timestamp in pending.frequencies:
+            batch.record_frequencies(frequencies, timestamp)
+
+        if not pending.is_sample and event_id in event_duplicates:
+            continue
+
+        pending.manager._finish_save(batch, pending, raw=raw)
+        published.append(pending)
+
+    batch.flush()
+
+    for pending in published:
+        pending.manager._publish_save(pending, raw=raw)
+
+    for index, result in enumerate(results):
+        if isinstance(result, PendingEvent):
+            results[index] = result.event
+    for index, result in enumerate(results):
+        if isinstance(result, six.integer_types):
+            results[index] = results[result]
+
+    return results
+
+
 class EventManager(object):
     """
     Handles normalization in both the store endpoint and the save task. The
@@ -500,31 +852,39 @@ class EventManager(object):
         return trim(message.strip(), settings.SENTRY_MAX_MESSAGE_LENGTH)
 
     def save(self, project_id, raw=False, assume_normalized=False):
+        result, = save_many(
+            project_id,
+            [self],
+            raw=raw,
+            assume_normalized=assume_normalized,
+        )
+        if isinstance(result, HashDiscarded):
+            raise result
+        return result
+
+    def _ensure_normalized(self, assume_normalized=False):
         # Normalize if needed
         if not self._normalized:
             if not assume_normalized:
                 self.normalize()
             self._normalized = True
 
+    def _prepare_save(self, batch, existing_events):
+        """
+        Runs grouping for the event and returns a ``PendingEvent`` that is
+        ready to be inserted, or the already stored ``Event`` if this event
+        was saved before.
+        """
         data = self._data
-
-        project = Project.objects.get_from_cache(id=project_id)
-        project._organization_cache = Organization.objects.get_from_cache(
-            id=project.organization_id)
+        project = batch.project
 
         # Check to make sure we're not about to do a bunch of work that's
         # already been done if we've processed an event with this ID. (This
         # isn't a perfect solution -- this doesn't handle ``EventMapping`` and
         # there's a race condition between here and when the event is actually
         # saved, but it's an improvement. See GH-7677.)
-        try:
-            event = Event.objects.get(
-                project_id=project.id,
-                event_id=data['event_id'],
-            )
-        except Event.DoesNotExist:
-            pass
-        else:
+        event = existing_events.get(data['event_id'])
+        if event is not None:
             # Make sure we cache on the project before returning
             event._project_cache = project
             logger.info(
@@ -560,7 +920,7 @@ class EventManager(object):
 
         # We need to swap out the data with the one internal to the newly
         # created event object
-        event = self._get_event_instance(project_id=project_id)
+        event = self._get_event_instance(project_id=project.id)
         self._data = data = event.data.data
 
         event._project_cache = project
@@ -588,15 +948,11 @@ class EventManager(object):
         if release:
             # dont allow a conflicting 'release' tag
             pop_tag(data, 'release')
-            release = Release.get_or_create(
-                project=project,
-                version=release,
-                date_added=date,
-            )
+            release = batch.get_release(release, date)
             set_tag(data, 'sentry:release', release.version)
 
         if dist and release:
-            dist = release.add_dist(dist, date)
+            dist = batch.get_dist(release, dist, date)
             # dont allow a conflicting 'dist' tag
             pop_tag(data, 'dist')
             set_tag(data, 'sentry:dist', dist.name)
@@ -687,7 +1043,7 @@ class EventManager(object):
 
         try:
             group, is_new, is_regression, is_sample = self._save_aggregate(
-                event=event, hashes=hashes, release=release, **kwargs
+                batch=batch, event=event, hashes=hashes, release=release, **kwargs
             )
         except HashDiscarded:
             event_discarded.send_robust(
@@ -715,32 +1071,7 @@ class EventManager(object):
         # store a reference to the group id to guarantee validation of isolation
         event.data.bind_ref(event)
 
-        # When an event was sampled, the canonical source of truth
-        # is the EventMapping table since we aren't going to be writing out an actual
-        # Event row. Otherwise, if the Event isn't being sampled, we can safely
-        # rely on the Event table itself as the source of truth and ignore
-        # EventMapping since it's redundant information.
-        if is_sample:
-            try:
-                with transaction.atomic(using=router.db_for_write(EventMapping)):
-                    EventMapping.objects.create(project=project, group=group, event_id=event_id)
-            except IntegrityError:
-                logger.info(
-                    'duplicate.found',
-                    exc_info=True,
-                    extra={
-                        'event_uuid': event_id,
-                        'project_id': project.id,
-                        'group_id': group.id,
-                        'model': EventMapping.__name__,
-                    }
-                )
-                return event
-
-        environment = Environment.get_or_create(
-            project=project,
-            name=environment,
-        )
+        environment = batch.get_environment(environment)
 
         group_environment, is_new_group_environment = GroupEnvironment.get_or_create(
             group_id=group.id,
@@ -772,6 +1103,22 @@ class EventManager(object):
                 datetime=date,
             )
 
+        pending = PendingEvent(
+            manager=self,
+            event=event,
+            group=group,
+            hashes=hashes,
+            release=release,
+            environment=environment,
+            event_user=event_user,
+            is_new=is_new,
+            is_regression=is_regression,
+            is_sample=is_sample,
+            is_new_group_environment=is_new_group_environment,
+            recorded_timestamp=recorded_timestamp,
+            received_timestamp=received_timestamp,
+        )
+
         counters = [
             (tsdb.models.group, group.id),
             (tsdb.models.project, project.id),
@@ -780,7 +1127,7 @@ class EventManager(object):
         if release:
             counters.append((tsdb.models.release, release.id))
 
-        tsdb.incr_multi(counters, timestamp=event.datetime, environment_id=environment.id)
+        pending.counters.append((counters, event.datetime, environment.id))
 
         frequencies = [
             # (tsdb.models.frequent_projects_by_organization, {
@@ -809,7 +1156,7 @@ class EventManager(object):
                 })
             )
 
-        tsdb.record_frequency_multi(frequencies, timestamp=event.datetime)
+        pending.frequencies.append((frequencies, event.datetime))
 
         UserReport.objects.filter(
             project=project,
@@ -819,24 +1166,20 @@ class EventManager(object):
             environment=environment,
         )
 
-        # save the event unless its been sampled
-        if not is_sample:
-            try:
-                with transaction.atomic(using=router.db_for_write(Event)):
-                    event.save()
-            except IntegrityError:
-                logger.info(
-                    'duplicate.found',
-                    exc_info=True,
-                    extra={
-                        'event_uuid': event_id,
-                        'project_id': project.id,
-                        'group_id': group.id,
-                        'model': Event.__name__,
-                    }
-                )
-                return event
+        return pending
 
+    def _finish_save(self, batch, pending, raw=False):
+        """
+        Records everything that depends on the event having been stored.
+        """
+        project = batch.project
+        event = pending.event
+        group = pending.group
+        environment = pending.environment
+        release = pending.release
+        event_user = pending.event_user
+
+        if not pending.is_sample:
             tagstore.delay_index_event_tags(
                 organization_id=project.organization_id,
                 project_id=project.id,
@@ -848,7 +1191,7 @@ class EventManager(object):
             )
 
         if event_user:
-            tsdb.record_multi(
+            batch.record_distinct(
                 (
                     (tsdb.models.users_affected_by_group, group.id, (event_user.tag_value, )),
                     (tsdb.models.users_affected_by_project, project.id, (event_user.tag_value, )),
@@ -857,15 +1200,15 @@ class EventManager(object):
                 environment_id=environment.id,
             )
         if release:
-            if is_new:
-                buffer.incr(
+            if pending.is_new:
+                batch.buffer_incr(
                     ReleaseProject, {'new_groups': 1}, {
                         'release_id': release.id,
                         'project_id': project.id,
                     }
                 )
-            if is_new_group_environment:
-                buffer.incr(
+            if pending.is_new_group_environment:
+                batch.buffer_incr(
                     ReleaseProjectEnvironment, {'new_issues_count': 1}, {
                         'project_id': project.id,
                         'release_id': release.id,
@@ -882,17 +1225,20 @@ class EventManager(object):
 
         if not raw:
             if not project.first_event:
-                project.update(first_event=date)
+                project.update(first_event=event.datetime)
                 first_event_received.send_robust(project=project, group=group, sender=Project)
 
+    def _publish_save(self, pending, raw=False):
+        event = pending.event
+
         eventstream.insert(
-            group=group,
+            group=pending.group,
             event=event,
-            is_new=is_new,
-            is_sample=is_sample,
-            is_regression=is_regression,
-            is_new_group_environment=is_new_group_environment,
-            primary_hash=hashes[0],
+            is_new=pending.is_new,
+            is_sample=pending.is_sample,
+            is_regression=pending.is_regression,
+            is_new_group_environment=pending.is_new_group_environment,
+            primary_hash=pending.hashes[0],
             # We are choosing to skip consuming the event back
             # in the eventstream if it's flagged as raw.
             # This means that we want to publish the event
@@ -903,20 +1249,18 @@ class EventManager(object):
 
         metrics.timing(
             'events.latency',
-            received_timestamp - recorded_timestamp,
+            pending.received_timestamp - pending.recorded_timestamp,
             tags={
-                'project_id': project.id,
+                'project_id': event.project_id,
             },
         )
 
         metrics.timing(
             'events.size.data.post_save',
             event.size,
-            tags={'project_id': project.id}
+            tags={'project_id': event.project_id}
         )
 
-        return event
-
     def _get_event_user(self, project, data):
         user_data = data.get('user')
         if not user_data:
@@ -961,20 +1305,11 @@ class EventManager(object):
                 default_cache.set(cache_key, e_userid, 3600)
         return euser
 
-    def _find_hashes(self, project, hash_list):
-        return map(
-            lambda hash: GroupHash.objects.get_or_create(
-                project=project,
-                hash=hash,
-            )[0],
-            hash_list,
-        )
-
-    def _save_aggregate(self, event, hashes, release, **kwargs):
+    def _save_aggregate(self, batch, event, hashes, release, **kwargs):
         project = event.project
 
         # attempt to find a matching hash
-        all_hashes = self._find_hashes(project, hashes)
+        all_hashes = batch.get_group_hashes(hashes)
 
         existing_group_id = None
         for h in all_hashes:
@@ -1004,6 +1339,8 @@ class EventManager(object):
                     **kwargs
                 ), True
 
+            batch.add_group(group)
+
             metrics.incr(
                 'group.created',
                 skip_internal=True,
@@ -1011,7 +1348,7 @@ class EventManager(object):
             )
 
         else:
-            group = Group.objects.get(id=existing_group_id)
+            group = batch.get_group(existing_group_id)
 
             group_is_new = False
 
@@ -1034,6 +1371,12 @@ class EventManager(object):
                 state=GroupHash.State.LOCKED_IN_MIGRATION,
             ).update(group=group)
 
+            # Keep the hashes memoized by the batch in sync, so that later
+            # events of the batch end up in the same group.
+            for h in new_hashes:
+                if h.state != GroupHash.State.LOCKED_IN_MIGRATION:
+                    h.group_id = group.id
+
             if group_is_new and len(new_hashes) == len(all_hashes):
                 is_new = True
 
@@ -1049,6 +1392,7 @@ class EventManager(object):
 
         if not is_new:
             is_regression = self._process_existing_aggregate(
+                batch=batch,
                 group=group,
                 event=event,
                 data=kwargs,
@@ -1161,7 +1505,7 @@ class EventManager(object):
 
         return is_regression
 
-    def _process_existing_aggregate(self, group, event, data, release):
+    def _process_existing_aggregate(self, batch, group, event, data, release):
         date = max(event.datetime, group.last_seen)
         extra = {
             'last_seen': date,
@@ -1183,7 +1527,7 @@ class EventManager(object):
             'times_seen': 1,
         }
 
-        buffer.incr(Group, update_kwargs, {
+        batch.buffer_incr(Group, update_kwargs, {
             'id': group.id,
         }, extra)
 
@@ -0,0 +1,246 @@
+"""
+sentry.filestore.cache
+~~~~~~~~~~~~~~~~~~~~~~
+
+A local disk cache for file blobs.
+
+Blobs never change once they are written, so they are stored under their
+checksum and can be shared by all processes of a host. Entries are written
+to a temporary file and renamed into place, and the least recently used
+ones are evicted once the cache grows beyond ``filestore.cache-size``.
+
+:copyright: (c) 2010-2019 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import
+
+import errno
+import logging
+import mmap
+import os
+import tempfile
+import time
+
+from hashlib import sha1
+
+from sentry import options
+from sentry.utils import metrics
+
+ONE_HOUR = 60 * 60
+
+logger = logging.getLogger(__name__)
+
+
+class MappedBlobFile(object):
+    """
+    A read only file object for a cached blob backed by a memory map.
+    """
+
+    def __init__(self, fileobj, size):
+        self.size = size
+        self.closed = False
+        self._file = fileobj
+        # empty files cannot be mapped
+        if size:
+            self._data = mmap.mmap(fileobj.fileno(), size, access=mmap.ACCESS_READ)
+        else:
+            self._data = None
+        self._pos = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+
+    @property
+    def name(self):
+        return self._file.name
+
+    def read(self, n=-1):
+        if self.closed:
+            raise ValueError('I/O operation on closed file')
+        end = self.size if n is None or n < 0 else min(self.size, self._pos + n)
+        if self._data is None or end <= self._pos:
+            return b''
+        rv = self._data[self._pos:end]
+        self._pos = end
+        return rv
+
+    def seek(self, pos, whence=os.SEEK_SET):
+        if self.closed:
+            raise ValueError('I/O operation on closed file')
+        if whence == os.SEEK_CUR:
+            pos += self._pos
+        elif whence == os.SEEK_END:
+            pos += self.size
+        if pos < 0:
+            raise IOError('Invalid argument')
+        self._pos = pos
+
+    def tell(self):
+        if self.closed:
+            raise ValueError('I/O operation on closed file')
+        return self._pos
+
+    def close(self):
+        if self.closed:
+            return
+        if self._data is not None:
+            self._data.close()
+            self._data = None
+        self._file.close()
+        self.closed = True
+
+
+class FileBlobCache(object):
+    @property
+    def cache_path(self):
+        return options.get('filestore.cache-path')
+
+    @property
+    def max_size(self):
+        return options.get('filestore.cache-size')
+
+    @property
+    def enabled(self):
+        return bool(self.cache_path and self.max_size)
+
+    def get_path(self, checksum):
+        return os.path.join(self.cache_path, checksum[:2], checksum[2:])
+
+    def open(self, blob):
+        """
+        Returns a ``MappedBlobFile`` with the contents of the blob, downloading
+        it from the file store if it is not cached yet.
+
+        If the cache cannot be used, for instance because the disk is full or
+        the cache directory is not writable, the blob is opened from the file
+        store directly.
+        """
+        from sentry.models.file import get_storage
+
+        path = self.get_path(blob.checksum)
+        fileobj = None
+        try:
+            fileobj = self._open_cached(path)
+            if fileobj is not None:
+                metrics.incr('filestore.blob-cache', tags={'result': 'hit'}, skip_internal=True)
+            else:
+                metrics.incr('filestore.blob-cache', tags={'result': 'miss'}, skip_internal=True)
+                self._store(blob, path)
+                fileobj = open(path, 'rb')
+            return MappedBlobFile(fileobj, os.fstat(fileobj.fileno()).st_size)
+        except (IOError, OSError, mmap.error):
+            if fileobj is not None:
+                fileobj.close()
+            metrics.incr('filestore.blob-cache', tags={'result': 'error'}, skip_internal=True)
+            logger.warning('filestore.blob-cache.failed', exc_info=True, extra={
+                'checksum': blob.checksum,
+            })
+            return get_storage().open(blob.path)
+
+    def _open_cached(self, path):
+        try:
+            fileobj = open(path, 'rb')
+        except IOError as e:
+            if e.errno != errno.ENOENT:
+                raise
+            return None
+
+        # The modification time tracks the last use for eviction.
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return fileobj
+
+    def _store(self, blob, path):
+        from sentry.models.file import get_storage
+
+        base = os.path.dirname(path)
+        try:
+            os.makedirs(base)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+
+        fd, tmp_path = tempfile.mkstemp(prefix='._blob-', dir=base)
+        try:
+            checksum = sha1()
+            with os.fdopen(fd, 'wb') as dst, get_storage().open(blob.path) as src:
+                for chunk in src.chunks():
+                    checksum.update(chunk)
+                    dst.write(chunk)
+            if checksum.hexdigest() != blob.checksum:
+                raise IOError('Checksum mismatch for blob %s' % blob.checksum)
+            # Concurrent downloads of the same blob write identical
+            # contents, so the last rename simply wins.
+            os.rename(tmp_path, path)
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def clear_old_entries(self):
+        """
+        Removes the least recently used blobs until the cache fits into
+        ``filestore.cache-size`` again.
+        """
+        if not self.enabled:
+            return
+
+        try:
+            cache_folders = os.listdir(self.cache_path)
+        except OSError:
+            return
+
+        cutoff = time.time() - ONE_HOUR
+        entries = []
+        total_size = 0
+        for cache_folder in cache_folders:
+            cache_folder = os.path.join(self.cache_path, cache_folder)
+            try:
+                items = os.listdir(cache_folder)
+            except OSError:
+                continue
+            for cached_file in items:
+                cached_file = os.path.join(cache_folder, cached_file)
+                try:
+                    st = os.stat(cached_file)
+                except OSError:
+                    continue
+                if os.path.basename(cached_file).startswith('._'):
+                    # downloads in progress, or left behind by a crash
+                    if st.st_mtime < cutoff:
+                        try:
+                            os.remove(cached_file)
+                        except OSError:
+                            pass
+                    continue
+                entries.append((st.st_mtime, st.st_size, cached_file))
+                total_size += st.st_size
+
+        metrics.timing('filestore.blob-cache.size', total_size)
+
+        max_size = self.max_size
+        evicted = 0
+        for _, size, cached_file in sorted(entries):
+            if total_size <= max_size:
+                break
+            # Processes that have the blob open keep reading their copy.
+            try:
+                os.remove(cached_file)
+            except OSError:
+                continue
+            total_size -= size
+            evicted += 1
+
+        if evicted:
+            metrics.incr('filestore.blob-cache.evicted', evicted, skip_internal=True)
+
+
+blobcache = FileBlobCache()
@@ -271,6 +271,19 @@ class GoogleCloudStorage(Storage):
         name = self._normalize_name(clean_name(name))
         return GoogleCloudFile(name, mode, self)
 
+    def read_range(self, name, offset, length):
+        """
+        Reads ``length`` bytes starting at ``offset`` with a single ranged
+        request instead of downloading the whole object.
+        """
+        if length <= 0:
+            return b''
+        name = self._normalize_name(clean_name(name))
+        blob = FancyBlob(self.download_url, name, self.bucket)
+        with metrics.timer('filestore.read-range', instance='gcs'):
+            return try_repeated(lambda: blob.download_as_string(
+                start=offset, end=offset + length - 1))
+
     def _save(self, name, content):
         def _try_upload():
             content.seek(0, os.SEEK_SET)
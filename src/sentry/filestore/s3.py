@@ -487,6 +487,37 @@ class S3Boto3Storage(Storage):
             raise  # Let it bubble up if it was some other error
         return f
 
+    def read_range(self, name, offset, length):
+        """
+        Reads ``length`` bytes starting at ``offset`` with a single ranged
+        GET instead of downloading the whole object.
+        """
+        if length <= 0:
+            return b''
+        clean_name = self._normalize_name(self._clean_name(name))
+        obj = self.bucket.Object(self._encode_name(clean_name))
+        with metrics.timer('filestore.read-range', instance='s3'):
+            response = obj.get(Range='bytes=%d-%d' % (offset, offset + length - 1))
+            if response.get('ContentEncoding') == 'gzip':
+                # ranges apply to the compressed bytes, read it all instead
+                response['Body'].close()
+                with self.open(name) as f:
+                    f.seek(offset)
+                    return f.read(length)
+            return response['Body'].read()
+
+    def supports_range(self, name):
+        """
+        Returns whether the object can be read with ``read_range``. Ranges
+        apply to the compressed bytes of gzipped objects, so only storages
+        that gzip on save need to check the encoding.
+        """
+        if not self.gzip:
+            return True
+        clean_name = self._normalize_name(self._clean_name(name))
+        obj = self.bucket.Object(self._encode_name(clean_name))
+        return obj.content_encoding != 'gzip'
+
     def _save(self, name, content):
         with metrics.timer('filestore.save', instance='s3'):
             cleaned_name = self._clean_name(name)
@@ -9,10 +9,17 @@ from sentry.grouping.variants import ChecksumVariant, FallbackVariant, \
     ComponentVariant, CustomFingerprintVariant, SaltedComponentVariant
 from sentry.grouping.enhancer import Enhancements, InvalidEnhancerConfig, ENHANCEMENT_BASES
 from sentry.grouping.utils import DEFAULT_FINGERPRINT_VALUES, hash_from_values
+from sentry.utils import metrics
+from sentry.utils.datastructures import LRUCache
 
 
 HASH_RE = re.compile(r'^[0-9a-f]{32}$')
 
+# Loaded grouping configs by their config dict.  Loading one decodes the
+# enhancements and builds all rules, so it is shared by all events with the
+# same config in this process.  Configs are not modified once loaded.
+_grouping_config_cache = LRUCache(256)
+
 
 class GroupingConfigNotFound(LookupError):
     pass
@@ -94,7 +101,22 @@ def load_grouping_config(config_dict=None):
     config_id = config_dict.pop('id')
     if config_id not in CONFIGURATIONS:
         raise GroupingConfigNotFound(config_id)
-    return CONFIGURATIONS[config_id](**config_dict)
+
+    cache_key = (config_id, tuple(sorted(six.iteritems(config_dict))))
+    try:
+        rv = _grouping_config_cache.get(cache_key)
+    except TypeError:
+        # unhashable config values, nothing we could cache
+        return CONFIGURATIONS[config_id](**config_dict)
+
+    if rv is not None:
+        metrics.incr('grouping.config_cache', tags={'result': 'hit'}, skip_internal=True)
+        return rv
+
+    metrics.incr('grouping.config_cache', tags={'result': 'miss'}, skip_internal=True)
+    rv = CONFIGURATIONS[config_id](**config_dict)
+    _grouping_config_cache.set(cache_key, rv)
+    return rv
 
 
 def get_fingerprinting_config_for_project(project):
@@ -6,6 +6,7 @@ import base64
 import msgpack
 import inspect
 from itertools import izip
+from functools32 import lru_cache
 
 from parsimonious.grammar import Grammar, NodeVisitor
 from parsimonious.exceptions import ParseError
@@ -13,7 +14,8 @@ from parsimonious.exceptions import ParseError
 from sentry.stacktraces.platform import get_behavior_family_for_platform
 from sentry.grouping.utils import get_rule_bool
 from sentry.utils.compat import implements_to_string
-from sentry.utils.glob import glob_match
+from sentry.utils.datastructures import LRUCache
+from sentry.utils.glob import _translate
 
 
 # Grammar is defined in EBNF syntax.
@@ -85,10 +87,71 @@ ACTION_FLAGS = {
 REVERSE_ACTION_FLAGS = dict((v, k) for k, v in six.iteritems(ACTION_FLAGS))
 
 
+# Decoded enhancements by their serialized form, see `Enhancements.loads`.
+_enhancements_cache = LRUCache(256)
+
+
 class InvalidEnhancerConfig(Exception):
     pass
 
 
+@lru_cache(maxsize=1000)
+def _compile_match(key, pattern):
+    """Translates a matcher pattern once instead of once per frame."""
+    if key in ('path', 'package'):
+        # Path matches are always case insensitive
+        return _translate(pattern.lower().replace('\\', '/'), doublestar=True)
+    if key == 'family':
+        return frozenset(pattern.split(','))
+    if key == 'app':
+        return (get_rule_bool(pattern), )
+    # all other matches are case sensitive
+    return _translate(pattern, doublestar=False)
+
+
+class _FrameInfo(object):
+    """Match values extracted from a single frame.  The values are computed
+    on first use and memoized together with the match results, so rules that
+    share matchers (like `family:native`) only evaluate them once per frame.
+    """
+    __slots__ = ('frame', 'platform', 'values', 'results')
+
+    def __init__(self, frame, platform):
+        self.frame = frame
+        self.platform = platform
+        self.values = {}
+        self.results = {}
+
+    def get_values(self, key):
+        rv = self.values.get(key)
+        if rv is not None:
+            return rv
+
+        frame = self.frame
+        if key in ('path', 'package'):
+            if key == 'package':
+                value = frame.get('package') or ''
+            else:
+                value = frame.get('abs_path') or frame.get('filename') or ''
+            normalized = value.lower().replace('\\', '/')
+            if value.startswith('/'):
+                rv = (normalized, )
+            else:
+                rv = (normalized, '/' + normalized)
+        elif key == 'family':
+            rv = (get_behavior_family_for_platform(frame.get('platform') or self.platform), )
+        elif key == 'function':
+            from sentry.stacktraces.functions import get_function_name_for_frame
+            rv = (get_function_name_for_frame(frame, self.platform) or '<unknown>', )
+        elif key == 'module':
+            rv = (frame.get('module') or '<unknown>', )
+        else:
+            # should not happen :)
+            rv = ('<unknown>', )
+        self.values[key] = rv
+        return rv
+
+
 class Match(object):
 
     def __init__(self, key, pattern):
@@ -103,43 +166,28 @@ class Match(object):
         )
 
     def matches_frame(self, frame_data, platform):
-        # Path matches are always case insensitive
-        if self.key in ('path', 'package'):
-            if self.key == 'package':
-                value = frame_data.get('package') or ''
-            else:
-                value = frame_data.get('abs_path') or frame_data.get('filename') or ''
-            if glob_match(value, self.pattern, ignorecase=True,
-                          doublestar=True, path_normalize=True):
-                return True
-            if not value.startswith('/') and glob_match('/' + value, self.pattern,
-                                                        ignorecase=True, doublestar=True, path_normalize=True):
-                return True
-            return False
-
-        # families need custom handling as well
-        if self.key == 'family':
-            flags = self.pattern.split(',')
-            if 'all' in flags:
-                return True
-            family = get_behavior_family_for_platform(frame_data.get('platform') or platform)
-            return family in flags
+        return self._matches_frame_info(_FrameInfo(frame_data, platform))
 
-        # in-app matching is just a bool
+    def _matches_frame_info(self, info):
+        # in-app matching is just a bool.  This is never memoized as rules
+        # that ran earlier can change the in-app flag of a frame.
         if self.key == 'app':
-            ref_val = get_rule_bool(self.pattern)
-            return ref_val is not None and ref_val == frame_data.get('in_app')
+            ref_val, = _compile_match(self.key, self.pattern)
+            return ref_val is not None and ref_val == info.frame.get('in_app')
 
-        # all other matches are case sensitive
-        if self.key == 'function':
-            from sentry.stacktraces.functions import get_function_name_for_frame
-            value = get_function_name_for_frame(frame_data, platform) or '<unknown>'
-        elif self.key == 'module':
-            value = frame_data.get('module') or '<unknown>'
+        memo_key = (self.key, self.pattern)
+        rv = info.results.get(memo_key)
+        if rv is not None:
+            return rv
+
+        compiled = _compile_match(self.key, self.pattern)
+        if self.key == 'family':
+            rv = 'all' in compiled or info.get_values('family')[0] in compiled
         else:
-            # should not happen :)
-            value = '<unknown>'
-        return glob_match(value, self.pattern)
+            rv = any(compiled.match(value) is not None
+                     for value in info.get_values(self.key))
+        info.results[memo_key] = rv
+        return rv
 
     def _to_config_structure(self):
         if self.key == 'family':
@@ -295,9 +343,10 @@ class Enhancements(object):
         """This applies the frame modifications to the frames itself.  This
         does not affect grouping.
         """
+        infos = [_FrameInfo(frame, platform) for frame in frames]
         for rule in self.iter_rules():
-            for idx, frame in enumerate(frames):
-                actions = rule.get_matching_frame_actions(frame, platform)
+            for idx, info in enumerate(infos):
+                actions = rule._get_matching_actions(info)
                 for action in actions or ():
                     action.apply_modifications_to_frame(frames, idx)
 
@@ -305,9 +354,10 @@ class Enhancements(object):
         stack_state = StackState()
 
         # Apply direct frame actions and update the stack state alongside
+        infos = [_FrameInfo(frame, platform) for frame in frames]
         for rule in self.iter_rules():
-            for idx, (component, frame) in enumerate(izip(components, frames)):
-                actions = rule.get_matching_frame_actions(frame, platform)
+            for idx, (component, info) in enumerate(izip(components, infos)):
+                actions = rule._get_matching_actions(info)
                 for action in actions or ():
                     action.update_frame_components_contributions(
                         components, idx, rule=rule)
@@ -371,14 +421,22 @@ class Enhancements(object):
 
     @classmethod
     def loads(cls, data):
+        """Decodes enhancements written by `dumps`.  Decoded enhancements
+        are cached and shared, they must not be modified.
+        """
         if six.PY2 and isinstance(data, six.text_type):
             data = data.encode('ascii', 'ignore')
+        rv = _enhancements_cache.get((cls, data))
+        if rv is not None:
+            return rv
         padded = data + b'=' * (4 - (len(data) % 4))
         try:
-            return cls._from_config_structure(msgpack.loads(
+            rv = cls._from_config_structure(msgpack.loads(
                 base64.urlsafe_b64decode(padded).decode('zlib')))
         except (LookupError, AttributeError, TypeError, ValueError) as e:
             raise ValueError('invalid grouping enhancement config: %s' % e)
+        _enhancements_cache.set((cls, data), rv)
+        return rv
 
     @classmethod
     def from_config_string(self, s, bases=None, id=None):
@@ -420,7 +478,10 @@ class Rule(object):
         """Given a frame returns all the matching actions based on this rule.
         If the rule does not match `None` is returned.
         """
-        if self.matchers and all(m.matches_frame(frame_data, platform) for m in self.matchers):
+        return self._get_matching_actions(_FrameInfo(frame_data, platform))
+
+    def _get_matching_actions(self, info):
+        if self.matchers and all(m._matches_frame_info(info) for m in self.matchers):
             return self.actions
 
     def _to_config_structure(self):
@@ -1,10 +1,17 @@
 from __future__ import absolute_import, print_function
 
+from django.conf import settings
 from six import text_type
 from symbolic import SourceView
+from sentry.utils.datastructures import LRUCache
 from sentry.utils.strings import codec_lookup
 
-__all__ = ['SourceCache', 'SourceMapCache']
+__all__ = ['SourceCache', 'SourceMapCache', 'parsed_sourcemaps']
+
+# Parsed sourcemap views shared by all events processed in this process,
+# keyed by ``(release_id, dist_id, url, checksum)`` and sized by the length
+# of the sourcemap JSON.
+parsed_sourcemaps = LRUCache(settings.SENTRY_SOURCEMAP_CACHE_SIZE)
 
 
 def is_utf8(codec):
@@ -9,11 +9,15 @@ import base64
 import six
 import zlib
 
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from django.conf import settings
+from django.db import connection
 from os.path import splitext
 from requests.utils import get_encoding_from_headers
 from six.moves.urllib.parse import urljoin, urlsplit
 from symbolic import SourceMapView
+from threading import BoundedSemaphore
 
 # In case SSL is unavailable (light builds) we can't import this here.
 try:
@@ -29,13 +33,13 @@ from sentry.interfaces.stacktrace import Stacktrace
 from sentry.models import EventError, ReleaseFile, Organization
 from sentry.utils.cache import cache
 from sentry.utils.files import compress_file
-from sentry.utils.hashlib import md5_text
+from sentry.utils.hashlib import md5_text, sha1_text
 from sentry.utils.http import is_valid_origin
 from sentry.utils.safe import get_path
 from sentry.utils import metrics
 from sentry.stacktraces.processing import StacktraceProcessor
 
-from .cache import SourceCache, SourceMapCache
+from .cache import SourceCache, SourceMapCache, parsed_sourcemaps
 
 # number of surrounding lines (on each side) to fetch
 LINES_OF_CONTEXT = 5
@@ -64,6 +68,10 @@ CACHE_CONTROL_MIN = 60
 # the maximum number of remote resources (i.e. source files) that should be
 # fetched
 MAX_RESOURCE_FETCHES = 100
+# the maximum number of resources fetched at the same time for one event,
+# overall and from a single host
+MAX_CONCURRENT_FETCHES = 8
+MAX_CONCURRENT_FETCHES_PER_HOST = 4
 
 logger = logging.getLogger(__name__)
 
@@ -199,64 +207,122 @@ def discover_sourcemap(result):
     return sourcemap
 
 
-def fetch_release_file(filename, release, dist=None):
-    cache_key = 'releasefile:v1:%s:%s' % (release.id, md5_text(filename).hexdigest(), )
+def get_release_file_cache_key(filename, release):
+    return 'releasefile:v1:%s:%s' % (release.id, md5_text(filename).hexdigest(), )
 
-    logger.debug('Checking cache for release artifact %r (release_id=%s)', filename, release.id)
-    result = cache.get(cache_key)
 
+def lookup_release_file(filename, release, dist=None):
+    """
+    Finds the ``ReleaseFile`` of a release artifact without reading it, or
+    returns ``None`` if the release has no such artifact.
+    """
     dist_name = dist and dist.name or None
-
-    if result is None:
-        filename_choices = ReleaseFile.normalize(filename)
-        filename_idents = [ReleaseFile.get_ident(f, dist_name) for f in filename_choices]
-
+    filename_choices = ReleaseFile.normalize(filename)
+    filename_idents = [ReleaseFile.get_ident(f, dist_name) for f in filename_choices]
+
+    logger.debug(
+        'Checking database for release artifact %r (release_id=%s)', filename, release.id
+    )
+
+    possible_files = list(
+        ReleaseFile.objects.filter(
+            release=release,
+            dist=dist,
+            ident__in=filename_idents,
+        ).select_related('file')
+    )
+
+    if len(possible_files) == 0:
         logger.debug(
-            'Checking database for release artifact %r (release_id=%s)', filename, release.id
+            'Release artifact %r not found in database (release_id=%s)', filename, release.id
         )
+        return None
+    elif len(possible_files) == 1:
+        releasefile = possible_files[0]
+    else:
+        # Pick first one that matches in priority order.
+        # This is O(N*M) but there are only ever at most 4 things here
+        # so not really worth optimizing.
+        releasefile = next((
+            rf
+            for ident in filename_idents
+            for rf in possible_files
+            if rf.ident == ident
+        ))
+
+    logger.debug(
+        'Found release artifact %r (id=%s, release_id=%s)', filename, releasefile.id, release.id
+    )
+    return releasefile
+
+
+def read_release_file(filename, release, releasefile, indexes=None):
+    """
+    Reads a release artifact found by ``lookup_release_file`` and caches
+    its contents. ``indexes`` are the blob indexes of the file if they were
+    loaded already.
+    """
+    try:
+        with metrics.timer('sourcemaps.release_file_read'):
+            with releasefile.file.getfile(indexes=indexes) as fp:
+                z_body, body = compress_file(fp)
+    except Exception:
+        logger.error('sourcemap.compress_read_failed', exc_info=sys.exc_info())
+        return None
+
+    headers = {k.lower(): v for k, v in releasefile.file.headers.items()}
+    encoding = get_encoding_from_headers(headers)
+    cache.set(
+        get_release_file_cache_key(filename, release),
+        (headers, z_body, 200, encoding),
+        3600,
+    )
+    return http.UrlResult(filename, headers, body, 200, encoding)
+
+
+def prefetch_release_files(filenames, release, dist=None):
+    """
+    Looks up the release artifacts of ``filenames`` that are not cached,
+    along with their blob indexes. The result can be passed to
+    ``fetch_release_file`` as ``prefetched``, which then only reads the
+    blobs and does not need the database.
+    """
+    cache_keys = {get_release_file_cache_key(f, release): f for f in filenames}
+    cached = cache.get_many(list(cache_keys))
+
+    prefetched = {}
+    for cache_key, filename in six.iteritems(cache_keys):
+        if cached.get(cache_key) is not None:
+            continue
+        releasefile = lookup_release_file(filename, release, dist)
+        if releasefile is None:
+            cache.set(cache_key, -1, 60)
+            continue
+        prefetched[filename] = (releasefile, releasefile.file.get_blob_indexes())
+    return prefetched
 
-        possible_files = list(
-            ReleaseFile.objects.filter(
-                release=release,
-                dist=dist,
-                ident__in=filename_idents,
-            ).select_related('file')
-        )
 
-        if len(possible_files) == 0:
-            logger.debug(
-                'Release artifact %r not found in database (release_id=%s)', filename, release.id
-            )
+def fetch_release_file(filename, release, dist=None, prefetched=None):
+    """
+    Returns the release artifact for ``filename`` as ``UrlResult``, or
+    ``None``. Artifacts in ``prefetched`` (see ``prefetch_release_files``)
+    are read without looking them up again.
+    """
+    if prefetched is not None and filename in prefetched:
+        releasefile, indexes = prefetched[filename]
+        return read_release_file(filename, release, releasefile, indexes)
+
+    cache_key = get_release_file_cache_key(filename, release)
+
+    logger.debug('Checking cache for release artifact %r (release_id=%s)', filename, release.id)
+    result = cache.get(cache_key)
+
+    if result is None:
+        releasefile = lookup_release_file(filename, release, dist)
+        if releasefile is None:
             cache.set(cache_key, -1, 60)
             return None
-        elif len(possible_files) == 1:
-            releasefile = possible_files[0]
-        else:
-            # Pick first one that matches in priority order.
-            # This is O(N*M) but there are only ever at most 4 things here
-            # so not really worth optimizing.
-            releasefile = next((
-                rf
-                for ident in filename_idents
-                for rf in possible_files
-                if rf.ident == ident
-            ))
-
-        logger.debug(
-            'Found release artifact %r (id=%s, release_id=%s)', filename, releasefile.id, release.id
-        )
-        try:
-            with metrics.timer('sourcemaps.release_file_read'):
-                with releasefile.file.getfile() as fp:
-                    z_body, body = compress_file(fp)
-        except Exception:
-            logger.error('sourcemap.compress_read_failed', exc_info=sys.exc_info())
-            result = None
-        else:
-            headers = {k.lower(): v for k, v in releasefile.file.headers.items()}
-            encoding = get_encoding_from_headers(headers)
-            result = http.UrlResult(filename, headers, body, 200, encoding)
-            cache.set(cache_key, (headers, z_body, 200, encoding), 3600)
+        result = read_release_file(filename, release, releasefile)
 
     elif result == -1:
         # We cached an error, so normalize
@@ -276,11 +342,13 @@ def fetch_release_file(filename, release, dist=None):
     return result
 
 
-def fetch_file(url, project=None, release=None, dist=None, allow_scraping=True):
+def fetch_file(url, project=None, release=None, dist=None, allow_scraping=True,
+               prefetched=None):
     """
     Pull down a URL, returning a UrlResult object.
 
-    Attempts to fetch from the cache.
+    Attempts to fetch from the cache. ``prefetched`` holds release artifacts
+    looked up by ``prefetch_release_files``.
     """
     # If our url has been truncated, it'd be impossible to fetch
     # so we check for this early and bail
@@ -293,7 +361,7 @@ def fetch_file(url, project=None, release=None, dist=None, allow_scraping=True):
         )
     if release:
         with metrics.timer('sourcemaps.release_file'):
-            result = fetch_release_file(url, release, dist)
+            result = fetch_release_file(url, release, dist, prefetched)
     else:
         result = None
 
@@ -403,7 +471,8 @@ def get_max_age(headers):
     return min(max_age, CACHE_CONTROL_MAX)
 
 
-def fetch_sourcemap(url, project=None, release=None, dist=None, allow_scraping=True):
+def fetch_sourcemap(url, project=None, release=None, dist=None, allow_scraping=True,
+                    prefetched=None):
     if is_data_uri(url):
         try:
             body = base64.b64decode(
@@ -416,11 +485,26 @@ def fetch_sourcemap(url, project=None, release=None, dist=None, allow_scraping=T
             })
     else:
         result = fetch_file(
-            url, project=project, release=release, dist=dist, allow_scraping=allow_scraping
+            url, project=project, release=release, dist=dist, allow_scraping=allow_scraping,
+            prefetched=prefetched,
         )
         body = result.body
+
+    cache_key = (
+        release and release.id,
+        dist and dist.id,
+        '<base64>' if is_data_uri(url) else url,
+        sha1_text(body).hexdigest(),
+    )
+    sourcemap_view = parsed_sourcemaps.get(cache_key)
+    if sourcemap_view is not None:
+        metrics.incr('sourcemaps.parsed_cache', tags={'result': 'hit'}, skip_internal=True)
+        return sourcemap_view
+    metrics.incr('sourcemaps.parsed_cache', tags={'result': 'miss'}, skip_internal=True)
+
     try:
-        return SourceMapView.from_json_bytes(body)
+        with metrics.timer('sourcemaps.parse'):
+            sourcemap_view = SourceMapView.from_json_bytes(body)
     except Exception as exc:
         # This is in debug because the product shows an error already.
         logger.debug(six.text_type(exc), exc_info=True)
@@ -428,6 +512,9 @@ def fetch_sourcemap(url, project=None, release=None, dist=None, allow_scraping=T
             'url': http.expose_url(url),
         })
 
+    parsed_sourcemaps.set(cache_key, sourcemap_view, size=len(body))
+    return sourcemap_view
+
 
 def is_data_uri(url):
     return url[:BASE64_PREAMBLE_LENGTH] == BASE64_SOURCEMAP_PREAMBLE
@@ -766,67 +853,143 @@ class JavaScriptStacktraceProcessor(StacktraceProcessor):
         return self.cache.get(filename)
 
     def cache_source(self, filename):
+        self.cache_sources([filename])
+
+    def cache_sources(self, filenames):
+        """
+        Fetches the given sources and their sourcemaps.  Remote fetches run
+        concurrently, everything that touches the caches of this processor
+        happens on the calling thread in the order of ``filenames``.
+        """
         sourcemaps = self.sourcemaps
         cache = self.cache
 
-        self.fetch_count += 1
+        pending = []
+        for filename in filenames:
+            self.fetch_count += 1
 
-        if self.fetch_count > self.max_fetches:
-            cache.add_error(filename, {
-                'type': EventError.JS_TOO_MANY_REMOTE_SOURCES,
-            })
-            return
+            if self.fetch_count > self.max_fetches:
+                cache.add_error(filename, {
+                    'type': EventError.JS_TOO_MANY_REMOTE_SOURCES,
+                })
+                continue
+
+            pending.append(filename)
 
         # TODO: respect cache-control/max-age headers to some extent
-        logger.debug('Fetching remote source %r', filename)
-        try:
-            result = fetch_file(
-                filename,
-                project=self.project,
-                release=self.release,
-                dist=self.dist,
-                allow_scraping=self.allow_scraping
-            )
-        except http.BadSource as exc:
-            cache.add_error(filename, exc.data)
-            return
+        results = self.fetch_concurrently(pending, self._fetch_file)
+
+        sourcemap_files = OrderedDict()
+        for filename in pending:
+            result = results[filename]
+            if isinstance(result, http.BadSource):
+                cache.add_error(filename, result.data)
+                continue
 
-        cache.add(filename, result.body, result.encoding)
-        cache.alias(result.url, filename)
+            cache.add(filename, result.body, result.encoding)
+            cache.alias(result.url, filename)
 
-        sourcemap_url = discover_sourcemap(result)
-        if not sourcemap_url:
-            return
+            sourcemap_url = discover_sourcemap(result)
+            if not sourcemap_url:
+                continue
 
-        logger.debug('Found sourcemap %r for minified script %r', sourcemap_url[:256], result.url)
-        sourcemaps.link(filename, sourcemap_url)
-        if sourcemap_url in sourcemaps:
-            return
+            logger.debug(
+                'Found sourcemap %r for minified script %r', sourcemap_url[:256], result.url)
+            sourcemaps.link(filename, sourcemap_url)
+            if sourcemap_url in sourcemaps:
+                continue
 
-        # pull down sourcemap
-        try:
-            sourcemap_view = fetch_sourcemap(
-                sourcemap_url,
-                project=self.project,
-                release=self.release,
-                dist=self.dist,
-                allow_scraping=self.allow_scraping,
-            )
-        except http.BadSource as exc:
-            cache.add_error(filename, exc.data)
-            return
+            sourcemap_files.setdefault(sourcemap_url, []).append(filename)
 
-        sourcemaps.add(sourcemap_url, sourcemap_view)
+        # pull down sourcemaps
+        results = self.fetch_concurrently(list(sourcemap_files), self._fetch_sourcemap)
 
-        # cache any inlined sources
-        for src_id, source_name in sourcemap_view.iter_sources():
-            source_view = sourcemap_view.get_sourceview(src_id)
-            if source_view is not None:
-                self.cache.add(
-                    urljoin(sourcemap_url, source_name),
-                    source_view
+        for sourcemap_url, filenames in six.iteritems(sourcemap_files):
+            sourcemap_view = results[sourcemap_url]
+            if isinstance(sourcemap_view, http.BadSource):
+                for filename in filenames:
+                    cache.add_error(filename, sourcemap_view.data)
+                continue
+
+            sourcemaps.add(sourcemap_url, sourcemap_view)
+
+            # cache any inlined sources
+            for src_id, source_name in sourcemap_view.iter_sources():
+                source_view = sourcemap_view.get_sourceview(src_id)
+                if source_view is not None:
+                    self.cache.add(
+                        urljoin(sourcemap_url, source_name),
+                        source_view
+                    )
+
+    def _fetch_file(self, filename, prefetched=None):
+        logger.debug('Fetching remote source %r', filename)
+        return fetch_file(
+            filename,
+            project=self.project,
+            release=self.release,
+            dist=self.dist,
+            allow_scraping=self.allow_scraping,
+            prefetched=prefetched,
+        )
+
+    def _fetch_sourcemap(self, sourcemap_url, prefetched=None):
+        return fetch_sourcemap(
+            sourcemap_url,
+            project=self.project,
+            release=self.release,
+            dist=self.dist,
+            allow_scraping=self.allow_scraping,
+            prefetched=prefetched,
+        )
+
+    def fetch_concurrently(self, urls, fetch):
+        """
+        Calls ``fetch`` for every url and returns a dictionary of the results,
+        or the ``BadSource`` error raised for a url.
+
+        Release artifacts are looked up in the database on the calling
+        thread first. Reading their blobs, network access and parsing then
+        run in worker threads.
+        """
+        def run(url, prefetched=None):
+            try:
+                return fetch(url, prefetched=prefetched)
+            except http.BadSource as exc:
+                return exc
+
+        if len(urls) <= 1:
+            return {url: run(url) for url in urls}
+
+        prefetched = None
+        if self.release is not None:
+            with metrics.timer('sourcemaps.release_file_lookup'):
+                prefetched = prefetch_release_files(
+                    [url for url in urls if not is_data_uri(url) and url[-3:] != '...'],
+                    self.release,
+                    self.dist,
                 )
 
+        host_limits = {}
+        for url in urls:
+            host = urlsplit(url).netloc
+            if host not in host_limits:
+                host_limits[host] = BoundedSemaphore(MAX_CONCURRENT_FETCHES_PER_HOST)
+
+        def run_in_worker(url):
+            try:
+                with host_limits[urlsplit(url).netloc]:
+                    return run(url, prefetched)
+            finally:
+                # worker threads get their own database connection if they
+                # need one, make sure it does not outlive the fetch.
+                connection.close()
+
+        with metrics.timer('sourcemaps.fetch_concurrently'):
+            with ThreadPoolExecutor(max_workers=min(len(urls), MAX_CONCURRENT_FETCHES)) as executor:
+                futures = [(url, executor.submit(run_in_worker, url)) for url in urls]
+            return {url: future.result() for url, future in futures}
+
     def populate_source_cache(self, frames):
         """
         Fetch all sources that we know are required (being referenced directly
@@ -849,10 +1012,7 @@ class JavaScriptStacktraceProcessor(StacktraceProcessor):
                 continue
             pending_file_list.add(f['abs_path'])
 
-        for idx, filename in enumerate(pending_file_list):
-            self.cache_source(
-                filename=filename,
-            )
+        self.cache_sources(list(pending_file_list))
 
     def close(self):
         StacktraceProcessor.close(self)
@@ -13,9 +13,12 @@ import six
 import mmap
 import tempfile
 
+from bisect import bisect_right
+from collections import deque
 from hashlib import sha1
 from uuid import uuid4
 from threading import Semaphore
+from six.moves import zip as izip
 from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 
@@ -29,6 +32,7 @@ from jsonfield import JSONField
 
 from sentry.app import locks
 from sentry.db.models import (BoundedPositiveIntegerField, FlexibleForeignKey, Model)
+from sentry.filestore.cache import blobcache
 from sentry.tasks.files import delete_file as delete_file_task
 from sentry.utils import metrics
 from sentry.utils.retries import TimedRetryPolicy
@@ -42,6 +46,11 @@ CHUNK_STATE_HEADER = '__state'
 MULTI_BLOB_UPLOAD_CONCURRENCY = 8
 MAX_FILE_SIZE = 2 ** 31  # 2GB is the maximum offset supported by fileblob
 
+# Ranged reads after a seek start fetching this much and double the window
+# on every sequential read up to the maximum.
+MIN_READ_AHEAD = 64 * 1024
+MAX_READ_AHEAD = 8 * 1024 * 1024
+
 
 class nooplogger(object):
     debug = staticmethod(lambda *a, **kw: None)
@@ -81,6 +90,25 @@ def _get_size_and_checksum(fileobj, logger=nooplogger):
     return size, checksum.hexdigest()
 
 
+def _iter_blob_contents(blobs, concurrency=MULTI_BLOB_UPLOAD_CONCURRENCY):
+    """
+    Yields the contents of the given blobs in order while fetching up to
+    `concurrency` of them ahead in parallel.
+    """
+    def _fetch(blob):
+        with blob.getfile() as f:
+            return f.read()
+
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=concurrency) as exe:
+        for blob in blobs:
+            pending.append(exe.submit(_fetch, blob))
+            if len(pending) >= concurrency:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
 @contextmanager
 def _locked_blob(checksum, logger=nooplogger):
     logger.info('_locked_blob.start', extra={'checksum': checksum})
@@ -150,6 +178,8 @@ class FileBlob(Model):
         locks = set()
         semaphore = Semaphore(value=MULTI_BLOB_UPLOAD_CONCURRENCY)
 
+        uploads = []
+
         def _upload_and_pend_chunk(fileobj, size, checksum, lock):
             logger.info(
                 'FileBlob.from_files._upload_and_pend_chunk.start',
@@ -160,9 +190,15 @@ class FileBlob(Model):
             )
             blob = cls(size=size, checksum=checksum)
             blob.path = cls.generate_unique_path()
-            storage = get_storage()
-            storage.save(blob.path, fileobj)
-            blobs_to_save.append((blob, lock))
+            try:
+                storage = get_storage()
+                storage.save(blob.path, fileobj)
+                blobs_to_save.append((blob, lock))
+            finally:
+                # The calling thread waits on the semaphore, so the slot has
+                # to be freed here.  Errors are raised from the calling
+                # thread and the blob is saved by `_flush_blobs`.
+                semaphore.release()
             metrics.timing('filestore.blob-size', size, tags={'function': 'from_files'})
             logger.info(
                 'FileBlob.from_files._upload_and_pend_chunk.end',
@@ -191,6 +227,9 @@ class FileBlob(Model):
             logger.info('FileBlob.from_files._save_blob.end', extra={'path': blob.path})
 
         def _flush_blobs():
+            for future in uploads:
+                if future.done():
+                    future.result()
             while True:
                 try:
                     blob, lock = blobs_to_save.pop()
@@ -200,22 +239,26 @@ class FileBlob(Model):
                 _save_blob(blob)
                 lock.__exit__(None, None, None)
                 locks.discard(lock)
-                semaphore.release()
 
         try:
-            with ThreadPoolExecutor(max_workers=MULTI_BLOB_UPLOAD_CONCURRENCY) as exe:
-                for fileobj, reference_checksum in files_with_checksums:
+            with ThreadPoolExecutor(max_workers=MULTI_BLOB_UPLOAD_CONCURRENCY) as exe, \
+                    ThreadPoolExecutor(max_workers=MULTI_BLOB_UPLOAD_CONCURRENCY) as checksum_exe:
+                # Before we go and do something with the files we calculate
+                # the checksums and compare it against the reference.  This
+                # also deduplicates duplicates uploaded in the same request.
+                # This is necessary because we acquire multiple locks in one
+                # go which would let us deadlock otherwise.  The checksums
+                # are calculated in parallel and consumed in order.
+                sizes_and_checksums = checksum_exe.map(
+                    _get_size_and_checksum, [f for f, _ in files_with_checksums])
+
+                for (fileobj, reference_checksum), (size, checksum) in izip(
+                        files_with_checksums, sizes_and_checksums):
                     logger.info(
                         'FileBlob.from_files.executor_start', extra={
                             'checksum': reference_checksum})
                     _flush_blobs()
 
-                    # Before we go and do something with the files we calculate
-                    # the checksums and compare it against the reference.  This
-                    # also deduplicates duplicates uploaded in the same request.
-                    # This is necessary because we acquire multiple locks in one
-                    # go which would let us deadlock otherwise.
-                    size, checksum = _get_size_and_checksum(fileobj)
                     if reference_checksum is not None and checksum != reference_checksum:
                         raise IOError('Checksum mismatch')
                     if checksum in checksums_seen:
@@ -239,14 +282,18 @@ class FileBlob(Model):
                     # Otherwise we leave the blob locked and submit the task.
                     # We use the semaphore to ensure we never schedule too
                     # many.  The upload will be done with a certain amount
-                    # of concurrency controlled by the semaphore and the
-                    # `_flush_blobs` call will take all those uploaded
-                    # blobs and associate them with the database.
+                    # of concurrency controlled by the semaphore, each upload
+                    # frees its slot when done and the `_flush_blobs` call
+                    # will take all those uploaded blobs and associate them
+                    # with the database.
                     semaphore.acquire()
-                    exe.submit(_upload_and_pend_chunk(fileobj, size, checksum, lock))
+                    uploads.append(exe.submit(
+                        _upload_and_pend_chunk, fileobj, size, checksum, lock))
                     logger.info('FileBlob.from_files.end', extra={'checksum': reference_checksum})
 
             _flush_blobs()
+            for future in uploads:
+                future.result()
         finally:
             for lock in locks:
                 try:
@@ -315,17 +362,27 @@ class FileBlob(Model):
         if commit:
             self.save()
 
-    def getfile(self):
+    def getfile(self, ranged=False):
         """
         Return a file-like object for this File's content.
 
+        If `ranged` is set and the file store supports it, only the parts
+        of the blob that are read are fetched.
+
         >>> with blob.getfile() as src, open('/tmp/localfile', 'wb') as dst:
         >>>     for chunk in src.chunks():
         >>>         dst.write(chunk)
         """
         assert self.path
 
+        # Blobs are immutable, so they can be served from the local cache
+        # when it is enabled.
+        if blobcache.enabled:
+            return FileObj(blobcache.open(self), self.path)
+
         storage = get_storage()
+        if ranged and self.size is not None and hasattr(storage, 'read_range'):
+            return FileObj(RangedBlobReader(storage, self.path, self.size), self.path)
         return storage.open(self.path)
 
 
@@ -351,19 +408,27 @@ class File(Model):
         app_label = 'sentry'
         db_table = 'sentry_file'
 
+    def get_blob_indexes(self):
+        """
+        Returns the blob indexes of this file in order, with their blobs.
+        """
+        return list(FileBlobIndex.objects.filter(
+            file=self,
+        ).select_related('blob').order_by('offset'))
+
     def _get_chunked_blob(self, mode=None, prefetch=False,
-                          prefetch_to=None, delete=True):
+                          prefetch_to=None, delete=True, indexes=None):
+        if indexes is None:
+            indexes = self.get_blob_indexes()
         return ChunkedFileBlobIndexWrapper(
-            FileBlobIndex.objects.filter(
-                file=self,
-            ).select_related('blob').order_by('offset'),
+            indexes,
             mode=mode,
             prefetch=prefetch,
             prefetch_to=prefetch_to,
             delete=delete
         )
 
-    def getfile(self, mode=None, prefetch=False, as_tempfile=False):
+    def getfile(self, mode=None, prefetch=False, as_tempfile=False, indexes=None):
         """Returns a file object.  By default the file is fetched on
         demand but if prefetch is enabled the file is fully prefetched
         into a tempfile before reading can happen.
@@ -371,10 +436,14 @@ class File(Model):
         Additionally if `as_tempfile` is passed a NamedTemporaryFile is
         returned instead which can help in certain situations where a
         tempfile is necessary.
+
+        If the blob indexes were loaded with `get_blob_indexes` already
+        they can be passed as `indexes`, reading the file then does not
+        query the database.
         """
         if as_tempfile:
             prefetch = True
-        impl = self._get_chunked_blob(mode, prefetch)
+        impl = self._get_chunked_blob(mode, prefetch, indexes=indexes)
         if as_tempfile:
             return impl.detach_tempfile()
         return FileObj(impl, self.name)
@@ -448,22 +517,28 @@ class File(Model):
         """
         tf = tempfile.NamedTemporaryFile()
         with transaction.atomic():
-            file_blobs = FileBlob.objects.filter(id__in=file_blob_ids).all()
-            # Make sure the blobs are sorted with the order provided
-            file_blobs = sorted(file_blobs, key=lambda blob: file_blob_ids.index(blob.id))
+            blobs_by_id = FileBlob.objects.in_bulk(file_blob_ids)
+            # Make sure the blobs are in the order provided
+            file_blobs = [blobs_by_id[blob_id] for blob_id in file_blob_ids
+                          if blob_id in blobs_by_id]
 
-            new_checksum = sha1(b'')
+            indexes = []
             offset = 0
             for blob in file_blobs:
-                FileBlobIndex.objects.create(
+                indexes.append(FileBlobIndex(
                     file=self,
                     blob=blob,
                     offset=offset,
-                )
-                for chunk in blob.getfile().chunks():
-                    new_checksum.update(chunk)
-                    tf.write(chunk)
+                ))
                 offset += blob.size
+            FileBlobIndex.objects.bulk_create(indexes)
+
+            # The blobs are fetched in parallel and written in order, which
+            # only keeps a few of them in memory at a time.
+            new_checksum = sha1(b'')
+            for contents in _iter_blob_contents(file_blobs):
+                new_checksum.update(contents)
+                tf.write(contents)
 
             self.size = offset
             self.checksum = new_checksum.hexdigest()
@@ -479,6 +554,96 @@ class File(Model):
         return tf
 
 
+class RangedBlobReader(object):
+    """
+    Reads a blob with ranged requests to the file store. Until the reader
+    seeks away from its position, reads fetch the rest of the blob in one
+    request, so streaming a whole blob costs a single request. After a seek
+    only a small window is fetched, which grows on sequential reads.
+
+    Storages can implement ``supports_range`` to tell whether a blob can be
+    read in ranges at all; such blobs are read whole, once.
+    """
+
+    def __init__(self, storage, path, size):
+        self.storage = storage
+        self.path = path
+        self.size = size
+        self.closed = False
+        self._pos = 0
+        self._buffer = b''
+        self._buffer_offset = 0
+        self._read_ahead = MIN_READ_AHEAD
+        self._seeked = False
+        self._supports_range = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+
+    def _fill(self, start, end):
+        buffer_end = self._buffer_offset + len(self._buffer)
+        if self._buffer_offset <= start and end <= buffer_end:
+            return
+
+        if self._supports_range is None:
+            supports_range = getattr(self.storage, 'supports_range', None)
+            self._supports_range = supports_range is None or supports_range(self.path)
+        if not self._supports_range:
+            with self.storage.open(self.path) as f:
+                self._buffer = f.read()
+            self._buffer_offset = 0
+            return
+
+        if not self._seeked:
+            fetch_end = self.size
+        else:
+            if self._buffer and start == buffer_end:
+                self._read_ahead = min(self._read_ahead * 2, MAX_READ_AHEAD)
+            else:
+                self._read_ahead = MIN_READ_AHEAD
+            fetch_end = min(self.size, max(end, start + self._read_ahead))
+        self._buffer = self.storage.read_range(self.path, start, fetch_end - start)
+        self._buffer_offset = start
+
+    def read(self, n=-1):
+        if self.closed:
+            raise ValueError('I/O operation on closed file')
+
+        end = self.size if n is None or n < 0 else min(self.size, self._pos + n)
+        if end <= self._pos:
+            return b''
+
+        self._fill(self._pos, end)
+        rv = self._buffer[self._pos - self._buffer_offset:end - self._buffer_offset]
+        self._pos = end
+        return rv
+
+    def seek(self, pos, whence=os.SEEK_SET):
+        if self.closed:
+            raise ValueError('I/O operation on closed file')
+        if whence == os.SEEK_CUR:
+            pos += self._pos
+        elif whence == os.SEEK_END:
+            pos += self.size
+        if pos < 0:
+            raise IOError('Invalid argument')
+        if pos != self._pos:
+            self._seeked = True
+        self._pos = pos
+
+    def tell(self):
+        if self.closed:
+            raise ValueError('I/O operation on closed file')
+        return self._pos
+
+    def close(self):
+        self._buffer = b''
+        self.closed = True
+
+
 class FileBlobIndex(Model):
     __core__ = False
 
@@ -497,6 +662,7 @@ class ChunkedFileBlobIndexWrapper(object):
                  prefetch_to=None, delete=True):
         # eager load from database incase its a queryset
         self._indexes = list(indexes)
+        self._offsets = [idx.offset for idx in self._indexes]
         self._curfile = None
         self._curidx = None
         if prefetch:
@@ -528,7 +694,7 @@ class ChunkedFileBlobIndexWrapper(object):
         try:
             try:
                 self._curidx = six.next(self._idxiter)
-                self._curfile = self._curidx.blob.getfile()
+                self._curfile = self._curidx.blob.getfile(ranged=True)
             except StopIteration:
                 self._curidx = None
                 self._curfile = None
@@ -592,14 +758,14 @@ class ChunkedFileBlobIndexWrapper(object):
 
         if pos < 0:
             raise IOError('Invalid argument')
-        for n, idx in enumerate(self._indexes[::-1]):
-            if idx.offset <= pos:
-                if idx != self._curidx:
-                    self._idxiter = iter(self._indexes[-(n + 1):])
-                    self._nextidx()
-                break
-        else:
+        # Only the blob that contains the position is opened, and with
+        # ranged reads only the parts of it that are read are fetched.
+        n = bisect_right(self._offsets, pos) - 1
+        if n < 0:
             raise ValueError('Cannot seek to pos')
+        if self._indexes[n] != self._curidx:
+            self._idxiter = iter(self._indexes[n:])
+            self._nextidx()
         self._curfile.seek(pos - self._curidx.offset)
 
     def tell(self):
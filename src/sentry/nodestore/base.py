@@ -14,6 +14,7 @@ from base64 import b64encode
 from threading import local
 from uuid import uuid4
 
+from sentry.nodestore import codecs
 from sentry.utils.services import Service
 
 
@@ -23,6 +24,20 @@ class NodeStorage(local, Service):
         'cleanup', 'validate'
     )
 
+    #: The codec used to encode new payloads, ``None`` keeps writing the
+    #: backend's legacy format. Payloads are always decoded with whatever
+    #: codec they were written with.
+    codec = None
+
+    def configure_codec(self, codec=None, codec_options=None):
+        """
+        >>> nodestore.configure_codec('msgpack+zstd', {'dictionary': '/path/to/dict'})
+        """
+        if codec is None:
+            self.codec = None
+        else:
+            self.codec = codecs.get_codec(codec, **(codec_options or {}))
+
     def create(self, data):
         """
         >>> key = nodestore.create({'foo': 'bar'})
@@ -10,6 +10,7 @@ from google.cloud.bigtable.row_set import RowSet
 from simplejson import JSONEncoder, _default_decoder
 from django.utils import timezone
 
+from sentry.nodestore import codecs
 from sentry.nodestore.base import NodeStorage
 
 # Cache an instance of the encoder we want to use
@@ -63,6 +64,7 @@ class BigtableNodeStorage(NodeStorage):
     ...     table='nodestore',
     ...     default_ttl=timedelta(days=30),
     ...     compression=True,
+    ...     codec='msgpack',
     ... )
     """
 
@@ -73,11 +75,12 @@ class BigtableNodeStorage(NodeStorage):
     data_column = b'0'
 
     _FLAG_COMPRESSED = 1 << 0
+    _FLAG_CODEC = 1 << 1
 
     def __init__(self, project=None, instance='sentry', table='nodestore',
                  automatic_expiry=False, default_ttl=None, compression=False,
                  thread_pool_size=5,  # TODO(mattrobenolt): Remove this
-                 **kwargs):
+                 codec=None, codec_options=None, **kwargs):
         self.project = project
         self.instance = instance
         self.table = table
@@ -86,6 +89,7 @@ class BigtableNodeStorage(NodeStorage):
         self.default_ttl = default_ttl
         self.compression = compression
         self.skip_deletes = automatic_expiry and '_SENTRY_CLEANUP' in os.environ
+        self.configure_codec(codec, codec_options)
 
     @property
     def connection(self):
@@ -139,6 +143,11 @@ class BigtableNodeStorage(NodeStorage):
         if self.flags_column in columns:
             flags = struct.unpack('B', columns[self.flags_column][0].value)[0]
 
+        # Data written with a codec carries its own
+        # compression and format.
+        if flags & self._FLAG_CODEC:
+            return codecs.decode(data, self.codec)
+
         # Check for a compression flag on, if so
         # decompress the data.
         if flags & self._FLAG_COMPRESSED:
@@ -151,7 +160,10 @@ class BigtableNodeStorage(NodeStorage):
         row.commit()
 
     def encode_row(self, id, data, ttl=None):
-        data = json_dumps(data)
+        if self.codec is not None:
+            data = codecs.encode(data, self.codec)
+        else:
+            data = json_dumps(data)
 
         row = self.connection.row(id)
         # Call to delete is just a state mutation,
@@ -184,10 +196,12 @@ class BigtableNodeStorage(NodeStorage):
             )
 
         # Track flags for metadata about this row.
-        # This only flag we're tracking now is whether compression
-        # is on or not for the data column.
+        # We track whether the data column was written
+        # with a codec, or else whether compression is on.
         flags = 0
-        if self.compression:
+        if self.codec is not None:
+            flags |= self._FLAG_CODEC
+        elif self.compression:
             flags |= self._FLAG_COMPRESSED
             data = zlib_compress(data)
 
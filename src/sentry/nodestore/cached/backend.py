@@ -0,0 +1,173 @@
+"""
+sentry.nodestore.cached.backend
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+:copyright: (c) 2010-2019 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+from __future__ import absolute_import
+
+import logging
+import six
+
+from sentry.nodestore import codecs
+from sentry.nodestore.base import NodeStorage
+from sentry.utils import metrics
+from sentry.utils.datastructures import LRUCache
+from sentry.utils.imports import import_string
+from sentry.utils.redis import clusters
+
+logger = logging.getLogger(__name__)
+
+
+class CachedNodeStorage(NodeStorage):
+    """
+    Wraps another node storage backend with a read-through cache.
+
+    Nodes are cached in a bounded in-process LRU (sized by the encoded size
+    of the node) and optionally in a shared Redis cluster. Writes and deletes
+    go to the wrapped backend and invalidate both tiers. Other processes only
+    see the invalidation of the Redis tier, so ``local_ttl`` bounds how long
+    a process can serve a node that was changed elsewhere. Like all node
+    storage state, the local tier is kept per thread.
+
+    >>> CachedNodeStorage(
+    ...     backend='sentry.nodestore.bigtable.BigtableNodeStorage',
+    ...     backend_options={'project': 'some-project'},
+    ...     local_size=50 * 1024 * 1024,
+    ...     redis_cluster='default',
+    ... )
+    """
+
+    def __init__(self, backend, backend_options=None, local_size=20 * 1024 * 1024,
+                 local_ttl=60, redis_cluster=None, redis_ttl=60 * 60,
+                 max_node_size=1024 * 1024, key_prefix='nc'):
+        if isinstance(backend, six.string_types):
+            backend = import_string(backend)(**(backend_options or {}))
+        self.backend = backend
+        self.local = LRUCache(local_size, ttl=local_ttl) if local_size else None
+        self.cluster = clusters.get(redis_cluster) if redis_cluster else None
+        self.redis_ttl = redis_ttl
+        self.max_node_size = max_node_size
+        self.key_prefix = key_prefix
+        # Payloads are only kept for a short time, favor speed over size.
+        self.cache_codec = codecs.MsgpackCodec(level=1)
+
+    def _make_key(self, id):
+        return u'{}:{}'.format(self.key_prefix, id)
+
+    def _encode(self, data):
+        try:
+            return codecs.encode(data, self.cache_codec)
+        except (TypeError, ValueError):
+            logger.warning('nodestore.cache.encode-failed', exc_info=True)
+            return None
+
+    def _get_local(self, id_list):
+        if self.local is None:
+            return {}
+        rv = {}
+        for id in id_list:
+            value = self.local.get(id)
+            if value is not None:
+                rv[id] = value
+        return rv
+
+    def _get_redis(self, id_list):
+        if self.cluster is None or not id_list:
+            return {}
+        with self.cluster.map() as client:
+            promises = {id: client.get(self._make_key(id)) for id in id_list}
+        return {
+            id: promise.value
+            for id, promise in six.iteritems(promises) if promise.value is not None
+        }
+
+    def _fill(self, values, redis=True):
+        if self.local is not None:
+            for id, value in six.iteritems(values):
+                self.local.set(id, value, size=len(value))
+        if redis and self.cluster is not None and values:
+            with self.cluster.map() as client:
+                for id, value in six.iteritems(values):
+                    client.setex(self._make_key(id), self.redis_ttl, value)
+
+    def _invalidate(self, id_list):
+        if self.local is not None:
+            for id in id_list:
+                self.local.delete(id)
+        if self.cluster is not None and id_list:
+            with self.cluster.map() as client:
+                for id in id_list:
+                    client.delete(self._make_key(id))
+
+    def get(self, id):
+        return self.get_multi([id])[id]
+
+    def get_multi(self, id_list):
+        id_list = list(id_list)
+        cached = self._get_local(id_list)
+        local_hits = len(cached)
+
+        missing = [id for id in id_list if id not in cached]
+        from_redis = self._get_redis(missing)
+        if from_redis:
+            self._fill(from_redis, redis=False)
+            cached.update(from_redis)
+
+        rv = {}
+        for id, value in six.iteritems(cached):
+            try:
+                rv[id] = codecs.decode(value, self.cache_codec)
+            except Exception:
+                logger.warning('nodestore.cache.decode-failed', exc_info=True)
+
+        missing = [id for id in id_list if id not in rv]
+        if missing:
+            from_backend = self.backend.get_multi(missing)
+            to_cache = {}
+            for id in missing:
+                data = rv[id] = from_backend.get(id)
+                if data is None:
+                    continue
+                value = self._encode(data)
+                if value is not None and len(value) <= self.max_node_size:
+                    to_cache[id] = value
+            self._fill(to_cache)
+
+        metrics.incr('nodestore.cache.hit', local_hits, tags={'tier': 'local'})
+        metrics.incr('nodestore.cache.hit', len(from_redis), tags={'tier': 'redis'})
+        metrics.incr('nodestore.cache.miss', len(missing))
+        return rv
+
+    def set(self, id, data, ttl=None):
+        self.backend.set(id, data, ttl=ttl)
+        self._invalidate([id])
+
+    def set_multi(self, values):
+        self.backend.set_multi(values)
+        self._invalidate(list(values))
+
+    def delete(self, id):
+        self.backend.delete(id)
+        self._invalidate([id])
+
+    def delete_multi(self, id_list):
+        self.backend.delete_multi(id_list)
+        self._invalidate(id_list)
+
+    def generate_id(self):
+        return self.backend.generate_id()
+
+    def cleanup(self, cutoff_timestamp):
+        self.backend.cleanup(cutoff_timestamp)
+        if self.local is not None:
+            self.local.clear()
+
+    def validate(self):
+        self.backend.validate()
+
+    def bootstrap(self):
+        bootstrap = getattr(self.backend, 'bootstrap', None)
+        if bootstrap is not None:
+            bootstrap()
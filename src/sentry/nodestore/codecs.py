@@ -0,0 +1,211 @@
+"""
+sentry.nodestore.codecs
+~~~~~~~~~~~~~~~~~~~~~~~
+
+Versioned encodings for node payloads.
+
+Every encoded payload starts with ``MAGIC`` followed by a single byte that
+identifies the codec, which is how payloads are told apart from the legacy
+formats written by the backends (pickle/zlib, JSON, zlib compressed JSON)
+that never start with these bytes.
+
+:copyright: (c) 2010-2019 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import
+
+import base64
+import struct
+import zlib
+
+import msgpack
+import six
+
+from sentry.utils import json
+
+MAGIC = b'\xffN'
+
+# Text columns cannot store arbitrary bytes, so payloads are base64 encoded
+# and prefixed with a marker that is not part of the base64 alphabet.
+TEXT_PREFIX = u'nc:'
+
+_codecs = {}
+_dictionaries = {}
+
+
+class NodeCodec(object):
+    """
+    Turns node data into bytes and back.
+    """
+    #: Single byte stored in front of every payload, never reuse one.
+    id = None
+    #: Name used to select the codec in the backend options.
+    name = None
+
+    def encode(self, data):
+        raise NotImplementedError
+
+    def decode(self, payload):
+        raise NotImplementedError
+
+
+class JsonCodec(NodeCodec):
+    id = 1
+    name = 'json'
+
+    def encode(self, data):
+        return json.dumps(data).encode('utf-8')
+
+    def decode(self, payload):
+        return json.loads(payload.decode('utf-8'))
+
+
+class MsgpackCodec(NodeCodec):
+    """
+    msgpack with zlib compression. Unlike JSON this preserves binary strings.
+    """
+    id = 2
+    name = 'msgpack'
+
+    def __init__(self, level=6):
+        self.level = level
+
+    def encode(self, data):
+        return zlib.compress(_pack(data), self.level)
+
+    def decode(self, payload):
+        return _unpack(zlib.decompress(payload))
+
+
+class ZstdMsgpackCodec(NodeCodec):
+    """
+    msgpack with zstd compression, optionally using a trained dictionary.
+
+    The id of the dictionary is stored with every payload. All dictionaries
+    that were ever used for writing need to stay registered (see
+    ``register_dictionary``) for the payloads to remain readable.
+
+    This requires the ``zstandard`` package.
+    """
+    id = 3
+    name = 'msgpack+zstd'
+
+    def __init__(self, level=3, dictionary=None):
+        import zstandard
+
+        self.zstandard = zstandard
+        self.level = level
+        self.dictionary = None
+        if dictionary is not None:
+            if not isinstance(dictionary, six.binary_type):
+                with open(dictionary, 'rb') as f:
+                    dictionary = f.read()
+            self.dictionary = register_dictionary(dictionary)
+
+        if self.dictionary is not None:
+            self.compressor = zstandard.ZstdCompressor(
+                level=level, dict_data=self.dictionary)
+        else:
+            self.compressor = zstandard.ZstdCompressor(level=level)
+
+    def encode(self, data):
+        dict_id = self.dictionary.dict_id() if self.dictionary is not None else 0
+        return struct.pack('>I', dict_id) + self.compressor.compress(_pack(data))
+
+    def decode(self, payload):
+        dict_id, = struct.unpack('>I', payload[:4])
+        if dict_id:
+            try:
+                dictionary = _dictionaries[dict_id]
+            except KeyError:
+                raise ValueError('Unknown zstd dictionary: %d' % dict_id)
+            decompressor = self.zstandard.ZstdDecompressor(dict_data=dictionary)
+        else:
+            decompressor = self.zstandard.ZstdDecompressor()
+        return _unpack(decompressor.decompress(payload[4:]))
+
+
+def _pack(data):
+    return msgpack.packb(data, use_bin_type=True)
+
+
+def _unpack(payload):
+    return msgpack.unpackb(payload, raw=False)
+
+
+def register(cls):
+    assert 0 < cls.id < 256
+    assert cls.id not in _codecs, 'codec id %d is already taken' % cls.id
+    _codecs[cls.id] = cls
+    return cls
+
+
+register(JsonCodec)
+register(MsgpackCodec)
+register(ZstdMsgpackCodec)
+
+
+def register_dictionary(data):
+    """
+    Makes a trained zstd dictionary available for decoding.
+    """
+    import zstandard
+
+    dictionary = zstandard.ZstdCompressionDict(data)
+    return _dictionaries.setdefault(dictionary.dict_id(), dictionary)
+
+
+def train_dictionary(samples, size=112640):
+    """
+    Trains a zstd dictionary from a list of node payloads.
+    """
+    import zstandard
+
+    return zstandard.train_dictionary(size, [_pack(s) for s in samples]).as_bytes()
+
+
+def get_codec(name, **options):
+    for cls in six.itervalues(_codecs):
+        if cls.name == name:
+            return cls(**options)
+    raise ValueError('Unknown node codec: %r' % (name, ))
+
+
+def _get_decoder(codec_id, codec=None):
+    if codec is not None and codec.id == codec_id:
+        return codec
+    try:
+        return _codecs[codec_id]()
+    except KeyError:
+        raise ValueError('Unknown node codec id: %d' % codec_id)
+
+
+def is_encoded(value):
+    return isinstance(value, six.binary_type) and value[:len(MAGIC)] == MAGIC
+
+
+def encode(data, codec):
+    return MAGIC + six.int2byte(codec.id) + codec.encode(data)
+
+
+def decode(value, codec=None):
+    """
+    Decodes a payload written by ``encode``. ``codec`` is used if the
+    payload was written with it, which avoids setting up a new instance.
+    """
+    assert is_encoded(value)
+    codec_id = six.indexbytes(value, len(MAGIC))
+    return _get_decoder(codec_id, codec).decode(value[len(MAGIC) + 1:])
+
+
+def is_text_encoded(value):
+    return isinstance(value, six.string_types) and value.startswith(TEXT_PREFIX)
+
+
+def encode_text(data, codec):
+    return TEXT_PREFIX + base64.b64encode(encode(data, codec)).decode('ascii')
+
+
+def decode_text(value, codec=None):
+    return decode(base64.b64decode(value[len(TEXT_PREFIX):]), codec)
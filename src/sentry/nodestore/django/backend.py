@@ -13,12 +13,16 @@ import math
 from django.utils import timezone
 
 from sentry.db.models import create_or_update
+from sentry.nodestore import codecs
 from sentry.nodestore.base import NodeStorage
 
-from .models import Node
+from .models import EncodedNodeData, Node
 
 
 class DjangoNodeStorage(NodeStorage):
+    def __init__(self, codec=None, codec_options=None):
+        self.configure_codec(codec, codec_options)
+
     def delete(self, id):
         Node.objects.filter(id=id).delete()
 
@@ -35,6 +39,9 @@ class DjangoNodeStorage(NodeStorage):
         Node.objects.filter(id__in=id_list).delete()
 
     def set(self, id, data, ttl=None):
+        if self.codec is not None:
+            data = EncodedNodeData(codecs.encode_text(data, self.codec))
+
         create_or_update(
             Node,
             id=id,
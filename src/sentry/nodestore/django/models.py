@@ -8,10 +8,45 @@ sentry.nodestore.django.models
 
 from __future__ import absolute_import
 
+import six
+
+from django.conf import settings
 from django.db import models
 from django.utils import timezone
 
 from sentry.db.models import (BaseModel, GzippedDictField, sane_repr)
+from sentry.nodestore import codecs
+
+
+class EncodedNodeData(six.text_type):
+    """
+    Node data that was already encoded with a node codec.
+    """
+
+
+class NodeDataField(GzippedDictField):
+    """
+    Reads and writes codec encoded node data (see ``sentry.nodestore.codecs``)
+    and falls back to the legacy pickle format of ``GzippedDictField``.
+    """
+
+    def to_python(self, value):
+        if isinstance(value, EncodedNodeData):
+            return value
+        if codecs.is_text_encoded(value):
+            return codecs.decode_text(value)
+        return super(NodeDataField, self).to_python(value)
+
+    def get_prep_value(self, value):
+        if isinstance(value, EncodedNodeData):
+            return six.text_type(value)
+        return super(NodeDataField, self).get_prep_value(value)
+
+
+if 'south' in settings.INSTALLED_APPS:
+    from south.modelsinspector import add_introspection_rules
+
+    add_introspection_rules([], ["^sentry\.nodestore\.django\.models\.NodeDataField"])
 
 
 class Node(BaseModel):
@@ -20,7 +55,7 @@ class Node(BaseModel):
     id = models.CharField(max_length=40, primary_key=True)
     # TODO(dcramer): this being pickle and not JSON has the ability to cause
     # hard errors as it accepts other serialization than native JSON
-    data = GzippedDictField()
+    data = NodeDataField()
     timestamp = models.DateTimeField(default=timezone.now, db_index=True)
 
     __repr__ = sane_repr('timestamp')
@@ -13,6 +13,7 @@ import six
 
 from simplejson import JSONEncoder, _default_decoder
 
+from sentry.nodestore import codecs
 from sentry.nodestore.base import NodeStorage
 from .client import RiakClient
 
@@ -49,6 +50,8 @@ class RiakNodeStorage(NodeStorage):
         tcp_keepalive=True,
         protocol=None,
         automatic_expiry=False,
+        codec=None,
+        codec_options=None,
     ):
         # protocol being defined is useless, but is needed for backwards
         # compatability and leveraged as an opportunity to yell at the user
@@ -67,9 +70,20 @@ class RiakNodeStorage(NodeStorage):
         )
         self.automatic_expiry = automatic_expiry
         self.skip_deletes = automatic_expiry and '_SENTRY_CLEANUP' in os.environ
+        self.configure_codec(codec, codec_options)
+
+    def encode(self, data):
+        if self.codec is not None:
+            return codecs.encode(data, self.codec)
+        return json_dumps(data)
+
+    def decode(self, value):
+        if codecs.is_encoded(value):
+            return codecs.decode(value, self.codec)
+        return json_loads(value)
 
     def set(self, id, data, ttl=None):
-        self.conn.put(self.bucket, id, json_dumps(data), returnbody='false')
+        self.conn.put(self.bucket, id, self.encode(data), returnbody='false')
 
     def delete(self, id):
         if self.skip_deletes:
@@ -80,7 +94,7 @@ class RiakNodeStorage(NodeStorage):
         rv = self.conn.get(self.bucket, id, r=1)
         if rv.status != 200:
             return None
-        return json_loads(rv.data)
+        return self.decode(rv.data)
 
     def get_multi(self, id_list):
         # shortcut for just one id since this is a common
@@ -97,7 +111,7 @@ class RiakNodeStorage(NodeStorage):
             if value.status != 200:
                 results[key] = None
             else:
-                results[key] = json_loads(value.data)
+                results[key] = self.decode(value.data)
         return results
 
     def cleanup(self, cutoff_timestamp):
@@ -65,6 +65,11 @@ register(
     default='/tmp/sentry-dsym-cache',
     flags=FLAG_PRIORITIZE_DISK)
 
+# Digests
+# Number of timelines that are delivered by one task, 0 delivers every
+# timeline in its own task.
+register('digests.delivery-batch-size', default=0)
+
 # Mail
 register('mail.backend', default='smtp', flags=FLAG_NOSTORE)
 register('mail.host', default='localhost', flags=FLAG_REQUIRED | FLAG_PRIORITIZE_DISK)
@@ -105,6 +110,13 @@ register('beacon.anonymous', type=Bool, flags=FLAG_REQUIRED)
 # Filestore
 register('filestore.backend', default='filesystem', flags=FLAG_NOSTORE)
 register('filestore.options', default={'location': '/tmp/sentry-files'}, flags=FLAG_NOSTORE)
+# Local disk cache for file blobs, disabled while the size (in bytes) is 0
+register(
+    'filestore.cache-path',
+    type=String,
+    default='/tmp/sentry-blob-cache',
+    flags=FLAG_PRIORITIZE_DISK)
+register('filestore.cache-size', default=0, flags=FLAG_PRIORITIZE_DISK)
 
 # Symbol server
 register('symbolserver.enabled', default=False, flags=FLAG_ALLOW_EMPTY | FLAG_PRIORITIZE_DISK)
@@ -159,6 +171,7 @@ register('snuba.search.chunk-growth-rate', default=1.5)
 register('snuba.search.max-chunk-size', default=2000)
 register('snuba.search.max-total-chunk-time-seconds', default=30.0)
 register('snuba.search.hits-sample-size', default=100)
+register('snuba.search.result-cache-ttl', default=0)
 register('snuba.events-queries.enabled', type=Bool, default=False)
 register('snuba.track-outcomes-sample-rate', default=0.0)
 
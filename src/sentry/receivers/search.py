@@ -0,0 +1,25 @@
+from __future__ import absolute_import, print_function
+
+from django.db.models.signals import post_delete, post_save
+
+from sentry.models import Group
+
+
+def invalidate_search_results(instance, **kwargs):
+    from sentry.search.snuba.backend import invalidate_result_cache
+
+    invalidate_result_cache([instance.project_id])
+
+
+post_save.connect(
+    invalidate_search_results,
+    sender=Group,
+    dispatch_uid="invalidate_search_results",
+    weak=False,
+)
+post_delete.connect(
+    invalidate_search_results,
+    sender=Group,
+    dispatch_uid="invalidate_search_results",
+    weak=False,
+)
@@ -106,3 +106,6 @@ class EventState(object):
         self.is_regression = is_regression
         self.is_new_group_environment = is_new_group_environment
         self.has_reappeared = has_reappeared
+        # Values computed by conditions while processing the event, shared
+        # between all rules that check the same thing.
+        self.cache = {}
@@ -66,11 +66,16 @@ class BaseEventFrequencyCondition(EventCondition):
         if not interval:
             return False
 
-        current_value = self.get_rate(
-            event,
-            interval,
-            self.rule.environment_id,
-        )
+        environment_id = self.rule.environment_id
+        cache_key = (self.id, event.group_id, interval, environment_id)
+        try:
+            current_value = state.cache[cache_key]
+        except KeyError:
+            current_value = state.cache[cache_key] = self.get_rate(
+                event,
+                interval,
+                environment_id,
+            )
 
         return current_value > value
 
@@ -51,11 +51,25 @@ class RuleProcessor(object):
         self.has_reappeared = has_reappeared
 
         self.grouped_futures = {}
+        self.rule_statuses = {}
 
     def get_rules(self):
         return Rule.get_for_project(self.project.id)
 
+    def prefetch_rule_statuses(self, rules):
+        self.rule_statuses = {
+            status.rule_id: status
+            for status in GroupRuleStatus.objects.filter(
+                group=self.group,
+                rule__in=[rule.id for rule in rules],
+            )
+        }
+
     def get_rule_status(self, rule):
+        rule_status = self.rule_statuses.get(rule.id)
+        if rule_status is not None:
+            return rule_status
+
         rule_status, _ = GroupRuleStatus.objects.get_or_create(
             rule=rule,
             group=self.group,
@@ -83,7 +97,7 @@ class RuleProcessor(object):
             has_reappeared=self.has_reappeared,
         )
 
-    def apply_rule(self, rule):
+    def apply_rule(self, rule, state=None):
         match = rule.data.get('action_match') or Rule.DEFAULT_ACTION_MATCH
         condition_list = rule.data.get('conditions', ())
         frequency = rule.data.get('frequency') or Rule.DEFAULT_FREQUENCY
@@ -105,7 +119,8 @@ class RuleProcessor(object):
         if status.last_active and status.last_active > freq_offset:
             return
 
-        state = self.get_state()
+        if state is None:
+            state = self.get_state()
 
         condition_iter = (self.condition_matches(c, state, rule) for c in condition_list)
 
@@ -154,6 +169,11 @@ class RuleProcessor(object):
 
     def apply(self):
         self.grouped_futures.clear()
-        for rule in self.get_rules():
-            self.apply_rule(rule)
+        rules = self.get_rules()
+        self.prefetch_rule_statuses(rules)
+        # The state is shared by all rules, so conditions that are checked by
+        # several rules (like event frequencies) are only computed once.
+        state = self.get_state()
+        for rule in rules:
+            self.apply_rule(rule, state)
         return six.itervalues(self.grouped_futures)
@@ -160,9 +160,11 @@ def cleanup(days, project, concurrency, silent, model, router, timed):
     from sentry.runner import configure
     configure()
 
+    from django.conf import settings
     from django.db import router as db_router
     from sentry.app import nodestore
     from sentry.db.deletion import BulkDeleteQuery
+    from sentry.db.partitions import PartitionManager, is_partitioned_model
     from sentry import models
 
     if timed:
@@ -180,6 +182,23 @@ def cleanup(days, project, concurrency, silent, model, router, timed):
             return False
         return model.__name__.lower() not in model_list
 
+    def drop_expired_partitions(model):
+        # Partitions hold the rows of all projects, and the node data of
+        # events is only removed in bulk without a project restriction.
+        if project_id is not None or not is_partitioned_model(model):
+            return
+
+        manager = PartitionManager(model)
+        if not manager.is_partitioned():
+            return
+
+        now = timezone.now()
+        manager.create_partitions(
+            now, now + timedelta(days=settings.SENTRY_PARTITIONS_CREATE_AHEAD))
+        dropped = manager.drop_expired_partitions(now - timedelta(days=days))
+        if not silent:
+            click.echo(u'>> Dropped {} expired partitions'.format(len(dropped)))
+
     # Deletions that use `BulkDeleteQuery` (and don't need to worry about child relations)
     # (model, datetime_field, order_by)
     BULK_QUERY_DELETES = [
@@ -265,6 +284,7 @@ def cleanup(days, project, concurrency, silent, model, router, timed):
             if not silent:
                 click.echo('>> Skipping %s' % model.__name__)
         else:
+            drop_expired_partitions(model)
             BulkDeleteQuery(
                 model=model,
                 dtfield=dtfield,
@@ -287,6 +307,7 @@ def cleanup(days, project, concurrency, silent, model, router, timed):
             if not silent:
                 click.echo('>> Skipping %s' % model.__name__)
         else:
+            drop_expired_partitions(model)
             imp = '.'.join((model.__module__, model.__name__))
 
             q = BulkDeleteQuery(
@@ -3,10 +3,12 @@ from __future__ import absolute_import
 import functools
 import logging
 import time
-from datetime import timedelta
+from datetime import datetime, timedelta
 from hashlib import md5
+from uuid import uuid4
 
-from django.db.models import Q
+import six
+from django.db.models import Model, Q
 from django.utils import timezone
 
 from sentry import (
@@ -21,7 +23,10 @@ from sentry.api.paginator import DateTimePaginator, SequencePaginator, Paginator
 from sentry.event_manager import ALLOWED_FUTURE_DELTA
 from sentry.models import Group
 from sentry.search.base import SearchBackend
-from sentry.utils import snuba, metrics
+from sentry.utils import json, snuba, metrics
+from sentry.utils.cache import cache
+from sentry.utils.cursors import Cursor, CursorResult
+from sentry.utils.dates import to_timestamp
 from sentry.utils.db import is_postgres
 
 logger = logging.getLogger('sentry.search.snuba')
@@ -55,6 +60,58 @@ issue_only_fields = set([
     'subscribed_by', 'active_at', 'first_release', 'first_seen',
 ])
 
+# Cached results are keyed by a version per project, which needs to outlive
+# the results themselves.
+RESULT_CACHE_VERSION_TTL = 60 * 60
+
+
+class UncacheableQuery(Exception):
+    pass
+
+
+def get_result_cache_version_key(project_id):
+    return u'search:version:{}'.format(project_id)
+
+
+def invalidate_result_cache(project_ids):
+    """\
+    Discards the cached search results of the given projects, needs to be
+    called whenever groups of the projects are changed in a way that affects
+    search results (for instance their status.)
+    """
+    if not options.get('snuba.search.result-cache-ttl'):
+        return
+    cache.set_many(
+        {get_result_cache_version_key(project_id): uuid4().hex for project_id in project_ids},
+        RESULT_CACHE_VERSION_TTL,
+    )
+
+
+def normalize_for_cache_key(value, bucket):
+    """\
+    Turns query parameters into a canonical structure that can be serialized
+    to JSON. Datetimes are rounded down to ``bucket`` seconds, so relative
+    dates (like ``age:-24h``) resolve to the same key for that long.
+    """
+    if value is None or isinstance(value, (bool, float) + six.integer_types + six.string_types):
+        return value
+    if isinstance(value, datetime):
+        return int(to_timestamp(value)) // bucket
+    if isinstance(value, Model):
+        return [type(value).__name__, value.pk]
+    if isinstance(value, Cursor):
+        return [value.value, value.offset, value.is_prev]
+    if isinstance(value, dict):
+        return sorted(
+            [k, normalize_for_cache_key(v, bucket)] for k, v in six.iteritems(value)
+        )
+    if isinstance(value, (set, frozenset)):
+        return sorted(normalize_for_cache_key(v, bucket) for v in value)
+    if isinstance(value, (list, tuple)):
+        # This includes the search filter namedtuples.
+        return [normalize_for_cache_key(v, bucket) for v in value]
+    raise UncacheableQuery(type(value).__name__)
+
 
 class QuerySetBuilder(object):
     def __init__(self, conditions):
@@ -216,6 +273,25 @@ class SnubaSearchBackend(SearchBackend):
         if paginator_options is None:
             paginator_options = {}
 
+        cache_ttl = options.get('snuba.search.result-cache-ttl')
+        cache_key = None
+        if cache_ttl:
+            cache_key = self.get_result_cache_key(
+                cache_ttl, projects, environments, sort_by, limit, cursor, count_hits,
+                paginator_options, search_filters, date_from, date_to,
+            )
+        if cache_key is not None:
+            result = cache.get(cache_key)
+            metrics.incr(
+                'snuba.search.result_cache',
+                tags={'result': 'miss' if result is None else 'hit'},
+                skip_internal=False,
+            )
+            if result is not None:
+                groups = Group.objects.in_bulk(result.results)
+                result.results = [groups[k] for k in result.results if k in groups]
+                return result
+
         group_queryset = Group.objects.filter(project__in=projects).exclude(status__in=[
             GroupStatus.PENDING_DELETION,
             GroupStatus.DELETION_IN_PROGRESS,
@@ -287,12 +363,91 @@ class SnubaSearchBackend(SearchBackend):
         # This is a punt because the SnubaSearchBackend (a subclass) shares so much that it
         # seemed better to handle all the shared initialization and then handoff to the
         # actual backend.
-        return self._query(
+        result = self._query(
             projects, retention_window_start, group_queryset, environments,
             sort_by, limit, cursor, count_hits, paginator_options,
             search_filters, date_from, date_to,
         )
 
+        if cache_key is not None:
+            cache.set(cache_key, CursorResult(
+                [group.id for group in result.results],
+                result.next,
+                result.prev,
+                hits=result.hits,
+                max_hits=result.max_hits,
+            ), cache_ttl)
+
+        return result
+
+    def get_group_count(self, projects):
+        """\
+        Returns the number of groups in the projects, cached for a while as it
+        is only used for estimates.
+        """
+        project_ids = sorted(p.id for p in projects)
+        cache_key = u'search:group-count:{}'.format(
+            md5(u','.join(six.text_type(p) for p in project_ids).encode('utf-8')).hexdigest(),
+        )
+        count = cache.get(cache_key)
+        if count is None:
+            count = Group.objects.filter(project_id__in=project_ids).count()
+            cache.set(cache_key, count, options.get('snuba.search.project-group-count-cache-time'))
+        return count
+
+    def get_max_candidates(self, projects):
+        """\
+        Returns the maximum number of candidates from Postgres that are passed
+        down to Snuba.
+
+        With the optimizer enabled this is a share of all groups in the
+        projects: if the Postgres filters match more than that, they are not
+        selective and it is cheaper to let Snuba filter and sort first and to
+        post-filter its results than to send a huge ``IN`` clause.
+        """
+        max_candidates = options.get('snuba.search.max-pre-snuba-candidates')
+        if not options.get('snuba.search.pre-snuba-candidates-optimizer'):
+            return max_candidates
+
+        group_count = self.get_group_count(projects)
+        estimate = int(group_count * options.get('snuba.search.pre-snuba-candidates-percentage'))
+        rv = max(
+            options.get('snuba.search.min-pre-snuba-candidates'),
+            min(max_candidates, estimate),
+        )
+        metrics.timing('snuba.search.max_candidates', rv)
+        return rv
+
+    def get_result_cache_key(self, cache_ttl, projects, environments, sort_by, limit,
+                             cursor, count_hits, paginator_options, search_filters,
+                             date_from, date_to):
+        """\
+        Returns the key results of this query are cached under, or ``None``
+        if the query cannot be cached.
+        """
+        project_ids = sorted(p.id for p in projects)
+        versions = cache.get_many([get_result_cache_version_key(p) for p in project_ids])
+        try:
+            parameters = normalize_for_cache_key([
+                project_ids,
+                [versions.get(get_result_cache_version_key(p)) for p in project_ids],
+                sorted(e.id for e in environments) if environments is not None else None,
+                sort_by,
+                limit,
+                cursor,
+                count_hits,
+                paginator_options,
+                search_filters,
+                date_from,
+                date_to,
+                # Searches that end "now" move with time.
+                timezone.now(),
+            ], cache_ttl)
+        except UncacheableQuery as e:
+            metrics.incr('snuba.search.result_cache.uncacheable', tags={'type': six.text_type(e)})
+            return None
+        return u'search:result:{}'.format(md5(json.dumps(parameters).encode('utf-8')).hexdigest())
+
     def _query(self, projects, retention_window_start, group_queryset, environments,
                sort_by, limit, cursor, count_hits, paginator_options, search_filters,
                date_from, date_to):
@@ -400,7 +555,7 @@ class SnubaSearchBackend(SearchBackend):
         # Here we check if all the django filters reduce the set of groups down
         # to something that we can send down to Snuba in a `group_id IN (...)`
         # clause.
-        max_candidates = options.get('snuba.search.max-pre-snuba-candidates')
+        max_candidates = self.get_max_candidates(projects)
         too_many_candidates = False
         candidate_ids = list(
             group_queryset.values_list('id', flat=True)[:max_candidates + 1]
@@ -424,6 +579,12 @@ class SnubaSearchBackend(SearchBackend):
             too_many_candidates = True
             candidate_ids = []
 
+        metrics.incr(
+            'snuba.search.strategy',
+            tags={'strategy': 'post_filter' if too_many_candidates else 'candidates'},
+            skip_internal=False,
+        )
+
         sort_field = sort_strategies[sort_by]
         chunk_growth = options.get('snuba.search.chunk-growth-rate')
         max_chunk_size = options.get('snuba.search.max-chunk-size')
@@ -432,6 +593,8 @@ class SnubaSearchBackend(SearchBackend):
         num_chunks = 0
         hits = None
 
+        hit_ratio = None
+
         paginator_results = EMPTY_RESULT
         result_groups = []
         result_group_ids = set()
@@ -495,6 +658,13 @@ class SnubaSearchBackend(SearchBackend):
                 hit_ratio = filtered_count / float(snuba_count)
                 hits = int(hit_ratio * snuba_total)
 
+        if too_many_candidates and hit_ratio:
+            # The sample tells us roughly which share of the Snuba results
+            # survive post-filtering, so start with a chunk that is large
+            # enough to fill the page (the loop grows it once more.)
+            chunk_limit = int(min(limit / hit_ratio, max_chunk_size) / chunk_growth)
+            metrics.timing('snuba.search.estimated_hit_ratio', hit_ratio)
+
         # Do smaller searches in chunks until we have enough results
         # to answer the query (or hit the end of possible results). We do
         # this because a common case for search is to return 100 groups
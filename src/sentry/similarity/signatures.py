@@ -9,15 +9,31 @@ class MinHashSignatureBuilder(object):
         self.rows = rows
 
     def __call__(self, features):
-        return map(
-            lambda column: min(
-                map(
-                    lambda feature: mmh3.hash(
-                        feature,
-                        column,
-                    ) % self.rows,
-                    features,
-                ),
-            ),
-            range(self.columns),
-        )
+        return self.build_many([features])[0]
+
+    def build_many(self, feature_sets):
+        """
+        Returns the signatures of several feature sets. Every distinct
+        feature is hashed once for all columns, no matter how often it occurs
+        in or across the feature sets.
+        """
+        columns = range(self.columns)
+        rows = self.rows
+        hash = mmh3.hash
+
+        hashes = {}
+        signatures = []
+        for features in feature_sets:
+            features = set(features)
+            if not features:
+                raise ValueError('cannot build a signature without features')
+
+            for feature in features:
+                if feature not in hashes:
+                    hashes[feature] = [hash(feature, column) % rows for column in columns]
+
+            signatures.append([
+                min(values) for values in zip(*[hashes[feature] for feature in features])
+            ])
+
+        return signatures
@@ -7,8 +7,9 @@ from django.utils import timezone
 
 from collections import namedtuple, OrderedDict
 
+from sentry.cache import default_cache
 from sentry.models import Project, Release
-from sentry.utils.cache import cache
+from sentry.utils import metrics
 from sentry.utils.hashlib import hash_values
 from sentry.utils.safe import get_path, safe_execute
 from sentry.stacktraces.functions import trim_function_name
@@ -31,6 +32,7 @@ class ProcessableFrame(object):
         self.data = None
         self.cache_key = None
         self.cache_value = None
+        self.pending_cache_value = None
         self.processable_frames = processable_frames
 
     def __repr__(self):
@@ -64,8 +66,11 @@ class ProcessableFrame(object):
         return self.processable_frames[last_idx]
 
     def set_cache_value(self, value):
+        """Remembers the value for the frame cache.  Values are written in
+        one batch once the stacktraces are processed.
+        """
         if self.cache_key is not None:
-            cache.set(self.cache_key, value, 3600)
+            self.pending_cache_value = value
             return True
         return False
 
@@ -88,6 +93,15 @@ class StacktraceProcessingTask(object):
         for frame in self.iter_processable_frames():
             frame.close()
 
+    def write_frame_cache(self):
+        values = {}
+        for frame in self.iter_processable_frames():
+            if frame.pending_cache_value is not None:
+                values[frame.cache_key] = frame.pending_cache_value
+                frame.pending_cache_value = None
+        if values:
+            store_frame_cache(values)
+
     def iter_processors(self):
         return iter(self.processors)
 
@@ -371,12 +385,20 @@ def process_single_stacktrace(processing_task, stacktrace_info, processable_fram
 
 
 def lookup_frame_cache(keys):
-    rv = {}
-    for key in keys:
-        rv[key] = cache.get(key)
+    keys = list(keys)
+    if not keys:
+        return {}
+    rv = default_cache.get_many(keys)
+    metrics.timing('stacktraces.frame_cache.lookups', len(keys))
+    metrics.timing('stacktraces.frame_cache.hit_ratio', float(len(rv)) / len(keys))
     return rv
 
 
+def store_frame_cache(values):
+    default_cache.set_many(values, 3600)
+    metrics.timing('stacktraces.frame_cache.writes', len(values))
+
+
 def get_stacktrace_processing_task(infos, processors):
     """Returns a list of all tasks for the processors.  This can skip over
     processors that seem to not handle any frames.
@@ -462,6 +484,7 @@ def process_stacktraces(data, make_processors=None, set_raw_stacktrace=True):
                 changed = True
 
     finally:
+        safe_execute(processing_task.write_frame_cache, _with_transaction=False)
         for processor in processors:
             processor.close()
         processing_task.close()
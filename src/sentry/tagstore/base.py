@@ -78,6 +78,7 @@ class TagStorage(Service):
         'create_group_tag_value',
         'get_or_create_group_tag_value',
         'create_event_tags',
+        'create_event_tags_bulk',
 
         'delete_tag_key',
         'delete_all_group_tag_keys',
@@ -207,6 +208,17 @@ class TagStorage(Service):
         """
         raise NotImplementedError
 
+    def create_event_tags_bulk(self, events):
+        """
+        Creates the tags of many events, ``events`` is a list of dictionaries
+        with the arguments of ``create_event_tags``.
+
+        >>> create_event_tags_bulk([{'project_id': 1, 'group_id': 2, 'environment_id': 3,
+        >>>                          'event_id': 4, 'tags': [('foo', 'bar')]}])
+        """
+        for event in events:
+            self.create_event_tags(**event)
+
     @raises([TagKeyNotFound])
     def get_tag_key(self, project_id, environment_id, key, status=TagKeyStatus.VISIBLE):
         """
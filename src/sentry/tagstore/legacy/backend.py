@@ -26,7 +26,7 @@ from sentry.utils import db
 
 from . import models
 from sentry.tagstore.types import TagKey, TagValue, GroupTagKey, GroupTagValue
-from sentry.tasks.post_process import index_event_tags
+from sentry.tasks.post_process import queue_index_event_tags
 
 
 transformers = {
@@ -281,6 +281,40 @@ class LegacyTagStorage(TagStorage):
         except IntegrityError:
             pass
 
+    def create_event_tags_bulk(self, events):
+        # Keys and values are shared by most events of a project, resolve
+        # each of them once for the whole batch.
+        tagkeys = {}
+        tagvalues = {}
+        rows = []
+        for event in events:
+            project_id = event['project_id']
+            date_added = event.get('date_added') or timezone.now()
+            for key, value in event['tags']:
+                if (project_id, key) not in tagkeys:
+                    tagkeys[(project_id, key)] = self.get_or_create_tag_key(
+                        project_id, event['environment_id'], key)[0]
+                if (project_id, key, value) not in tagvalues:
+                    tagvalues[(project_id, key, value)] = self.get_or_create_tag_value(
+                        project_id, event['environment_id'], key, value)[0]
+                rows.append(models.EventTag(
+                    project_id=project_id,
+                    group_id=event['group_id'],
+                    event_id=event['event_id'],
+                    key_id=tagkeys[(project_id, key)].id,
+                    value_id=tagvalues[(project_id, key, value)].id,
+                    date_added=date_added,
+                ))
+
+        try:
+            with transaction.atomic():
+                models.EventTag.objects.bulk_create(rows)
+        except IntegrityError:
+            # One of the events was already indexed, insert them one at a
+            # time so the others are still stored.
+            for event in events:
+                self.create_event_tags(**event)
+
     def get_tag_key(self, project_id, environment_id, key, status=TagKeyStatus.VISIBLE):
         from sentry.tagstore.exceptions import TagKeyNotFound
 
@@ -720,7 +754,7 @@ class LegacyTagStorage(TagStorage):
 
     def delay_index_event_tags(self, organization_id, project_id, group_id,
                                environment_id, event_id, tags, date_added):
-        index_event_tags.delay(
+        queue_index_event_tags(
             organization_id=organization_id,
             project_id=project_id,
             group_id=group_id,
@@ -27,7 +27,7 @@ from sentry.utils import db
 
 from . import models
 from sentry.tagstore.types import TagKey, TagValue, GroupTagKey, GroupTagValue
-from sentry.tasks.post_process import index_event_tags
+from sentry.tasks.post_process import queue_index_event_tags
 
 
 logger = logging.getLogger('sentry.tagstore.v2')
@@ -421,6 +421,57 @@ class V2TagStorage(TagStorage):
                 exc_info=True
             )
 
+    def create_event_tags_bulk(self, events):
+        # Resolve the keys of every (project, environment) and the values of
+        # every project with one bulk lookup each instead of one per event.
+        keys_by_env = defaultdict(set)
+        for event in events:
+            assert event['environment_id'] is not None
+            keys_by_env[(event['project_id'], event['environment_id'])].update(
+                k for k, _ in event['tags'])
+
+        tagkeys = {}
+        for (project_id, environment_id), keys in six.iteritems(keys_by_env):
+            for key, tagkey in six.iteritems(self.get_or_create_tag_keys_bulk(
+                    project_id, environment_id, list(keys))):
+                tagkeys[(project_id, environment_id, key)] = tagkey
+
+        values_by_project = defaultdict(set)
+        for event in events:
+            values_by_project[event['project_id']].update(
+                (tagkeys[(event['project_id'], event['environment_id'], k)], v)
+                for k, v in event['tags']
+            )
+
+        tagvalues = {}
+        for project_id, tags in six.iteritems(values_by_project):
+            for (tagkey, value), tagvalue in six.iteritems(
+                    self.get_or_create_tag_values_bulk(project_id, list(tags))):
+                tagvalues[(tagkey.id, value)] = tagvalue
+
+        rows = []
+        for event in events:
+            date_added = event.get('date_added') or timezone.now()
+            for key, value in event['tags']:
+                tagkey = tagkeys[(event['project_id'], event['environment_id'], key)]
+                rows.append(models.EventTag(
+                    project_id=event['project_id'],
+                    group_id=event['group_id'],
+                    event_id=event['event_id'],
+                    key_id=tagkey.id,
+                    value_id=tagvalues[(tagkey.id, value)].id,
+                    date_added=date_added,
+                ))
+
+        try:
+            with transaction.atomic():
+                models.EventTag.objects.bulk_create(rows)
+        except IntegrityError:
+            # One of the events was already indexed, insert them one at a
+            # time so the others are still stored.
+            for event in events:
+                self.create_event_tags(**event)
+
     def get_tag_key(self, project_id, environment_id, key, status=TagKeyStatus.VISIBLE):
         from sentry.tagstore.exceptions import TagKeyNotFound
 
@@ -1066,7 +1117,7 @@ class V2TagStorage(TagStorage):
 
     def delay_index_event_tags(self, organization_id, project_id, group_id,
                                environment_id, event_id, tags, date_added):
-        index_event_tags.delay(
+        queue_index_event_tags(
             organization_id=organization_id,
             project_id=project_id,
             group_id=group_id,
@@ -118,15 +118,16 @@ class TagValue(Model):
         # In best case, this is all done in 1 cache get.
         # If we miss cache hit here, we have to fall back to old behavior.
         key_to_model = {tag: None for tag in tags}
-        tags_by_key_id = {tag[0].id: tag for tag in tags}
         remaining_keys = set(tags)
 
         # First attempt to hit from cache, which in theory is the hot case
         cache_key_to_key = {cls.get_cache_key(project_id, tk.id, v): (tk, v) for tk, v in tags}
         cache_key_to_models = cache.get_many(cache_key_to_key.keys())
-        for model in cache_key_to_models.values():
-            key_to_model[tags_by_key_id[model._key_id]] = model
-            remaining_keys.remove(tags_by_key_id[model._key_id])
+        for cache_key, model in cache_key_to_models.items():
+            # a key can appear with several values, so map hits by cache key
+            tag = cache_key_to_key[cache_key]
+            key_to_model[tag] = model
+            remaining_keys.discard(tag)
 
         if not remaining_keys:
             # 100% cache hit on all items, good work team
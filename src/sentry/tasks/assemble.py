@@ -77,13 +77,22 @@ def assemble_file(project, name, checksum, chunks, file_type):
 
     # Load all FileBlobs from db since we can be sure here we already own all
     # chunks need to build the file
-    file_blobs = FileBlob.objects.filter(
+    file_blobs = list(FileBlob.objects.filter(
         checksum__in=chunks
-    ).values_list('id', 'checksum', 'size')
+    ).values_list('id', 'checksum', 'size'))
+
+    # Sanity check.  In case not all blobs exist at this point we have a
+    # race condition.
+    blob_ids = {x[1]: x[0] for x in file_blobs}
+    if set(blob_ids) != set(chunks):
+        set_assemble_status(project, checksum, ChunkFileState.ERROR,
+                            detail='Not all chunks available for assembling')
+        return
 
     # Reject all files that exceed the maximum allowed size for this
     # organization. This value cannot be
-    file_size = sum(x[2] for x in file_blobs)
+    blob_sizes = {x[1]: x[2] for x in file_blobs}
+    file_size = sum(blob_sizes[chunk] for chunk in chunks)
     if file_size > get_max_file_size(project.organization):
         set_assemble_status(project, checksum, ChunkFileState.ERROR,
                             detail='File exceeds maximum size')
@@ -93,16 +102,7 @@ def assemble_file(project, name, checksum, chunks, file_type):
     # we received them from the request.
     # Otherwise it could happen that we assemble the file in the wrong order
     # and get an garbage file.
-    file_blob_ids = [x[0] for x in sorted(
-        file_blobs, key=lambda blob: chunks.index(blob[1])
-    )]
-
-    # Sanity check.  In case not all blobs exist at this point we have a
-    # race condition.
-    if set(x[1] for x in file_blobs) != set(chunks):
-        set_assemble_status(project, checksum, ChunkFileState.ERROR,
-                            detail='Not all chunks available for assembling')
-        return
+    file_blob_ids = [blob_ids[chunk] for chunk in chunks]
 
     file = File.objects.create(
         name=name,
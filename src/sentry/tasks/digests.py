@@ -3,10 +3,14 @@ from __future__ import absolute_import
 import logging
 import time
 
+from collections import defaultdict
+
+from sentry import options
 from sentry.digests import get_option_key
 from sentry.digests.backends.base import InvalidState
 from sentry.digests.notifications import (
     build_digest,
+    fetch_states,
     split_key,
 )
 from sentry.models import (
@@ -14,7 +18,7 @@ from sentry.models import (
     ProjectOption,
 )
 from sentry.tasks.base import instrumented_task
-from sentry.utils import snuba
+from sentry.utils import metrics, snuba
 
 logger = logging.getLogger(__name__)
 
@@ -36,8 +40,25 @@ def schedule_digests():
     timeout = 300
     digests.maintenance(deadline - timeout)
 
+    batch_size = options.get('digests.delivery-batch-size')
+    batch = []
+    count = 0
     for entry in digests.schedule(deadline):
-        deliver_digest.delay(entry.key, entry.timestamp)
+        count += 1
+        # how long the timeline has been waiting to be scheduled
+        metrics.timing('digests.schedule.lag', deadline - entry.timestamp)
+        if not batch_size:
+            deliver_digest.delay(entry.key, entry.timestamp)
+            continue
+        batch.append((entry.key, entry.timestamp))
+        if len(batch) >= batch_size:
+            deliver_digests.delay(batch)
+            batch = []
+
+    if batch:
+        deliver_digests.delay(batch)
+
+    metrics.timing('digests.schedule.count', count)
 
 
 @instrumented_task(name='sentry.tasks.digests.deliver_digest', queue='digests.delivery')
@@ -65,3 +86,62 @@ def deliver_digest(key, schedule_timestamp=None):
 
         if digest:
             plugin.notify_digest(project, digest)
+
+
+@instrumented_task(name='sentry.tasks.digests.deliver_digests', queue='digests.delivery')
+def deliver_digests(entries):
+    """
+    Delivers the digests of several timelines at once, see the
+    ``digests.delivery-batch-size`` option.
+    """
+    from sentry import digests
+
+    timelines = {}
+    minimum_delays = {}
+    for key, schedule_timestamp in entries:
+        try:
+            plugin, project = split_key(key)
+        except Project.DoesNotExist as error:
+            logger.info('Cannot deliver digest %r due to error: %s', key, error)
+            digests.delete(key)
+            continue
+
+        timelines[key] = (plugin, project)
+        minimum_delays[key] = ProjectOption.objects.get_value(
+            project, get_option_key(plugin.get_conf_key(), 'minimum_delay')
+        )
+
+    results = []
+    with snuba.options_override({'consistent': True}):
+        with digests.digest_batch(list(timelines), minimum_delay=minimum_delays) as batch:
+            # The timelines of one project share the state lookups.
+            keys_by_project = defaultdict(list)
+            for key, records in batch.items():
+                if records:
+                    keys_by_project[timelines[key][1]].append(key)
+
+            for project, keys in keys_by_project.items():
+                try:
+                    states = fetch_states(project, [batch[key] for key in keys])
+                except Exception:
+                    logger.exception('Failed to fetch digest state for %r', project)
+                    for key in keys:
+                        del batch[key]
+                    continue
+
+                for key, state in zip(keys, states):
+                    try:
+                        digest = build_digest(project, batch[key], state=state)
+                    except Exception:
+                        # Keep the records so that the timeline is retried.
+                        logger.exception('Failed to build digest %r', key)
+                        del batch[key]
+                        continue
+                    if digest:
+                        results.append((timelines[key], digest))
+
+        for (plugin, project), digest in results:
+            try:
+                plugin.notify_digest(project, digest)
+            except Exception:
+                logger.exception('Failed to deliver digest for %r', project)
@@ -22,13 +22,16 @@ from sentry.plugins import plugins
 from sentry.signals import event_processed
 from sentry.tasks.sentry_apps import process_resource_change_bound
 from sentry.tasks.base import instrumented_task
-from sentry.utils import metrics
-from sentry.utils.redis import redis_clusters
+from sentry.utils import json, metrics
+from sentry.utils.dates import to_datetime, to_timestamp
+from sentry.utils.redis import clusters, redis_clusters
 from sentry.utils.safe import safe_execute
 from sentry.utils.sdk import configure_scope
 
 logger = logging.getLogger('sentry')
 
+INDEX_EVENT_TAGS_QUEUE_KEY = 'tagstore:index-event-tags'
+
 
 def _get_service_hooks(project_id):
     from sentry.models import ServiceHook
@@ -261,3 +264,97 @@ def index_event_tags(organization_id, project_id, event_id, tags,
         tags=tags,
         **create_event_tags_kwargs
     )
+
+
+def _get_index_event_tags_queue():
+    config = settings.SENTRY_TAGSTORE_INDEX_BATCH
+    return clusters.get(config['cluster']).get_local_client_for_key(
+        INDEX_EVENT_TAGS_QUEUE_KEY)
+
+
+def queue_index_event_tags(date_added=None, **kwargs):
+    """
+    Schedules indexing the tags of an event. With batching enabled (see
+    ``SENTRY_TAGSTORE_INDEX_BATCH``) the event is added to a queue that is
+    drained by ``index_event_tags_batch`` once the batch is full or its
+    delay passed, otherwise it gets its own ``index_event_tags`` task.
+    """
+    config = settings.SENTRY_TAGSTORE_INDEX_BATCH
+    if not config['size']:
+        index_event_tags.delay(date_added=date_added, **kwargs)
+        return
+
+    if date_added is not None:
+        kwargs['date_added'] = to_timestamp(date_added)
+
+    length = _get_index_event_tags_queue().rpush(
+        INDEX_EVENT_TAGS_QUEUE_KEY, json.dumps(kwargs))
+    if length % config['size'] == 0:
+        index_event_tags_batch.delay()
+    elif length == 1:
+        index_event_tags_batch.apply_async(countdown=config['delay'])
+
+
+@instrumented_task(
+    name='sentry.tasks.index_event_tags_batch',
+    queue='events.index_event_tags',
+)
+def index_event_tags_batch(**kwargs):
+    config = settings.SENTRY_TAGSTORE_INDEX_BATCH
+    size = config['size'] or 1
+    client = _get_index_event_tags_queue()
+
+    with client.pipeline() as pipe:
+        pipe.lrange(INDEX_EVENT_TAGS_QUEUE_KEY, 0, size - 1)
+        pipe.ltrim(INDEX_EVENT_TAGS_QUEUE_KEY, size, -1)
+        pipe.llen(INDEX_EVENT_TAGS_QUEUE_KEY)
+        payloads, _, remaining = pipe.execute()
+
+    try:
+        if payloads:
+            _index_event_tags_payloads(payloads)
+    finally:
+        # Events queued while this batch was processed do not schedule a
+        # task of their own unless they fill a batch.
+        if remaining >= size:
+            index_event_tags_batch.delay()
+        elif remaining:
+            index_event_tags_batch.apply_async(countdown=config['delay'])
+
+
+def _index_event_tags_payloads(payloads):
+    from sentry import tagstore
+
+    events = []
+    for payload in payloads:
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            metrics.incr('tagstore.index_event_tags_batch.dropped')
+            logger.exception('tagstore.index_event_tags_batch.invalid-payload')
+            continue
+        event.pop('organization_id', None)
+        if event.get('date_added') is not None:
+            event['date_added'] = to_datetime(event['date_added'])
+        events.append(event)
+
+    metrics.timing('tagstore.index_event_tags_batch.size', len(events))
+    try:
+        tagstore.create_event_tags_bulk(events)
+    except Exception:
+        # Index the events one by one so that a single bad event does not
+        # hold back the rest of the batch. Events that fail on their own are
+        # logged and dropped.
+        logger.exception('tagstore.index_event_tags_batch.error')
+        for event in events:
+            try:
+                tagstore.create_event_tags(**event)
+            except Exception:
+                metrics.incr('tagstore.index_event_tags_batch.dropped')
+                logger.exception(
+                    'tagstore.index_event_tags_batch.dropped',
+                    extra={
+                        'project_id': event.get('project_id'),
+                        'event_id': event.get('event_id'),
+                    }
+                )
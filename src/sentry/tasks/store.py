@@ -436,16 +436,7 @@ def save_attachment(event, attachment):
     )
 
 
-def _do_save_event(cache_key=None, data=None, start_time=None, event_id=None,
-                   project_id=None, **kwargs):
-    """
-    Saves an event to the database.
-    """
-    from sentry.event_manager import HashDiscarded, EventManager
-    from sentry import quotas
-    from sentry.models import ProjectKey
-    from sentry.utils.outcomes import Outcome, track_outcome
-
+def _prepare_save_event(cache_key, data, event_id, project_id):
     if cache_key and data is None:
         data = default_cache.get(cache_key)
 
@@ -463,7 +454,6 @@ def _do_save_event(cache_key=None, data=None, start_time=None, event_id=None,
     key_id = None if data is None else data.get('key_id')
     if key_id is not None:
         key_id = int(key_id)
-    timestamp = to_datetime(start_time) if start_time is not None else None
 
     delete_raw_event(project_id, event_id, allow_hint_clear=True)
 
@@ -484,6 +474,89 @@ def _do_save_event(cache_key=None, data=None, start_time=None, event_id=None,
                 'reason': 'cache',
                 'stage': 'post'},
             skip_internal=False)
+
+    return data, event_id, project_id, key_id
+
+
+def _handle_saved_event(event, cache_key, key_id, start_time, event_id):
+    from sentry.utils.outcomes import Outcome, track_outcome
+
+    timestamp = to_datetime(start_time) if start_time is not None else None
+
+    # Always load attachments from the cache so we can later prune them.
+    # Only save them if the event-attachments feature is active, though.
+    if features.has('organizations:event-attachments', event.project.organization, actor=None):
+        attachments = attachment_cache.get(cache_key) or []
+        for attachment in attachments:
+            save_attachment(event, attachment)
+
+    # This is where we can finally say that we have accepted the event.
+    track_outcome(
+        event.project.organization_id,
+        event.project.id,
+        key_id,
+        Outcome.ACCEPTED,
+        None,
+        timestamp,
+        event_id
+    )
+
+
+def _handle_discarded_event(project_id, key_id, start_time, event_id):
+    from sentry import quotas
+    from sentry.models import ProjectKey
+    from sentry.utils.outcomes import Outcome, track_outcome
+
+    timestamp = to_datetime(start_time) if start_time is not None else None
+
+    project = Project.objects.get_from_cache(id=project_id)
+    reason = FilterStatKeys.DISCARDED_HASH
+    project_key = None
+    try:
+        if key_id is not None:
+            project_key = ProjectKey.objects.get_from_cache(id=key_id)
+    except ProjectKey.DoesNotExist:
+        pass
+
+    quotas.refund(project, key=project_key, timestamp=start_time)
+    track_outcome(
+        project.organization_id,
+        project_id,
+        key_id,
+        Outcome.FILTERED,
+        reason,
+        timestamp,
+        event_id
+    )
+
+
+def _cleanup_save_event(event, cache_key, data, start_time):
+    if cache_key:
+        default_cache.delete(cache_key)
+
+        # For the unlikely case that we did not manage to persist the
+        # event we also delete the key always.
+        if event is None or \
+           features.has('organizations:event-attachments', event.project.organization, actor=None):
+            attachment_cache.delete(cache_key)
+
+    if start_time:
+        metrics.timing(
+            'events.time-to-process',
+            time() - start_time,
+            instance=data['platform'])
+
+
+def _do_save_event(cache_key=None, data=None, start_time=None, event_id=None,
+                   project_id=None, **kwargs):
+    """
+    Saves an event to the database.
+    """
+    from sentry.event_manager import HashDiscarded, EventManager
+
+    data, event_id, project_id, key_id = _prepare_save_event(
+        cache_key, data, event_id, project_id)
+    if not data:
         return
 
     with configure_scope() as scope:
@@ -493,61 +566,56 @@ def _do_save_event(cache_key=None, data=None, start_time=None, event_id=None,
     try:
         manager = EventManager(data)
         event = manager.save(project_id, assume_normalized=True)
+        _handle_saved_event(event, cache_key, key_id, start_time, event_id)
+    except HashDiscarded:
+        _handle_discarded_event(project_id, key_id, start_time, event_id)
+    finally:
+        _cleanup_save_event(event, cache_key, data, start_time)
 
-        # Always load attachments from the cache so we can later prune them.
-        # Only save them if the event-attachments feature is active, though.
-        if features.has('organizations:event-attachments', event.project.organization, actor=None):
-            attachments = attachment_cache.get(cache_key) or []
-            for attachment in attachments:
-                save_attachment(event, attachment)
-
-        # This is where we can finally say that we have accepted the event.
-        track_outcome(
-            event.project.organization_id,
-            event.project.id,
-            key_id,
-            Outcome.ACCEPTED,
-            None,
-            timestamp,
-            event_id
-        )
 
-    except HashDiscarded:
-        project = Project.objects.get_from_cache(id=project_id)
-        reason = FilterStatKeys.DISCARDED_HASH
-        project_key = None
-        try:
-            if key_id is not None:
-                project_key = ProjectKey.objects.get_from_cache(id=key_id)
-        except ProjectKey.DoesNotExist:
-            pass
-
-        quotas.refund(project, key=project_key, timestamp=start_time)
-        track_outcome(
-            project.organization_id,
+def _do_save_events(project_id, payloads):
+    """
+    Saves several events of the same project to the database at once.
+
+    Every payload is a dictionary with the ``cache_key``, ``data``,
+    ``start_time`` and ``event_id`` arguments of ``save_event``.
+    """
+    from sentry.event_manager import HashDiscarded, EventManager, save_many
+
+    jobs = []
+    for payload in payloads:
+        cache_key = payload.get('cache_key')
+        start_time = payload.get('start_time')
+        data, event_id, _, key_id = _prepare_save_event(
+            cache_key, payload.get('data'), payload.get('event_id'), project_id)
+        if data:
+            jobs.append((cache_key, data, start_time, event_id, key_id))
+
+    if not jobs:
+        return
+
+    with configure_scope() as scope:
+        scope.set_tag("project", project_id)
+
+    metrics.timing('events.save_batch.size', len(jobs))
+
+    events = [None] * len(jobs)
+    try:
+        results = save_many(
             project_id,
-            key_id,
-            Outcome.FILTERED,
-            reason,
-            timestamp,
-            event_id
+            [EventManager(job[1]) for job in jobs],
+            assume_normalized=True,
         )
-
+        for index, result in enumerate(results):
+            cache_key, data, start_time, event_id, key_id = jobs[index]
+            if isinstance(result, HashDiscarded):
+                _handle_discarded_event(project_id, key_id, start_time, event_id)
+            else:
+                events[index] = result
+                _handle_saved_event(result, cache_key, key_id, start_time, event_id)
     finally:
-        if cache_key:
-            default_cache.delete(cache_key)
-
-            # For the unlikely case that we did not manage to persist the
-            # event we also delete the key always.
-            if event is None or \
-               features.has('organizations:event-attachments', event.project.organization, actor=None):
-                attachment_cache.delete(cache_key)
-
-        if start_time:
-            metrics.timing(
-                'events.time-to-process',
-                time() - start_time,
-                instance=data['platform'])
+        for (cache_key, data, start_time, _, _), event in zip(jobs, events):
+            _cleanup_save_event(event, cache_key, data, start_time)
 
 
 @instrumented_task(name='sentry.tasks.store.save_event', queue='events.save_event')
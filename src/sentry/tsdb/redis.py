@@ -7,13 +7,17 @@ sentry.tsdb.redis
 """
 from __future__ import absolute_import
 
+import atexit
 import itertools
 import logging
 import operator
+import os
 import random
+import threading
+import time
 import uuid
 from binascii import crc32
-from collections import defaultdict, namedtuple
+from collections import OrderedDict, defaultdict, namedtuple
 from hashlib import md5
 
 import six
@@ -22,6 +26,8 @@ from pkg_resources import resource_string
 from redis.client import Script
 
 from sentry.tsdb.base import BaseTSDB
+from sentry.utils import metrics
+from sentry.utils.datastructures import LRUCache
 from sentry.utils.dates import to_datetime, to_timestamp
 from sentry.utils.redis import check_cluster_versions, get_cluster_from_options
 from sentry.utils.versioning import Version
@@ -111,6 +117,21 @@ class RedisTSDB(BaseTSDB):
     degrade for less frequently observed items, but remains accurate for more
     frequently observed items.
 
+    Counter increments are written as a plan with one entry per hash: the
+    increments for the same field are added up and the expiry of every hash
+    is set once. Two options reduce the number of commands further:
+
+        * ``expiry_cache_size``: remember up to this many hashes whose expiry
+          was set by this process and skip setting it again. The expiry of a
+          bucket never changes, but a hash that is emptied by ``delete`` in
+          another process and incremented again by this one is left without
+          an expiry, so this is disabled by default.
+        * ``incr_buffer_window``: add up increments in this process for this
+          many seconds before writing them. A background thread writes them
+          once the window has passed, even if no further increments come in.
+          Counts become visible with that delay and buffered counts are lost
+          if the process is killed, so this is disabled by default.
+
     Frequency tables are especially useful when paired with a (non-distinct)
     counter of the total number of observations so that scores of items of the
     frequency table can be displayed as percentages of the whole data set.
@@ -124,6 +145,15 @@ class RedisTSDB(BaseTSDB):
         self.prefix = prefix
         self.vnodes = vnodes
         self.enable_frequency_sketches = options.pop('enable_frequency_sketches', False)
+        expiry_cache_size = options.pop('expiry_cache_size', 0)
+        self.expiry_cache = LRUCache(expiry_cache_size) if expiry_cache_size else None
+        self.incr_buffer_window = options.pop('incr_buffer_window', 0)
+        self.incr_buffer = {}
+        self.incr_buffer_lock = threading.Lock()
+        self.incr_buffer_first_added = None
+        self.incr_flusher_pid = None
+        if self.incr_buffer_window:
+            atexit.register(self.flush_incr_buffer)
         super(RedisTSDB, self).__init__(**options)
 
     def validate(self):
@@ -226,21 +256,129 @@ class RedisTSDB(BaseTSDB):
 
         for (cluster, durable), environment_ids in self.get_cluster_groups(
                 set([None, environment_id])):
-            manager = cluster.map()
-            if not durable:
-                manager = SuppressionWrapper(manager)
+            plan = self.make_incr_plan(items, timestamp, count, environment_ids)
+            # the number of increments written without a plan
+            increments = len(self.rollups) * len(items) * len(environment_ids)
 
-            with manager as client:
-                for rollup, max_values in six.iteritems(self.rollups):
-                    for model, key in items:
-                        for environment_id in environment_ids:
-                            hash_key, hash_field = self.make_counter_key(
-                                model, rollup, timestamp, key, environment_id)
-                            client.hincrby(hash_key, hash_field, count)
-                            client.expireat(
-                                hash_key,
-                                self.calculate_expiry(rollup, max_values, timestamp),
-                            )
+            if self.incr_buffer_window:
+                self.buffer_incr_plan(cluster, durable, plan, increments)
+            else:
+                self.execute_incr_plan(cluster, durable, plan, increments)
+
+        if self.incr_buffer_window:
+            self.start_incr_flusher()
+            if self.is_incr_buffer_due():
+                self.flush_incr_buffer()
+
+    def make_incr_plan(self, items, timestamp, count, environment_ids):
+        """
+        Returns an ordered mapping of hash keys to their expiry and the
+        increments of their fields.
+        """
+        plan = OrderedDict()
+        for rollup, max_values in six.iteritems(self.rollups):
+            expiry = self.calculate_expiry(rollup, max_values, timestamp)
+            for model, key in items:
+                for environment_id in environment_ids:
+                    hash_key, hash_field = self.make_counter_key(
+                        model, rollup, timestamp, key, environment_id)
+                    try:
+                        fields = plan[hash_key][1]
+                    except KeyError:
+                        fields = OrderedDict()
+                        plan[hash_key] = (expiry, fields)
+                    fields[hash_field] = fields.get(hash_field, 0) + count
+        return plan
+
+    def execute_incr_plan(self, cluster, durable, plan, increments):
+        """
+        Writes ``plan``, which replaces ``increments`` separate increments.
+        """
+        expiry_cache = self.expiry_cache
+        commands = 0
+
+        manager = cluster.map()
+        if not durable:
+            manager = SuppressionWrapper(manager)
+
+        with manager as client:
+            for hash_key, (expiry, fields) in six.iteritems(plan):
+                for hash_field, amount in six.iteritems(fields):
+                    client.hincrby(hash_key, hash_field, amount)
+                    commands += 1
+                if expiry_cache is not None and expiry_cache.get(hash_key) == expiry:
+                    continue
+                promise = client.expireat(hash_key, expiry)
+                commands += 1
+                if expiry_cache is not None:
+                    # Only remember the expiry once Redis confirmed it.
+                    promise.done(
+                        on_success=lambda _, hash_key=hash_key, expiry=expiry:
+                            expiry_cache.set(hash_key, expiry),
+                    )
+
+        # Without a plan every increment is sent with its own expiry.
+        metrics.incr('tsdb.incr.commands_saved', amount=increments * 2 - commands)
+
+    def buffer_incr_plan(self, cluster, durable, plan, increments):
+        with self.incr_buffer_lock:
+            if self.incr_buffer_first_added is None:
+                self.incr_buffer_first_added = time.time()
+            buffered, buffered_increments = self.incr_buffer.get(
+                (cluster, durable), (OrderedDict(), 0))
+            self.incr_buffer[(cluster, durable)] = (buffered, buffered_increments + increments)
+            for hash_key, (expiry, fields) in six.iteritems(plan):
+                try:
+                    buffered_fields = buffered[hash_key][1]
+                except KeyError:
+                    buffered[hash_key] = (expiry, fields)
+                    continue
+                for hash_field, amount in six.iteritems(fields):
+                    buffered_fields[hash_field] = buffered_fields.get(hash_field, 0) + amount
+
+    def is_incr_buffer_due(self):
+        first_added = self.incr_buffer_first_added
+        return first_added is not None and \
+            time.time() - first_added >= self.incr_buffer_window
+
+    def flush_incr_buffer(self):
+        """
+        Writes the increments buffered by ``incr_buffer_window``.
+        """
+        with self.incr_buffer_lock:
+            buffer, self.incr_buffer = self.incr_buffer, {}
+            self.incr_buffer_first_added = None
+
+        for (cluster, durable), (plan, increments) in six.iteritems(buffer):
+            self.execute_incr_plan(cluster, durable, plan, increments)
+
+    def start_incr_flusher(self):
+        """
+        Makes sure a background thread flushes buffered increments once the
+        window has passed, even when no further increments come in. This is
+        checked on every write as the thread does not survive a fork.
+        """
+        pid = os.getpid()
+        if self.incr_flusher_pid == pid:
+            return
+
+        with self.incr_buffer_lock:
+            if self.incr_flusher_pid == pid:
+                return
+            self.incr_flusher_pid = pid
+
+        def run():
+            while True:
+                time.sleep(self.incr_buffer_window / 2.0)
+                if self.is_incr_buffer_due():
+                    try:
+                        self.flush_incr_buffer()
+                    except Exception:
+                        logger.exception('tsdb.incr.flush-failed')
+
+        thread = threading.Thread(target=run, name='sentry.tsdb.redis.incr-flusher')
+        thread.daemon = True
+        thread.start()
 
     def get_range(self, model, keys, start, end, rollup=None, environment_ids=None):
         """
@@ -260,25 +398,52 @@ class RedisTSDB(BaseTSDB):
 
         rollup, series = self.get_optimal_rollup_series(start, end, rollup)
         series = map(to_datetime, series)
+        epochs = [to_timestamp(timestamp) for timestamp in series]
+
+        values = self.get_counter_values(model, keys, series, rollup, environment_id)
+        return {key: list(zip(epochs, counts)) for key, counts in six.iteritems(values)}
+
+    def get_sums(self, model, keys, start, end, rollup=None, environment_id=None):
+        self.validate_arguments([model], [environment_id])
+
+        rollup, series = self.get_optimal_rollup_series(start, end, rollup)
+        series = map(to_datetime, series)
+
+        values = self.get_counter_values(model, keys, series, rollup, environment_id)
+        return {key: sum(counts) for key, counts in six.iteritems(values)}
+
+    def get_counter_values(self, model, keys, series, rollup, environment_id):
+        """
+        Returns a mapping of each key to the list of its counts, in the order
+        of ``series``.
+
+        The fields are grouped by their hash key, so every hash that is part
+        of the range is read with a single ``HMGET`` rather than one ``HGET``
+        per key and timestamp.
+        """
+        keys = list(keys)
+        values = {key: [0] * len(series) for key in keys}
+
+        # hash key -> [(hash field, key, index into series)]
+        fields_by_hash = defaultdict(list)
+        for key in keys:
+            for idx, timestamp in enumerate(series):
+                hash_key, hash_field = self.make_counter_key(
+                    model, rollup, timestamp, key, environment_id)
+                fields_by_hash[hash_key].append((hash_field, key, idx))
 
-        results = []
         cluster, _ = self.get_cluster(environment_id)
         with cluster.map() as client:
-            for key in keys:
-                for timestamp in series:
-                    hash_key, hash_field = self.make_counter_key(
-                        model, rollup, timestamp, key, environment_id)
-                    results.append(
-                        (to_timestamp(timestamp), key, client.hget(
-                            hash_key, hash_field)))
-
-        results_by_key = defaultdict(dict)
-        for epoch, key, count in results:
-            results_by_key[key][epoch] = int(count.value or 0)
+            responses = [
+                (hash_fields, client.hmget(hkey, [f for f, _key, _idx in hash_fields]))
+                for hkey, hash_fields in six.iteritems(fields_by_hash)
+            ]
 
-        for key, points in six.iteritems(results_by_key):
-            results_by_key[key] = sorted(points.items())
-        return dict(results_by_key)
+        for fields, response in responses:
+            for (_, key, idx), count in zip(fields, response.value):
+                if count is not None:
+                    values[key][idx] = int(count)
+        return values
 
     def merge(self, model, destination, sources, timestamp=None, environment_ids=None):
         environment_ids = (
@@ -372,6 +537,8 @@ class RedisTSDB(BaseTSDB):
                                         hash_key,
                                         hash_field,
                                     )
+                                    if self.expiry_cache is not None:
+                                        self.expiry_cache.delete(hash_key)
 
     def record(self, model, key, values, timestamp=None, environment_id=None):
         self.validate_arguments([model], [environment_id])
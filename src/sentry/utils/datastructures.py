@@ -1,6 +1,9 @@
 from __future__ import absolute_import
 
-from collections import Hashable, MutableMapping
+import time
+
+from collections import Hashable, MutableMapping, OrderedDict
+from threading import Lock
 
 __unset__ = object()
 
@@ -61,3 +64,70 @@ class BidirectionalMapping(MutableMapping):
 
     def inverse(self):
         return self.__inverse.copy()
+
+
+class LRUCache(object):
+    """\
+    A thread safe, size bounded least recently used cache.
+
+    Every entry has a size (``1`` unless given) and the least recently used
+    entries are evicted until the total size fits into ``max_size``. Entries
+    older than ``ttl`` seconds are treated as missing. ``hits`` and
+    ``misses`` count the results of ``get``.
+    """
+
+    def __init__(self, max_size, ttl=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.__data = OrderedDict()
+        self.__lock = Lock()
+
+    def __len__(self):
+        return len(self.__data)
+
+    def __contains__(self, key):
+        return self.get(key, __unset__) is not __unset__
+
+    def get(self, key, default=None):
+        with self.__lock:
+            try:
+                value, size, expires = self.__data.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            if expires is not None and expires <= time.time():
+                self.size -= size
+                self.misses += 1
+                return default
+            self.__data[key] = (value, size, expires)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, size=1):
+        if size > self.max_size:
+            self.delete(key)
+            return
+        expires = time.time() + self.ttl if self.ttl is not None else None
+        with self.__lock:
+            previous = self.__data.pop(key, None)
+            if previous is not None:
+                self.size -= previous[1]
+            self.__data[key] = (value, size, expires)
+            self.size += size
+            while self.size > self.max_size:
+                _, (_, evicted_size, _) = self.__data.popitem(last=False)
+                self.size -= evicted_size
+
+    def delete(self, key):
+        with self.__lock:
+            previous = self.__data.pop(key, None)
+            if previous is not None:
+                self.size -= previous[1]
+
+    def clear(self):
+        with self.__lock:
+            self.__data.clear()
+            self.size = 0
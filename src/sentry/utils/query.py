@@ -306,8 +306,13 @@ def bulk_delete_objects(model, limit=10000, transaction_id=None,
             params.append(value)
 
     for column, value in filters.items():
-        query.append('%s = %%s' % (quote_name(column), ))
-        params.append(value)
+        # ``column__in`` matches any of the given values
+        if column.endswith('__in'):
+            query.append('%s = any(%%s)' % (quote_name(column[:-len('__in')]), ))
+            params.append(list(value))
+        else:
+            query.append('%s = %%s' % (quote_name(column), ))
+            params.append(value)
 
     if db.is_postgres():
         query = """
@@ -2,7 +2,9 @@
 
 from __future__ import absolute_import
 
-from sentry.api.serializers import serialize, Serializer
+from mock import call, patch
+
+from sentry.api.serializers import AttrLoader, serialize, Serializer
 from sentry.testutils import TestCase
 
 
@@ -57,3 +59,24 @@ class BaseSerializerTest(TestCase):
         user = self.create_user()
         result = serialize(foo, user, VariadicSerializer(), kw='keyword')
         assert result['kw'] == 'keyword'
+
+    @patch('sentry.api.serializers.base.metrics')
+    def test_attr_loader(self, metrics):
+        loader = AttrLoader('test.get_attrs')
+
+        @loader.register('double')
+        def load_double(serializer, item_list, user):
+            return {i: i * 2 for i in item_list}
+
+        @loader.register('quadruple', requires=('double', ))
+        def load_quadruple(serializer, item_list, user, double):
+            return {i: double[i] * 2 for i in item_list}
+
+        assert loader.load(None, [1, 2], None) == {
+            'double': {1: 2, 2: 4},
+            'quadruple': {1: 4, 2: 8},
+        }
+        assert metrics.timer.call_args_list == [
+            call('test.get_attrs', tags={'attr': 'double'}),
+            call('test.get_attrs', tags={'attr': 'quadruple'}),
+        ]
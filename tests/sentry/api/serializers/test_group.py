@@ -16,6 +16,7 @@ from sentry.models import (
     Environment, GroupLink, GroupResolution, GroupSnooze, GroupStatus,
     GroupSubscription, UserOption, UserOptionValue
 )
+from sentry.plugins import plugins
 from sentry.testutils import TestCase
 
 
@@ -300,6 +301,15 @@ class GroupSerializerTest(TestCase):
         result = serialize(group)
         assert not result['isSubscribed']
 
+    def test_annotations_are_looked_up_per_project(self):
+        groups = [self.create_group(project=self.project) for _ in range(3)]
+        with mock.patch.object(plugins, 'for_project', return_value=[]) as for_project:
+            result = serialize(groups, self.user)
+
+        assert [r['annotations'] for r in result] == [[], [], []]
+        # once for version 1 and once for version 2 plugins
+        assert for_project.call_count == 2
+
 
 class StreamGroupSerializerTestCase(TestCase):
     def test_environment(self):
@@ -5,9 +5,11 @@ from __future__ import absolute_import
 import mock
 
 from datetime import timedelta
+from django.db import connections
 from django.utils import timezone
 from sentry.buffer.base import Buffer
 from sentry.models import Group, Organization, Project, Release, ReleaseProject, Team
+from sentry.signals import buffer_incr_complete
 from sentry.testutils import TestCase
 
 
@@ -65,3 +67,52 @@ class BufferTest(TestCase):
         self.buf.process(ReleaseProject, columns, filters)
         release_project_ = ReleaseProject.objects.get(id=release_project.id)
         assert release_project_.new_groups == 1
+
+    def test_process_batch(self):
+        group1 = Group.objects.create(project=Project(id=1))
+        group2 = Group.objects.create(project=Project(id=1))
+        missing_id = group1.id + group2.id + 1000
+
+        complete = mock.Mock()
+        buffer_incr_complete.connect(complete, sender=Group)
+        try:
+            self.buf.process_batch([
+                (Group, {'times_seen': 1}, {'id': group1.id, 'project_id': 1}, None),
+                (Group, {'times_seen': 3}, {'id': group2.id, 'project_id': 1}, None),
+                (Group, {'times_seen': 1}, {'id': missing_id, 'project_id': 1}, None),
+            ])
+        finally:
+            buffer_incr_complete.disconnect(complete, sender=Group)
+
+        assert Group.objects.get(id=group1.id).times_seen == group1.times_seen + 1
+        assert Group.objects.get(id=group2.id).times_seen == group2.times_seen + 3
+        assert Group.objects.filter(id=missing_id).exists()
+        assert complete.call_count == 3
+
+    def test_cast_type_of_auto_fields(self):
+        connection = connections['default']
+        assert self.buf._cast_type(Group._meta.pk, connection) == 'bigint'
+        assert self.buf._cast_type(Project._meta.pk, connection) == 'bigint'
+        assert self.buf._cast_type(Group._meta.get_field('times_seen'), connection) == 'integer'
+
+    def test_process_batch_saves_extra(self):
+        group1 = Group.objects.create(project=Project(id=1))
+        group2 = Group.objects.create(project=Project(id=1))
+        the_date = (timezone.now() + timedelta(days=5))
+        self.buf.process_batch([
+            (Group, {'times_seen': 1}, {'id': group.id}, {'last_seen': the_date, 'message': 'foo'})
+            for group in (group1, group2)
+        ])
+        for group in (group1, group2):
+            group_ = Group.objects.get(id=group.id)
+            assert group_.times_seen == group.times_seen + 1
+            assert group_.last_seen == the_date
+            assert group_.message == 'foo'
+
+    def test_process_batch_same_row_twice(self):
+        group = Group.objects.create(project=Project(id=1))
+        self.buf.process_batch([
+            (Group, {'times_seen': 1}, {'id': group.id}, None),
+            (Group, {'times_seen': 2}, {'id': group.id}, None),
+        ])
+        assert Group.objects.get(id=group.id).times_seen == group.times_seen + 3
@@ -10,6 +10,7 @@ from django.utils import timezone
 from sentry.buffer.redis import RedisBuffer
 from sentry.models import Group, Project
 from sentry.testutils import TestCase
+from sentry.utils.compat import pickle
 
 
 class RedisBufferTest(TestCase):
@@ -178,3 +179,52 @@ class RedisBufferTest(TestCase):
 
         # Make sure we didn't queue up more
         assert len(process_pending.apply_async.mock_calls) == 2
+
+    @mock.patch('sentry.buffer.redis.RedisBuffer._make_key', mock.Mock(return_value='foo'))
+    def test_incr_coalesces_until_flush(self):
+        buf = RedisBuffer(incr_coalesce_size=10, incr_coalesce_delay=60)
+        client = buf.cluster.get_routing_client()
+        filters = {'pk': 1}
+
+        buf.incr(Group, {'times_seen': 1}, filters, extra={'message': 'foo'})
+        buf.incr(Group, {'times_seen': 2}, filters, extra={'message': 'bar'})
+        assert client.hgetall('foo') == {}
+
+        buf.flush()
+        result = client.hgetall('foo')
+        assert result['i+times_seen'] == '3'
+        assert pickle.loads(result['e+message']) == 'bar'
+        assert client.zrange('b:p', 0, -1) == ['foo']
+
+        # nothing left to write
+        buf.flush()
+        assert client.hgetall('foo')['i+times_seen'] == '3'
+
+    @mock.patch('sentry.buffer.redis.RedisBuffer._make_key', mock.Mock(return_value='foo'))
+    def test_incr_coalesce_flushes_when_full(self):
+        buf = RedisBuffer(incr_coalesce_size=1, incr_coalesce_delay=60)
+        client = buf.cluster.get_routing_client()
+
+        buf.incr(Group, {'times_seen': 1}, {'pk': 1})
+        assert client.hgetall('foo')['i+times_seen'] == '1'
+
+    @mock.patch('sentry.buffer.base.Buffer.process_batch')
+    def test_process_batch_keys(self, process_batch):
+        client = self.buf.cluster.get_routing_client()
+        for key, pk in (('foo', 1), ('bar', 2)):
+            client.hmset(
+                key, {
+                    'f': '{"pk": ["i","%d"]}' % pk,
+                    'i+times_seen': '2',
+                    'm': 'sentry.models.Group',
+                }
+            )
+            client.zadd('b:p', 1, key)
+
+        self.buf.process(batch_keys=['foo', 'bar', 'baz'])
+        process_batch.assert_called_once_with([
+            (Group, {'times_seen': 2}, {'pk': 1}, {}),
+            (Group, {'times_seen': 2}, {'pk': 2}, {}),
+        ])
+        assert client.hgetall('foo') == {}
+        assert client.zrange('b:p', 0, -1) == []
@@ -35,7 +35,9 @@ class TestConsumer(PluginTestCase):
         value = json.loads(kwargs['value'])
 
         consumer = ConsumerWorker()
-        consumer._handle(topic, value)
+        result = consumer._handle(topic, value)
+        if result is not None:
+            consumer.flush_batch([result])
 
     def _create_event_with_platform(self, project, platform):
         from sentry.event_manager import EventManager
@@ -0,0 +1,62 @@
+from __future__ import absolute_import
+
+from mock import patch
+
+from sentry.db.models.localcache import LocalModelCache
+from sentry.models import Organization
+from sentry.testutils import TestCase
+from sentry.utils.cache import cache
+
+
+class LocalModelCacheTest(TestCase):
+    def setUp(self):
+        super(LocalModelCacheTest, self).setUp()
+        self.local = LocalModelCache(size=100, ttl=60)
+        patcher = patch('sentry.db.models.manager.local_model_cache', self.local)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_get_from_cache(self):
+        org = self.create_organization(slug='foo')
+        Organization.objects.get_from_cache(id=org.id)
+        Organization.objects.get_from_cache(slug='foo')
+
+        with patch.object(cache, 'get') as cache_get:
+            result = Organization.objects.get_from_cache(id=org.id)
+            assert result == org
+            assert result is not Organization.objects.get_from_cache(id=org.id)
+            assert Organization.objects.get_from_cache(slug='foo') == org
+            assert not cache_get.called
+
+    def test_invalidation(self):
+        org = self.create_organization(slug='foo', name='foo')
+        Organization.objects.get_from_cache(id=org.id)
+        Organization.objects.get_from_cache(slug='foo')
+        assert Organization.objects.get_from_cache(id=org.id).name == 'foo'
+
+        org.name = 'bar'
+        org.slug = 'bar'
+        org.save()
+
+        assert Organization.objects.get_from_cache(id=org.id).name == 'bar'
+        assert Organization.objects.get_from_cache(slug='bar') == org
+        with self.assertRaises(Organization.DoesNotExist):
+            Organization.objects.get_from_cache(slug='foo')
+
+    def test_shared_cache_updated_before_invalidation(self):
+        org = self.create_organization(slug='foo', name='foo')
+        Organization.objects.get_from_cache(id=org.id)
+
+        seen = []
+        delete_many = self.local.delete_many
+
+        def record_delete_many(keys, version, broadcast=True):
+            # what another process reloads once it handles the broadcast
+            seen.append(cache.get(keys[0], version=version).name)
+            return delete_many(keys, version, broadcast)
+
+        org.name = 'bar'
+        with patch.object(self.local, 'delete_many', side_effect=record_delete_many):
+            org.save()
+
+        assert seen == ['bar']
@@ -0,0 +1,47 @@
+from __future__ import absolute_import
+
+from datetime import datetime, timedelta
+from django.utils import timezone
+
+from sentry.db.partitions import (
+    Partition, PartitionManager, get_expired_partitions, get_partition_name,
+    is_partitioned_model, parse_partition_name
+)
+from sentry.models import Event, Group
+from sentry.testutils import TestCase
+
+
+class PartitionsTest(TestCase):
+    def test_partition_names(self):
+        start = datetime(2019, 3, 1, tzinfo=timezone.utc)
+        name = get_partition_name('sentry_message', start)
+        assert name == 'sentry_message_p20190301'
+        assert parse_partition_name('sentry_message', name) == Partition(
+            name, start, start + timedelta(days=1))
+
+        assert parse_partition_name('sentry_message', 'sentry_message_default') is None
+        assert parse_partition_name('sentry_eventtag', name) is None
+
+    def test_get_expired_partitions(self):
+        start = datetime(2019, 3, 1, tzinfo=timezone.utc)
+        partitions = [
+            parse_partition_name(
+                'sentry_message',
+                get_partition_name('sentry_message', start + timedelta(days=i)),
+            ) for i in range(3)
+        ]
+
+        # the second partition is only partly expired
+        cutoff = start + timedelta(days=1, hours=12)
+        assert get_expired_partitions(partitions, cutoff) == partitions[:1]
+        assert get_expired_partitions(partitions, start + timedelta(days=2)) == partitions[:2]
+
+    def test_is_partitioned(self):
+        with self.settings(SENTRY_PARTITIONED_MODELS=('sentry.Event', )):
+            assert is_partitioned_model(Event)
+            assert not is_partitioned_model(Group)
+
+        # tables created by the migrations are not partitioned
+        manager = PartitionManager(Event)
+        assert not manager.is_partitioned()
+        assert manager.get_partitions() == []
@@ -8,7 +8,7 @@ from sentry.models import (
     Event, EventAttachment, EventMapping, File, Group, GroupAssignee, GroupHash, GroupMeta, GroupRedirect,
     ScheduledDeletion, UserReport
 )
-from sentry.tasks.deletion import run_deletion
+from sentry.tasks.deletion import delete_groups, run_deletion
 from sentry.testutils import TestCase
 
 
@@ -100,3 +100,28 @@ class DeleteGroupTest(TestCase):
         assert not GroupRedirect.objects.filter(group_id=group.id).exists()
         assert not GroupHash.objects.filter(group_id=group.id).exists()
         assert not Group.objects.filter(id=group.id).exists()
+
+    def test_multiple_groups(self):
+        project = self.create_project()
+        groups = [self.create_group(project=project) for _ in range(3)]
+        events = [self.create_event(group=group) for group in groups]
+        for event in events:
+            UserReport.objects.create(
+                group_id=event.group_id,
+                project_id=event.project_id,
+                event_id=event.event_id,
+                name='Jane Doe',
+            )
+        other_group = self.create_group(project=project)
+        other_event = self.create_event(group=other_group)
+
+        with self.tasks():
+            delete_groups(object_ids=[g.id for g in groups])
+
+        assert not Event.objects.filter(id__in=[e.id for e in events]).exists()
+        assert not UserReport.objects.filter(
+            group_id__in=[g.id for g in groups],
+        ).exists()
+        assert not Group.objects.filter(id__in=[g.id for g in groups]).exists()
+        assert Event.objects.filter(id=other_event.id).exists()
+        assert Group.objects.filter(id=other_group.id).exists()
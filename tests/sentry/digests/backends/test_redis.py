@@ -117,6 +117,39 @@ class RedisBackendTestCase(TestCase):
             expected_keys = set(u'record:{}'.format(i) for i in xrange(10, 20))
             assert set(record.key for record in records) == expected_keys
 
+    def test_digest_batch(self):
+        backend = RedisBackend()
+
+        record_1 = Record('record:1', 'value', time.time())
+        backend.add('timeline:1', record_1)
+        record_2 = Record('record:2', 'value', time.time())
+        backend.add('timeline:2', record_2)
+        backend.add('timeline:3', Record('record:3', 'value', time.time()))
+
+        with backend.digest('timeline:3', 0):
+            pass
+
+        with backend.digest_batch(['timeline:1', 'timeline:2', 'timeline:3'], 0) as digests:
+            # timeline:3 is waiting and can't be digested
+            assert digests == {
+                'timeline:1': [record_1],
+                'timeline:2': [record_2],
+            }
+            # this timeline is not closed and keeps its records
+            del digests['timeline:2']
+
+        with pytest.raises(InvalidState):
+            with backend.digest('timeline:1', 0):
+                pass
+
+        backend.maintenance(time.time())
+        record_4 = Record('record:4', 'value', time.time())
+        backend.add('timeline:2', record_4)
+        assert 'timeline:2' in set(entry.key for entry in backend.schedule(time.time()))
+
+        with backend.digest('timeline:2', 0) as records:
+            assert set(records) == set([record_2, record_4])
+
     def test_delete(self):
         backend = RedisBackend()
         backend.add('timeline', Record('record:1', 'value', time.time()))
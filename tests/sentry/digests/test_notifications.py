@@ -4,13 +4,18 @@ from collections import (
     OrderedDict,
     defaultdict,
 )
+from datetime import timedelta
+from django.utils import timezone
 from exam import fixture
+from mock import patch
 from six.moves import reduce
 
+from sentry.app import tsdb
 from sentry.digests import Record
 from sentry.digests.notifications import (
     Notification,
     event_to_record,
+    fetch_states,
     rewrite_record,
     group_records,
     sort_group_contents,
@@ -75,6 +80,51 @@ class RewriteRecordTestCase(TestCase):
         )
 
 
+class FetchStatesTestCase(TestCase):
+    @fixture
+    def rule(self):
+        return self.project.rule_set.all()[0]
+
+    def get_records(self, *datetimes):
+        events = [self.create_event(group=self.group, datetime=d) for d in datetimes]
+        # records are in reverse chronological order
+        return [event_to_record(event, (self.rule, )) for event in reversed(events)]
+
+    def test_windows(self):
+        now = timezone.now()
+        cutoff = now - timedelta(minutes=90)
+        early = self.get_records(now - timedelta(hours=3), now - timedelta(hours=2))
+        late = self.get_records(now - timedelta(hours=1), now)
+
+        def get_counts(amount):
+            return lambda model, keys, start, end: {
+                key: amount if start < cutoff else amount * 2 for key in keys
+            }
+
+        with patch.object(tsdb, 'get_sums', side_effect=get_counts(10)) as get_sums, \
+                patch.object(tsdb, 'get_distinct_counts_totals', side_effect=get_counts(1)):
+            states = fetch_states(self.project, [early, late, early])
+
+        # the counts are queried once per distinct window
+        assert get_sums.call_count == 2
+        assert [state['event_counts'] for state in states] == [
+            {self.group.id: 10},
+            {self.group.id: 20},
+            {self.group.id: 10},
+        ]
+        assert [state['user_counts'] for state in states] == [
+            {self.group.id: 1},
+            {self.group.id: 2},
+            {self.group.id: 1},
+        ]
+        assert states[0]['rules'] == {self.rule.id: self.rule}
+
+        # every digest gets its own copy of the group
+        groups = [state['groups'][self.group.id] for state in states]
+        assert groups == [self.group] * 3
+        assert len(set(id(group) for group in groups)) == 3
+
+
 class GroupRecordsTestCase(TestCase):
     @fixture
     def rule(self):
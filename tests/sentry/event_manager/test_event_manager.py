@@ -14,7 +14,7 @@ from time import time
 
 from sentry.app import tsdb
 from sentry.constants import VERSION_LENGTH
-from sentry.event_manager import HashDiscarded, EventManager, EventUser
+from sentry.event_manager import HashDiscarded, EventManager, EventUser, save_many
 from sentry.grouping.utils import hash_from_values
 from sentry.models import (
     Activity, Environment, Event, ExternalIssue, Group, GroupEnvironment,
@@ -122,6 +122,75 @@ class EventManagerTest(TestCase):
 
         assert Event.objects.count() == 1
 
+    def test_save_many(self):
+        timestamp = time() - 300
+        managers = [
+            EventManager(
+                make_event(
+                    message='foo',
+                    event_id=event_id * 32,
+                    checksum='a' * 32,
+                    timestamp=timestamp + offset,
+                )
+            ) for offset, event_id in enumerate('abc')
+        ]
+
+        with self.tasks():
+            events = save_many(1, managers)
+
+        assert [e.event_id for e in events] == ['a' * 32, 'b' * 32, 'c' * 32]
+        assert all(e.id is not None for e in events)
+        assert Event.objects.filter(project_id=1).count() == 3
+
+        group = Group.objects.get(id=events[0].group_id)
+        assert set(e.group_id for e in events) == set([group.id])
+        assert group.times_seen == 3
+        assert group.last_seen == events[2].datetime
+
+    def test_save_many_dupe_message_id(self):
+        manager = EventManager(make_event(event_id='a' * 32))
+        manager.normalize()
+        event = manager.save(1)
+
+        events = save_many(1, [
+            EventManager(make_event(event_id='a' * 32)),
+            EventManager(make_event(event_id='b' * 32)),
+            EventManager(make_event(event_id='b' * 32)),
+        ])
+
+        assert events[0].id == event.id
+        assert events[1].id == events[2].id
+        assert Event.objects.count() == 2
+
+    def test_save_many_discarded_hash(self):
+        manager = EventManager(make_event(event_id='a' * 32, fingerprint=['a' * 32]))
+        event = manager.save(1)
+
+        group = Group.objects.get(id=event.group_id)
+        tombstone = GroupTombstone.objects.create(
+            project_id=group.project_id,
+            level=group.level,
+            message=group.message,
+            culprit=group.culprit,
+            data=group.data,
+            previous_group_id=group.id,
+        )
+        GroupHash.objects.filter(
+            group=group,
+        ).update(
+            group=None,
+            group_tombstone_id=tombstone.id,
+        )
+
+        events = save_many(1, [
+            EventManager(make_event(event_id='b' * 32, fingerprint=['a' * 32])),
+            EventManager(make_event(event_id='c' * 32, fingerprint=['b' * 32])),
+        ])
+
+        assert isinstance(events[0], HashDiscarded)
+        assert events[1].event_id == 'c' * 32
+        assert not Event.objects.filter(event_id='b' * 32).exists()
+
     def test_updates_group(self):
         timestamp = time() - 300
         manager = EventManager(
@@ -4,6 +4,7 @@ from __future__ import absolute_import, print_function
 
 import six
 
+from sentry.grouping.component import GroupingComponent
 from sentry.grouping.enhancer import Enhancements
 
 
@@ -43,6 +44,12 @@ family:native                                   max-frames=3
     assert isinstance(dumped, six.string_types)
 
 
+def test_loads_is_cached():
+    dumped = Enhancements.from_config_string('function:foo -group', bases=[]).dumps()
+    assert Enhancements.loads(dumped) is Enhancements.loads(dumped)
+    assert Enhancements.loads(six.text_type(dumped)) is Enhancements.loads(dumped)
+
+
 def test_basic_path_matching():
     enhancement = Enhancements.from_config_string('''
         path:**/test.js              +app
@@ -170,3 +177,25 @@ def test_package_matching():
     assert not bool(bundled_rule.get_matching_frame_actions({
         'package': '/usr/lib/linux-gate.so',
     }, 'native'))
+
+
+def test_apply_modifications_to_frame():
+    enhancement = Enhancements.from_config_string('''
+        family:native function:std::*                  -app
+        family:native package:**/Game.app/**           +app
+        family:native app:no function:*panic*          ^-group -group
+    ''')
+    frames = [
+        {'function': 'main', 'package': '/Applications/Game.app/Game'},
+        {'function': 'std::panicking::begin_panic', 'package': 'C:\\Game.app\\Game'},
+        {'function': 'std::rt::lang_start', 'package': '/usr/lib/libstd.so'},
+    ]
+    # The last rule does not match as the second frame was marked in-app
+    # again by the rule before it.
+    enhancement.apply_modifications_to_frame(frames, 'native')
+    assert [f.get('in_app') for f in frames] == [True, True, False]
+
+    components = [GroupingComponent(id='frame', contributes=True) for _ in frames]
+    frames[1]['in_app'] = False
+    enhancement.update_frame_components_contributions(components, frames, 'native')
+    assert [c.contributes for c in components] == [True, False, False]
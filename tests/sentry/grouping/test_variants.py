@@ -111,3 +111,11 @@ def test_event_hash_variant(insta_snapshot, config_name, test_name, log):
     assert evt.get_grouping_config() == grouping_config
 
     insta_snapshot(output)
+
+
+def test_load_grouping_config_is_cached():
+    config_dict = get_default_grouping_config_dict()
+    config = load_grouping_config(config_dict)
+    assert load_grouping_config(dict(config_dict)) is config
+    assert load_grouping_config(
+        get_default_grouping_config_dict('newstyle:2019-05-08')) is not config
@@ -188,6 +188,7 @@ class JavascriptIntegrationTest(TestCase):
             release=None,
             dist=None,
             allow_scraping=True,
+            prefetched=None,
         )
 
         event = Event.objects.get()
@@ -247,6 +248,7 @@ class JavascriptIntegrationTest(TestCase):
             release=None,
             dist=None,
             allow_scraping=True,
+            prefetched=None,
         )
 
         event = Event.objects.get()
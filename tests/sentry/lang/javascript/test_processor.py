@@ -1,5 +1,6 @@
 from __future__ import absolute_import
 
+import base64
 import pytest
 import re
 import responses
@@ -20,6 +21,7 @@ from sentry.lang.javascript.processor import (
     generate_module,
     trim_line,
     fetch_release_file,
+    prefetch_release_files,
     UnparseableSourcemap,
     get_max_age,
     CACHE_CONTROL_MAX,
@@ -56,6 +58,49 @@ class JavaScriptStacktraceProcessorTest(TestCase):
         r = JavaScriptStacktraceProcessor({}, None, project)
         assert not r.allow_scraping
 
+    @responses.activate
+    def test_cache_sources(self):
+        project = self.create_project()
+        for idx in range(3):
+            responses.add(
+                responses.GET, 'http://example.com/%d.js' % idx,
+                body='// %d\n//# sourceMappingURL=shared.js.map' % idx,
+            )
+        responses.add(responses.GET, 'http://cdn.example.com/missing.js', status=404)
+        responses.add(responses.GET, 'http://example.com/shared.js.map', status=404)
+
+        r = JavaScriptStacktraceProcessor({}, None, project)
+        r.max_fetches = 4
+        r.cache_sources([
+            'http://example.com/0.js',
+            'http://example.com/1.js',
+            'http://cdn.example.com/missing.js',
+            'http://example.com/2.js',
+            'http://example.com/3.js',
+        ])
+
+        assert r.fetch_count == 5
+        assert r.cache.get('http://example.com/0.js') is not None
+        assert r.cache.get('http://example.com/2.js') is not None
+        assert r.cache.get_errors('http://cdn.example.com/missing.js') == [{
+            'type': EventError.FETCH_INVALID_HTTP_CODE,
+            'value': 404,
+            'url': 'http://cdn.example.com/missing.js',
+        }]
+        assert r.cache.get_errors('http://example.com/3.js') == [{
+            'type': EventError.JS_TOO_MANY_REMOTE_SOURCES,
+        }]
+        # the shared sourcemap is only fetched once, but reported for each source
+        assert len([
+            c for c in responses.calls if c.request.url == 'http://example.com/shared.js.map'
+        ]) == 1
+        for idx in range(3):
+            assert r.cache.get_errors('http://example.com/%d.js' % idx) == [{
+                'type': EventError.FETCH_INVALID_HTTP_CODE,
+                'value': 404,
+                'url': 'http://example.com/shared.js.map',
+            }]
+
 
 class FetchReleaseFileTest(TestCase):
     def test_unicode(self):
@@ -189,6 +234,43 @@ class FetchReleaseFileTest(TestCase):
             'utf-8',
         )
 
+    def test_prefetched(self):
+        project = self.project
+        release = Release.objects.create(
+            organization_id=project.organization_id,
+            version='abc',
+        )
+        release.add_project(project)
+
+        file = File.objects.create(
+            name='file.min.js',
+            type='release.file',
+            headers={'Content-Type': 'application/json; charset=utf-8'},
+        )
+        binary_body = unicode_body.encode('utf-8')
+        file.putfile(six.BytesIO(binary_body))
+
+        ReleaseFile.objects.create(
+            name='file.min.js',
+            release=release,
+            organization_id=project.organization_id,
+            file=file,
+        )
+
+        prefetched = prefetch_release_files(['file.min.js', 'missing.js'], release)
+        assert list(prefetched) == ['file.min.js']
+
+        # only the blobs are read, the database is not queried again
+        with self.assertNumQueries(0):
+            result = fetch_release_file('file.min.js', release, prefetched=prefetched)
+            assert fetch_release_file('missing.js', release, prefetched=prefetched) is None
+
+        assert result.body == binary_body
+
+        # now served from the cache
+        assert prefetch_release_files(['file.min.js', 'missing.js'], release) == {}
+        assert fetch_release_file('file.min.js', release) == result
+
 
 class FetchFileTest(TestCase):
     @responses.activate
@@ -512,6 +594,16 @@ class FetchSourcemapTest(TestCase):
         with pytest.raises(UnparseableSourcemap):
             fetch_sourcemap('http://example.com')
 
+    @responses.activate
+    def test_parsed_sourcemaps_are_shared(self):
+        body = base64.b64decode(base64_sourcemap[len('data:application/json;base64,'):])
+        responses.add(responses.GET, 'http://example.com/a.js.map', body=body)
+        responses.add(responses.GET, 'http://example.com/b.js.map', body=body)
+
+        smap_view = fetch_sourcemap('http://example.com/a.js.map')
+        assert fetch_sourcemap('http://example.com/a.js.map') is smap_view
+        assert fetch_sourcemap('http://example.com/b.js.map') is not smap_view
+
 
 class TrimLineTest(unittest.TestCase):
     long_line = 'The public is more familiar with bad design than good design. It is, in effect, conditioned to prefer bad design, because that is what it lives with. The new becomes threatening, the old reassuring.'
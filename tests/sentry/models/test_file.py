@@ -1,10 +1,16 @@
 from __future__ import absolute_import
 
+import errno
 import os
+import shutil
+import tempfile
 
 from django.core.files.base import ContentFile
+from mock import patch
 
+from sentry.filestore.cache import blobcache
 from sentry.models import File, FileBlob
+from sentry.models.file import MIN_READ_AHEAD, RangedBlobReader, get_storage
 from sentry.testutils import TestCase
 
 
@@ -36,6 +42,52 @@ class FileBlobTest(TestCase):
         path2 = FileBlob.generate_unique_path()
         assert path != path2
 
+    def test_getfile_cached(self):
+        cache_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_path)
+
+        blob = FileBlob.from_file(ContentFile(b'foo bar'))
+        other = FileBlob.from_file(ContentFile(b'baz'))
+
+        with self.options({
+            'filestore.cache-path': cache_path,
+            'filestore.cache-size': 8,
+        }):
+            with blob.getfile() as f:
+                assert f.read() == b'foo bar'
+            cached_path = blobcache.get_path(blob.checksum)
+            assert os.path.isfile(cached_path)
+
+            # served from the cache even if the stored file is gone
+            get_storage().delete(blob.path)
+            with blob.getfile() as f:
+                f.seek(4)
+                assert f.read() == b'bar'
+
+            with other.getfile() as f:
+                assert b''.join(f.chunks()) == b'baz'
+
+            # the least recently used blob goes first
+            os.utime(cached_path, (0, 0))
+            blobcache.clear_old_entries()
+            assert not os.path.exists(cached_path)
+            assert os.path.isfile(blobcache.get_path(other.checksum))
+
+    def test_getfile_cache_failure(self):
+        cache_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_path)
+
+        blob = FileBlob.from_file(ContentFile(b'foo bar'))
+
+        with self.options({
+            'filestore.cache-path': cache_path,
+            'filestore.cache-size': 8,
+        }), patch('sentry.filestore.cache.tempfile.mkstemp',
+                  side_effect=OSError(errno.ENOSPC, 'No space left on device')):
+            with blob.getfile() as f:
+                assert f.read() == b'foo bar'
+            assert not os.path.exists(blobcache.get_path(blob.checksum))
+
 
 class FileTest(TestCase):
     def test_file_handling(self):
@@ -91,3 +143,58 @@ class FileTest(TestCase):
 
         f = file.getfile(prefetch=True)
         assert f.read() == random_data
+
+    def test_ranged_reads(self):
+        data = os.urandom(MIN_READ_AHEAD * 4)
+        requests = []
+
+        class RangeStorage(object):
+            def read_range(self, name, offset, length):
+                requests.append((offset, length))
+                return data[offset:offset + length]
+
+        reader = RangedBlobReader(RangeStorage(), 'blob', len(data))
+
+        # random access only fetches a small window
+        reader.seek(MIN_READ_AHEAD)
+        assert reader.read(10) == data[MIN_READ_AHEAD:MIN_READ_AHEAD + 10]
+        assert requests == [(MIN_READ_AHEAD, MIN_READ_AHEAD)]
+
+        # sequential reads are served from the buffer, then grow the window
+        assert reader.read(MIN_READ_AHEAD - 10) == data[MIN_READ_AHEAD + 10:MIN_READ_AHEAD * 2]
+        assert reader.read() == data[MIN_READ_AHEAD * 2:]
+        assert requests == [
+            (MIN_READ_AHEAD, MIN_READ_AHEAD),
+            (MIN_READ_AHEAD * 2, MIN_READ_AHEAD * 2),
+        ]
+        assert reader.read() == b''
+
+        # without a seek the rest of the blob is fetched at once
+        del requests[:]
+        reader = RangedBlobReader(RangeStorage(), 'blob', len(data))
+        reader.seek(0)
+        assert reader.read(10) == data[:10]
+        assert reader.read() == data[10:]
+        assert requests == [(0, len(data))]
+
+    def test_ranged_reads_unsupported(self):
+        data = os.urandom(MIN_READ_AHEAD * 4)
+        opened = []
+
+        class GzipStorage(object):
+            def supports_range(self, name):
+                return False
+
+            def read_range(self, name, offset, length):
+                raise AssertionError('not reached')
+
+            def open(self, name):
+                opened.append(name)
+                return ContentFile(data)
+
+        reader = RangedBlobReader(GzipStorage(), 'blob', len(data))
+        reader.seek(MIN_READ_AHEAD)
+        assert reader.read(10) == data[MIN_READ_AHEAD:MIN_READ_AHEAD + 10]
+        reader.seek(0)
+        assert reader.read() == data
+        assert opened == ['blob']
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+
+from mock import patch
+
+from sentry.nodestore.cached.backend import CachedNodeStorage
+from sentry.nodestore.django.backend import DjangoNodeStorage
+from sentry.nodestore.django.models import Node
+from sentry.testutils import TestCase
+
+
+class CachedNodeStorageTest(TestCase):
+    def setUp(self):
+        self.ns = CachedNodeStorage(
+            backend='sentry.nodestore.django.DjangoNodeStorage',
+            redis_cluster='default',
+        )
+        self.ns._invalidate([
+            'd2502ebbd7df41ceba8d3275595cac33', '5394aa025b8e401ca6bc3ddee3130edc'
+        ])
+
+    def test_backend(self):
+        assert isinstance(self.ns.backend, DjangoNodeStorage)
+
+    def test_get_multi_caches(self):
+        self.ns.set('d2502ebbd7df41ceba8d3275595cac33', {'foo': 'bar'})
+
+        with patch.object(self.ns.backend, 'get_multi', wraps=self.ns.backend.get_multi) as m:
+            result = self.ns.get_multi(
+                ['d2502ebbd7df41ceba8d3275595cac33', '5394aa025b8e401ca6bc3ddee3130edc']
+            )
+            assert result == {
+                'd2502ebbd7df41ceba8d3275595cac33': {'foo': 'bar'},
+                '5394aa025b8e401ca6bc3ddee3130edc': None,
+            }
+            assert m.call_count == 1
+
+            assert self.ns.get('d2502ebbd7df41ceba8d3275595cac33') == {'foo': 'bar'}
+            assert m.call_count == 1
+
+            # missing nodes are not cached
+            assert self.ns.get('5394aa025b8e401ca6bc3ddee3130edc') is None
+            assert m.call_count == 2
+
+    def test_redis_tier(self):
+        self.ns.set('d2502ebbd7df41ceba8d3275595cac33', {'foo': 'bar'})
+        assert self.ns.get('d2502ebbd7df41ceba8d3275595cac33') == {'foo': 'bar'}
+
+        Node.objects.filter(id='d2502ebbd7df41ceba8d3275595cac33').delete()
+        self.ns.local.clear()
+        assert self.ns.get('d2502ebbd7df41ceba8d3275595cac33') == {'foo': 'bar'}
+        assert self.ns.local.get('d2502ebbd7df41ceba8d3275595cac33') is not None
+
+    def test_invalidation(self):
+        self.ns.set('d2502ebbd7df41ceba8d3275595cac33', {'foo': 'bar'})
+        assert self.ns.get('d2502ebbd7df41ceba8d3275595cac33') == {'foo': 'bar'}
+
+        self.ns.set('d2502ebbd7df41ceba8d3275595cac33', {'foo': 'baz'})
+        assert self.ns.get('d2502ebbd7df41ceba8d3275595cac33') == {'foo': 'baz'}
+
+        self.ns.set_multi({'d2502ebbd7df41ceba8d3275595cac33': {'foo': 'qux'}})
+        assert self.ns.get('d2502ebbd7df41ceba8d3275595cac33') == {'foo': 'qux'}
+
+        self.ns.delete('d2502ebbd7df41ceba8d3275595cac33')
+        assert self.ns.get('d2502ebbd7df41ceba8d3275595cac33') is None
+
+    def test_size_limit(self):
+        self.ns.max_node_size = 10
+        self.ns.set('d2502ebbd7df41ceba8d3275595cac33', {'foo': 'x' * 100})
+        assert self.ns.get('d2502ebbd7df41ceba8d3275595cac33') == {'foo': 'x' * 100}
+        assert self.ns.local.get('d2502ebbd7df41ceba8d3275595cac33') is None
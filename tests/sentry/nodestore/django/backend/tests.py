@@ -113,3 +113,29 @@ class DjangoNodeStorageTest(TestCase):
 
         assert Node.objects.filter(id=node.id).exists()
         assert not Node.objects.filter(id=node2.id).exists()
+
+    def test_set_with_codec(self):
+        ns = DjangoNodeStorage(codec='msgpack')
+        ns.set('d2502ebbd7df41ceba8d3275595cac33', {
+            'foo': 'bar',
+        })
+        raw = Node.objects.filter(
+            id='d2502ebbd7df41ceba8d3275595cac33',
+        ).values_list('data', flat=True).get()
+        assert raw.startswith('nc:')
+        assert ns.get('d2502ebbd7df41ceba8d3275595cac33') == {
+            'foo': 'bar',
+        }
+        # nodes written in the legacy format can still be read
+        assert self.ns.get('d2502ebbd7df41ceba8d3275595cac33') == {
+            'foo': 'bar',
+        }
+        Node.objects.create(id='5394aa025b8e401ca6bc3ddee3130edc', data={
+            'foo': 'baz',
+        })
+        assert ns.get_multi(
+            ['d2502ebbd7df41ceba8d3275595cac33', '5394aa025b8e401ca6bc3ddee3130edc']
+        ) == {
+            'd2502ebbd7df41ceba8d3275595cac33': {'foo': 'bar'},
+            '5394aa025b8e401ca6bc3ddee3130edc': {'foo': 'baz'},
+        }
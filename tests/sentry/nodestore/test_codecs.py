@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+
+import pytest
+
+from sentry.nodestore import codecs
+from sentry.utils.compat import pickle
+from sentry.utils.strings import compress
+
+
+DATA = {
+    'message': u'h\xe9llo',
+    'tags': [['foo', 'bar']],
+    'extra': {'count': 1, 'ratio': 0.5, 'missing': None},
+}
+
+
+@pytest.mark.parametrize('name', ['json', 'msgpack'])
+def test_roundtrip(name):
+    codec = codecs.get_codec(name)
+    value = codecs.encode(DATA, codec)
+    assert codecs.is_encoded(value)
+    assert codecs.decode(value) == DATA
+    assert codecs.decode(value, codec) == DATA
+
+
+def test_msgpack_binary_safe():
+    codec = codecs.get_codec('msgpack')
+    data = {'blob': b'\x00\xff\xfe', 'text': u'☃'}
+    assert codecs.decode(codecs.encode(data, codec)) == data
+
+
+def test_decode_with_other_codec():
+    value = codecs.encode(DATA, codecs.get_codec('json'))
+    assert codecs.decode(value, codecs.get_codec('msgpack')) == DATA
+
+
+def test_legacy_payloads_not_encoded():
+    assert not codecs.is_encoded(b'{"foo":"bar"}')
+    assert not codecs.is_encoded(pickle.dumps(DATA))
+    assert not codecs.is_text_encoded(compress(pickle.dumps(DATA)))
+
+
+def test_text_roundtrip():
+    value = codecs.encode_text(DATA, codecs.get_codec('msgpack'))
+    assert codecs.is_text_encoded(value)
+    assert codecs.decode_text(value) == DATA
+
+
+def test_unknown_codec():
+    with pytest.raises(ValueError):
+        codecs.get_codec('nope')
+    with pytest.raises(ValueError):
+        codecs.decode(codecs.MAGIC + b'\xfe')
@@ -2,6 +2,8 @@
 
 from __future__ import absolute_import
 
+import mock
+
 from datetime import timedelta
 from django.utils import timezone
 
@@ -59,6 +61,44 @@ class RuleProcessorTest(TestCase):
         results = list(rp.apply())
         assert len(results) == 1
 
+    @mock.patch(
+        'sentry.rules.conditions.event_frequency.EventFrequencyCondition.get_rate',
+        return_value=0,
+    )
+    def test_shares_condition_queries(self, get_rate):
+        event = self.create_event()
+
+        Rule.objects.filter(project=event.project).delete()
+        for value in (0, 10):
+            Rule.objects.create(
+                project=event.project,
+                data={
+                    'conditions': [{
+                        'id': 'sentry.rules.conditions.event_frequency.EventFrequencyCondition',
+                        'interval': '1h',
+                        'value': value,
+                    }],
+                    'actions': [{
+                        'id': 'sentry.rules.actions.notify_event.NotifyEventAction',
+                    }],
+                }
+            )
+
+        rp = RuleProcessor(
+            event,
+            is_new=True,
+            is_regression=True,
+            is_new_group_environment=True,
+            has_reappeared=True)
+        assert list(rp.apply()) == []
+        assert get_rate.call_count == 1
+        assert len(rp.rule_statuses) == 0
+        assert GroupRuleStatus.objects.filter(group=event.group).count() == 2
+
+        rp.apply()
+        assert get_rate.call_count == 2
+        assert len(rp.rule_statuses) == 2
+
 
 class EventCompatibilityProxyTest(TestCase):
     def test_simple(self):
@@ -3,6 +3,8 @@ from __future__ import absolute_import
 from collections import Counter
 from unittest import TestCase
 
+import mmh3
+
 from sentry.similarity.signatures import MinHashSignatureBuilder
 
 
@@ -38,3 +40,18 @@ class MinHashSignatureBuilderTestCase(TestCase):
             estimation,
             delta=0.1,  # totally made up constant, seems reasonable
         )
+
+    def test_build_many(self):
+        get_signature = MinHashSignatureBuilder(16, 0xFFFF)
+        feature_sets = [
+            ['foo', 'bar', 'baz'],
+            ['bar', 'baz', 'qux', 'bar'],
+            ['quux'],
+        ]
+
+        signatures = get_signature.build_many(feature_sets)
+        assert signatures == [get_signature(features) for features in feature_sets]
+        assert signatures[2] == [mmh3.hash('quux', column) % 0xFFFF for column in range(16)]
+
+        with self.assertRaises(ValueError):
+            get_signature.build_many([[]])
@@ -359,6 +359,41 @@ class TagStorage(TestCase):
             ).values_list('group_id', flat=True)
             assert set(expected_qs) == set([self.proj1group1.id])
 
+    def test_create_event_tags_bulk(self):
+        events = [
+            self.proj1group1event1, self.proj1group1event2, self.proj1group1event3,
+        ]
+        self.ts.create_event_tags_bulk([
+            {
+                'project_id': self.proj1.id,
+                'group_id': self.proj1group1.id,
+                'environment_id': self.proj1env1.id,
+                'event_id': event.id,
+                'tags': [('k1', 'v%d' % i), ('k2', 'v2')],
+            }
+            for i, event in enumerate(events)
+        ])
+
+        assert models.EventTag.objects.count() == 6
+        assert models.TagKey.objects.filter(project_id=self.proj1.id).count() == 2
+        assert models.TagValue.objects.filter(project_id=self.proj1.id).count() == 4
+        for i, event in enumerate(events):
+            assert models.EventTag.objects.filter(
+                event_id=event.id,
+                key__key='k1',
+                value__value='v%d' % i,
+            ).exists()
+
+        # repeating a batch falls back to inserting each event on its own
+        self.ts.create_event_tags_bulk([{
+            'project_id': self.proj1.id,
+            'group_id': self.proj1group1.id,
+            'environment_id': self.proj1env1.id,
+            'event_id': self.proj1group1event1.id,
+            'tags': [('k1', 'v0')],
+        }])
+        assert models.EventTag.objects.count() == 6
+
     def test_delete_tag_key(self):
         tk1 = self.ts.create_tag_key(
             project_id=self.proj1.id,
@@ -11,7 +11,9 @@ from sentry.models import Group, GroupSnooze, GroupStatus, ProjectOwnership
 from sentry.ownership.grammar import Rule, Matcher, Owner, dump_schema
 from sentry.testutils import TestCase
 from sentry.tasks.merge import merge_groups
-from sentry.tasks.post_process import index_event_tags, post_process_group
+from sentry.tasks.post_process import (
+    index_event_tags, index_event_tags_batch, post_process_group, queue_index_event_tags
+)
 
 
 class PostProcessGroupTest(TestCase):
@@ -414,3 +416,84 @@ class IndexEventTagsTest(TestCase):
             None,
             None,
         ) == {'id__in': set([event.id])}
+
+    def test_batch(self):
+        group = self.create_group(project=self.project)
+        events = [self.create_event(group=group) for _ in range(3)]
+
+        with self.settings(SENTRY_TAGSTORE_INDEX_BATCH={
+            'size': 2, 'delay': 5, 'cluster': 'default',
+        }), patch.object(index_event_tags_batch, 'apply_async') as apply_async, \
+                patch.object(index_event_tags_batch, 'delay') as delay:
+            for event in events:
+                queue_index_event_tags(
+                    event_id=event.id,
+                    group_id=group.id,
+                    project_id=self.project.id,
+                    environment_id=self.environment.id,
+                    organization_id=self.project.organization_id,
+                    tags=[('foo', 'bar')],
+                    date_added=event.datetime,
+                )
+
+            # the first event schedules a delayed flush, the second fills the batch
+            assert apply_async.call_count == 1
+            assert delay.call_count == 1
+
+            index_event_tags_batch()
+            # the third event is left over for the next run
+            assert apply_async.call_count == 2
+
+            index_event_tags_batch()
+
+        assert tagstore.get_group_event_filter(
+            self.project.id,
+            group.id,
+            [self.environment.id],
+            {'foo': 'bar'},
+            None,
+            None,
+        ) == {'id__in': set([e.id for e in events])}
+
+    def test_batch_drops_failing_events(self):
+        group = self.create_group(project=self.project)
+        events = [self.create_event(group=group) for _ in range(3)]
+        create_event_tags = tagstore.create_event_tags
+
+        def create_event_tags_or_fail(**kwargs):
+            if kwargs['event_id'] == events[0].id:
+                raise Exception('boom')
+            return create_event_tags(**kwargs)
+
+        with self.settings(SENTRY_TAGSTORE_INDEX_BATCH={
+            'size': 2, 'delay': 5, 'cluster': 'default',
+        }), patch.object(index_event_tags_batch, 'apply_async') as apply_async, \
+                patch.object(index_event_tags_batch, 'delay'):
+            for event in events:
+                queue_index_event_tags(
+                    event_id=event.id,
+                    group_id=group.id,
+                    project_id=self.project.id,
+                    environment_id=self.environment.id,
+                    organization_id=self.project.organization_id,
+                    tags=[('foo', 'bar')],
+                    date_added=event.datetime,
+                )
+
+            with patch.object(tagstore, 'create_event_tags_bulk', side_effect=Exception('boom')), \
+                    patch.object(tagstore, 'create_event_tags', side_effect=create_event_tags_or_fail):
+                index_event_tags_batch()
+
+            # the rest of the queue is still scheduled
+            assert apply_async.call_count == 2
+
+            index_event_tags_batch()
+
+        assert tagstore.get_group_event_filter(
+            self.project.id,
+            group.id,
+            [self.environment.id],
+            {'foo': 'bar'},
+            None,
+            None,
+        ) == {'id__in': set([e.id for e in events[1:]])}
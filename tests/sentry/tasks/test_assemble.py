@@ -11,7 +11,7 @@ from six.moves import xrange
 from sentry.testutils import TestCase
 from sentry.tasks.assemble import assemble_dif, assemble_file
 from sentry.models import FileBlob, FileBlobOwner
-from sentry.models.file import ChunkFileState
+from sentry.models.file import ChunkFileState, MULTI_BLOB_UPLOAD_CONCURRENCY
 from sentry.models.debugfile import get_assemble_status, ProjectDebugFile
 
 
@@ -113,3 +113,35 @@ class AssembleTest(TestCase):
             self.project, 'testfile', file_checksum.hexdigest(),
             [x[1] for x in files], 'dummy.type')[0]
         assert f.checksum == file_checksum.hexdigest()
+
+    def test_assemble_repeated_chunks(self):
+        blobs = [os.urandom(1024) for _ in xrange(3)]
+        chunks = [blobs[0], blobs[1], blobs[0], blobs[2], blobs[1]]
+        file_checksum = sha1(b''.join(chunks)).hexdigest()
+
+        FileBlob.from_files([io.BytesIO(b) for b in blobs], organization=self.organization)
+
+        rv = assemble_file(
+            self.project, 'testfile', file_checksum,
+            [sha1(c).hexdigest() for c in chunks], 'dummy.type')
+
+        assert rv is not None
+        f, tmp = rv
+        assert f.checksum == file_checksum
+        assert f.size == 1024 * 5
+        assert [i.offset for i in f._get_chunked_blob()._indexes] == \
+            [0, 1024, 2048, 3072, 4096]
+        assert tmp.read() == b''.join(chunks)
+        assert f.getfile().read() == b''.join(chunks)
+
+    def test_from_files_more_chunks_than_concurrency(self):
+        blobs = [os.urandom(1024) for _ in xrange(MULTI_BLOB_UPLOAD_CONCURRENCY * 3)]
+
+        FileBlob.from_files([io.BytesIO(b) for b in blobs], organization=self.organization)
+
+        checksums = [sha1(b).hexdigest() for b in blobs]
+        assert FileBlob.objects.filter(checksum__in=checksums).count() == len(blobs)
+        assert FileBlobOwner.objects.filter(
+            blob__checksum__in=checksums,
+            organization=self.organization,
+        ).count() == len(blobs)
@@ -0,0 +1,78 @@
+from __future__ import absolute_import
+
+import pytest
+import time
+
+from datetime import timedelta
+from django.utils import timezone
+from mock import Mock, patch
+
+from sentry.app import tsdb
+from sentry.digests.backends.base import InvalidState
+from sentry.digests.backends.redis import RedisBackend
+from sentry.digests.notifications import build_digest, event_to_record
+from sentry.tasks.digests import deliver_digests
+from sentry.testutils import TestCase
+
+
+class DeliverDigestsTest(TestCase):
+    def test_deliver_digests(self):
+        backend = RedisBackend()
+        rule = self.project.rule_set.all()[0]
+        now = timezone.now()
+        cutoff = now - timedelta(minutes=90)
+
+        plugins = {slug: Mock() for slug in ('early', 'late', 'broken')}
+        keys = {slug: '%s:p:%s' % (slug, self.project.id) for slug in plugins}
+        datetimes = {
+            'early': [now - timedelta(hours=3), now - timedelta(hours=2)],
+            'late': [now - timedelta(hours=1), now],
+            'broken': [now],
+        }
+        broken_event_ids = set()
+        for slug, key in keys.items():
+            for datetime in datetimes[slug]:
+                event = self.create_event(group=self.group, datetime=datetime)
+                backend.add(key, event_to_record(event, (rule, )))
+                if slug == 'broken':
+                    broken_event_ids.add(event.event_id)
+
+        def build_digest_or_fail(project, records, state=None):
+            if any(record.key in broken_event_ids for record in records):
+                raise Exception('boom')
+            return build_digest(project, records, state=state)
+
+        def get_counts(amount):
+            return lambda model, keys, start, end: {
+                key: amount if start < cutoff else amount * 2 for key in keys
+            }
+
+        with patch('sentry.digests.digest_batch', backend.digest_batch), \
+                patch('sentry.digests.delete', backend.delete), \
+                patch('sentry.tasks.digests.split_key',
+                      side_effect=lambda key: (plugins[key.split(':')[0]], self.project)), \
+                patch('sentry.tasks.digests.build_digest', side_effect=build_digest_or_fail), \
+                patch.object(tsdb, 'get_sums', side_effect=get_counts(10)), \
+                patch.object(tsdb, 'get_distinct_counts_totals', side_effect=get_counts(1)):
+            deliver_digests([(key, time.time()) for key in keys.values()])
+
+        # every digest has the counts of its own time window
+        for slug, (event_count, user_count) in (('early', (10, 1)), ('late', (20, 2))):
+            assert plugins[slug].notify_digest.call_count == 1
+            project, digest = plugins[slug].notify_digest.call_args[0]
+            assert project == self.project
+            [groups] = digest.values()
+            [group] = groups.keys()
+            assert group == self.group
+            assert group.event_count == event_count
+            assert group.user_count == user_count
+
+            # the timeline was closed
+            with pytest.raises(InvalidState):
+                with backend.digest(keys[slug], 0):
+                    pass
+
+        # the timeline whose digest failed keeps its records and is retried
+        assert not plugins['broken'].notify_digest.called
+        with backend.digest(keys['broken'], 0) as records:
+            assert set(record.key for record in records) == broken_event_ids
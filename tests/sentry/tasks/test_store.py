@@ -5,9 +5,12 @@ import uuid
 from time import time
 
 from sentry import quotas, tsdb
-from sentry.event_manager import EventManager, HashDiscarded
+from sentry.event_manager import EventManager, HashDiscarded, save_many
 from sentry.plugins import Plugin2
-from sentry.tasks.store import preprocess_event, process_event, save_event
+from sentry.models import Event
+from sentry.tasks.store import (
+    _do_save_events, preprocess_event, process_event, save_event
+)
 from sentry.testutils import PluginTestCase
 from sentry.utils.dates import to_datetime
 
@@ -218,3 +221,30 @@ class StoreTasksTest(PluginTestCase):
             ],
                 timestamp=to_datetime(now),
             )
+
+    def test_save_events_batch(self):
+        project = self.create_project()
+
+        event_ids = [uuid.uuid4().hex for _ in range(3)]
+        payloads = [{
+            'cache_key': None,
+            'data': {
+                'project': project.id,
+                'platform': 'NOTMATTLANG',
+                'logentry': {
+                    'formatted': 'test',
+                },
+                'event_id': event_id,
+            },
+            'start_time': time(),
+            'event_id': event_id,
+        } for event_id in event_ids]
+
+        with mock.patch('sentry.event_manager.save_many', wraps=save_many) as mock_save_many:
+            _do_save_events(project.id, payloads)
+
+        assert mock_save_many.call_count == 1
+        assert Event.objects.filter(
+            project_id=project.id,
+            event_id__in=event_ids,
+        ).count() == 3
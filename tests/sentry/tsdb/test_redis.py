@@ -1,7 +1,9 @@
 from __future__ import absolute_import
 
+import mock
 import pytest
 import pytz
+import time
 
 from contextlib import contextmanager
 from datetime import (
@@ -207,6 +209,110 @@ class RedisTSDBTest(TestCase):
             2: 0,
         }
 
+    def test_get_range_shared_hash(self):
+        now = datetime.utcnow().replace(tzinfo=pytz.UTC) - timedelta(hours=4)
+        dts = [now + timedelta(hours=i) for i in range(4)]
+
+        def timestamp(d):
+            t = int(to_timestamp(d))
+            return t - (t % 3600)
+
+        # 1 and 65 are stored in the same hash as there are 64 vnodes
+        self.db.incr(TSDBModel.group, 1, dts[0])
+        self.db.incr(TSDBModel.group, 65, dts[0], count=2)
+        self.db.incr(TSDBModel.group, 65, dts[3])
+        self.db.incr(TSDBModel.group, 'foo', dts[1], count=5)
+
+        results = self.db.get_range(TSDBModel.group, [1, 65, 'foo', 2], dts[0], dts[-1])
+        assert results == {
+            1: [(timestamp(dts[0]), 1)] + [(timestamp(dts[i]), 0) for i in range(1, 4)],
+            65: [
+                (timestamp(dts[0]), 2),
+                (timestamp(dts[1]), 0),
+                (timestamp(dts[2]), 0),
+                (timestamp(dts[3]), 1),
+            ],
+            'foo': [
+                (timestamp(dts[0]), 0),
+                (timestamp(dts[1]), 5),
+                (timestamp(dts[2]), 0),
+                (timestamp(dts[3]), 0),
+            ],
+            2: [(timestamp(dts[i]), 0) for i in range(0, 4)],
+        }
+
+        results = self.db.get_sums(TSDBModel.group, [1, 65, 'foo', 2], dts[0], dts[-1])
+        assert results == {1: 1, 65: 3, 'foo': 5, 2: 0}
+
+    def test_make_incr_plan(self):
+        now = datetime.utcnow().replace(tzinfo=pytz.UTC)
+
+        # 1 and 65 are stored in the same hash as there are 64 vnodes
+        plan = self.db.make_incr_plan(
+            [
+                (TSDBModel.project, 1),
+                (TSDBModel.project, 1),
+                (TSDBModel.project, 65),
+            ], now, 2, [None, 1]
+        )
+
+        assert len(plan) == len(self.db.rollups)
+        for rollup, max_values in self.db.rollups.items():
+            hash_key, _ = self.db.make_counter_key(TSDBModel.project, rollup, now, 1, None)
+            expiry, fields = plan[hash_key]
+            assert expiry == self.db.calculate_expiry(rollup, max_values, now)
+            assert fields == {1: 4, 65: 2, '1?e=1': 4, '65?e=1': 2}
+
+    def test_incr_multi_options(self):
+        db = RedisTSDB(
+            rollups=((ONE_HOUR, 24), ),
+            expiry_cache_size=100,
+            incr_buffer_window=3600,
+            hosts={0: {'db': 6}},
+        )
+        now = datetime.utcnow().replace(tzinfo=pytz.UTC)
+        hash_key, _ = db.make_counter_key(TSDBModel.project, ONE_HOUR, now, 1, None)
+
+        db.incr(TSDBModel.project, 1, now)
+        db.incr(TSDBModel.project, 1, now, count=2)
+        assert db.get_sums(TSDBModel.project, [1], now, now) == {1: 0}
+
+        db.flush_incr_buffer()
+        assert db.get_sums(TSDBModel.project, [1], now, now) == {1: 3}
+        assert db.expiry_cache.get(hash_key) == db.calculate_expiry(ONE_HOUR, 24, now)
+        with db.cluster.all() as client:
+            ttl = client.ttl(hash_key)
+        assert list(ttl.value.values())[0] > 0
+
+    def test_incr_buffer_flushed_in_background(self):
+        db = RedisTSDB(
+            rollups=((ONE_HOUR, 24), ),
+            incr_buffer_window=0.1,
+            hosts={0: {'db': 6}},
+        )
+        now = datetime.utcnow().replace(tzinfo=pytz.UTC)
+
+        db.incr(TSDBModel.project, 1, now)
+        assert db.get_sums(TSDBModel.project, [1], now, now) == {1: 0}
+
+        # no further increments come in
+        deadline = time.time() + 5
+        while db.incr_buffer and time.time() < deadline:
+            time.sleep(0.05)
+        assert db.get_sums(TSDBModel.project, [1], now, now) == {1: 1}
+
+    @mock.patch('sentry.tsdb.redis.metrics')
+    def test_incr_multi_commands_saved(self, metrics):
+        db = RedisTSDB(
+            rollups=((ONE_HOUR, 24), ),
+            hosts={0: {'db': 6}},
+        )
+        now = datetime.utcnow().replace(tzinfo=pytz.UTC)
+
+        # three increments of the same field: one HINCRBY and one EXPIREAT
+        db.incr_multi([(TSDBModel.project, 1)] * 3, now)
+        metrics.incr.assert_called_once_with('tsdb.incr.commands_saved', amount=4)
+
     def test_count_distinct(self):
         now = datetime.utcnow().replace(tzinfo=pytz.UTC) - timedelta(hours=4)
         dts = [now + timedelta(hours=i) for i in range(4)]
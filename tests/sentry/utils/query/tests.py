@@ -1,8 +1,8 @@
 from __future__ import absolute_import
 
-from sentry.models import User
+from sentry.models import GroupRedirect, User
 from sentry.testutils import TestCase
-from sentry.utils.query import merge_into, RangeQuerySetWrapper
+from sentry.utils.query import bulk_delete_objects, merge_into, RangeQuerySetWrapper
 
 from six.moves import xrange
 
@@ -41,3 +41,15 @@ class RangeQuerySetWrapperTest(TestCase):
             user.delete()
 
         assert User.objects.all().count() == 0
+
+
+class BulkDeleteObjectsTest(TestCase):
+    def test_in_filter(self):
+        redirects = [
+            GroupRedirect.objects.create(group_id=i, previous_group_id=i + 10)
+            for i in range(1, 4)
+        ]
+
+        bulk_delete_objects(GroupRedirect, group_id__in=[1, 2])
+
+        assert list(GroupRedirect.objects.all()) == [redirects[2]]
@@ -1,8 +1,9 @@
 from __future__ import absolute_import
 
 import pytest
+from mock import patch
 
-from sentry.utils.datastructures import BidirectionalMapping
+from sentry.utils.datastructures import BidirectionalMapping, LRUCache
 
 
 def test_bidirectional_mapping():
@@ -38,3 +39,43 @@ def test_bidirectional_mapping():
     del value['c']
 
     assert len(value) == len(value.inverse()) == 2
+
+
+def test_lru_cache():
+    cache = LRUCache(max_size=5)
+    cache.set('a', 1, size=2)
+    cache.set('b', 2, size=2)
+    assert cache.get('a') == 1
+
+    # evicts 'b', which was used least recently
+    cache.set('c', 3, size=2)
+    assert 'b' not in cache
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert cache.size == 4
+
+    cache.set('a', 4, size=1)
+    assert cache.get('a') == 4
+    assert cache.size == 3
+
+    # too large to ever fit
+    cache.set('c', 5, size=6)
+    assert 'c' not in cache
+    assert cache.size == 1
+
+    cache.delete('a')
+    assert len(cache) == 0
+    assert cache.size == 0
+    assert 'a' not in cache
+    assert (cache.hits, cache.misses) == (4, 3)
+
+
+def test_lru_cache_ttl():
+    cache = LRUCache(max_size=5, ttl=10)
+    with patch('time.time', return_value=100):
+        cache.set('a', 1)
+    with patch('time.time', return_value=105):
+        assert cache.get('a') == 1
+    with patch('time.time', return_value=110):
+        assert cache.get('a') is None
+    assert cache.size == 0
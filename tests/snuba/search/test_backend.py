@@ -352,6 +352,44 @@ class SnubaSearchTest(TestCase, SnubaTestCase):
         results = self.make_query(search_filter_query='is:resolved')
         assert set(results) == set([self.group2])
 
+    def test_result_cache(self):
+        with self.options({'snuba.search.result-cache-ttl': 60}):
+            results = self.make_query(search_filter_query='is:unresolved', sort_by='freq')
+            assert set(results) == set([self.group1])
+
+            with mock.patch('sentry.utils.snuba.raw_query') as query_mock:
+                results = self.make_query(search_filter_query='is:unresolved', sort_by='freq')
+                assert set(results) == set([self.group1])
+                assert not query_mock.called
+
+            # changing a group invalidates the results of its project
+            self.group2.status = GroupStatus.UNRESOLVED
+            self.group2.save()
+            results = self.make_query(search_filter_query='is:unresolved', sort_by='freq')
+            assert set(results) == set([self.group1, self.group2])
+
+    def test_candidates_optimizer(self):
+        with self.options({
+            'snuba.search.pre-snuba-candidates-optimizer': True,
+            'snuba.search.pre-snuba-candidates-percentage': 0.5,
+            'snuba.search.min-pre-snuba-candidates': 0,
+        }):
+            assert self.backend.get_group_count([self.project]) == 2
+            assert self.backend.get_max_candidates([self.project]) == 1
+
+            # both groups match in Postgres, so Snuba filters first
+            with mock.patch('sentry.search.snuba.backend.metrics.incr') as incr:
+                results = self.make_query(sort_by='freq', count_hits=True)
+            assert list(results) == [self.group1, self.group2]
+            incr.assert_any_call(
+                'snuba.search.strategy',
+                tags={'strategy': 'post_filter'},
+                skip_internal=False,
+            )
+
+            results = self.make_query(search_filter_query='is:unresolved', sort_by='freq')
+            assert set(results) == set([self.group1])
+
     def test_status_with_environment(self):
         results = self.make_query(
             environments=[self.environments['production']],